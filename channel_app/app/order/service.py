@@ -1,3 +1,7 @@
+import contextvars
+import logging
+import queue
+import threading
 from dataclasses import asdict
 from typing import List, Generator, Union
 
@@ -19,7 +23,9 @@ from channel_app.core.data import (BatchRequestResponseDto,
                                    CancelOrderDto,
                                    ChannelUpdateOrderItemDto)
 from channel_app.core.settings import OmnitronIntegration, ChannelIntegration
-from channel_app.omnitron.batch_request import ClientBatchRequest
+from channel_app.core.utilities import run_concurrently
+from channel_app.omnitron.batch_request import (BatchRequestCommitBuffer,
+                                                ClientBatchRequest)
 from channel_app.omnitron.constants import (BatchRequestStatus, ContentType, 
                                             FailedReasonType)
 from channel_app.omnitron.exceptions import (CityException,
@@ -28,11 +34,32 @@ from channel_app.omnitron.exceptions import (CityException,
                                              CargoCompanyException,
                                              OrderException)
 
+logger = logging.getLogger(__name__)
+
 
 class OrderService(object):
     batch_service = ClientBatchRequest
-
-    def fetch_and_create_order(self, is_success_log=True):
+    ORDER_PAGE_SIZE = 50
+    PREFETCHED_PAGE_COUNT = 2
+    PAGE_PUT_TIMEOUT = 1
+
+    def fetch_and_create_order(self, is_success_log=True, max_workers=None):
+        """
+        Fetches the orders from the channel and creates them on Omnitron.
+
+        :param is_success_log: send the reports of the successful orders
+        :param max_workers: number of orders created at the same time,
+            defaults to the ORDER_CREATION_MAX_WORKERS setting. With more
+            than one worker the orders are created in pages: the next page is
+            fetched from the channel while the orders of the current page are
+            created.
+
+        Batch request objects of the created orders are committed in bulk
+        through a BatchRequestCommitBuffer, which is flushed before the batch
+        request is done.
+        """
+        max_workers = int(max_workers or getattr(
+            settings, "ORDER_CREATION_MAX_WORKERS", 1))
         with OmnitronIntegration(
                 content_type=ContentType.order.value) as omnitron_integration:
             get_orders = ChannelIntegration().do_action(
@@ -41,29 +68,23 @@ class OrderService(object):
             )
 
             get_orders: Generator
-            order_batch_objects = []
-            while True:
-                try:
-                    channel_create_order, report_list, _ = next(get_orders)
-                except StopIteration:
-                    break
-
-                # tips
-                channel_create_order: ChannelCreateOrderDto
-                report_list: List[ErrorReportDto]
-                for report in report_list:
-                    if is_success_log or not report.is_ok:
-                        report.error_code = \
-                            f"{omnitron_integration.batch_request.local_batch_id}" \
-                            f"-Channel-GetOrders_{channel_create_order.order.number}"
-                        omnitron_integration.do_action(
-                            key='create_error_report',
-                            objects=report)
-
-                order = self.create_order(omnitron_integration=omnitron_integration,
-                                          channel_order=channel_create_order)
-                if order and omnitron_integration.batch_request.objects:
-                    order_batch_objects.extend(omnitron_integration.batch_request.objects)
+            omnitron_integration.batch_commit_buffer = \
+                BatchRequestCommitBuffer(integration=omnitron_integration)
+            try:
+                if max_workers > 1:
+                    order_batch_objects = self.create_orders_concurrently(
+                        omnitron_integration=omnitron_integration,
+                        get_orders=get_orders,
+                        is_success_log=is_success_log,
+                        max_workers=max_workers)
+                else:
+                    order_batch_objects = self.create_orders(
+                        omnitron_integration=omnitron_integration,
+                        get_orders=get_orders,
+                        is_success_log=is_success_log)
+            finally:
+                omnitron_integration.batch_commit_buffer.flush()
+                omnitron_integration.batch_commit_buffer = None
 
             omnitron_integration.batch_request.objects = order_batch_objects
             try:
@@ -76,9 +97,205 @@ class OrderService(object):
                 else:
                     raise exc
 
+    def create_orders(self, omnitron_integration: OmnitronIntegration,
+                      get_orders: Generator, is_success_log=True) -> List[dict]:
+        """
+        Creates the orders one by one.
+
+        :return: batch request objects of the created orders
+        """
+        order_batch_objects = []
+        while True:
+            try:
+                channel_create_order, report_list, _ = next(get_orders)
+            except StopIteration:
+                break
+
+            # tips
+            channel_create_order: ChannelCreateOrderDto
+            report_list: List[ErrorReportDto]
+            self.send_order_reports(omnitron_integration, channel_create_order,
+                                    report_list, is_success_log)
+
+            self.create_order(omnitron_integration=omnitron_integration,
+                              channel_order=channel_create_order,
+                              batch_objects=order_batch_objects)
+        return order_batch_objects
+
+    def create_orders_concurrently(self,
+                                   omnitron_integration: OmnitronIntegration,
+                                   get_orders: Generator, is_success_log=True,
+                                   max_workers=5) -> List[dict]:
+        """
+        Creates the orders in pages of ORDER_PAGE_SIZE orders on a thread pool
+        while a reader thread fetches the next pages from the channel. The
+        customers of a page and its order numbers which already exist on
+        Omnitron are prefetched, and the customers of the page are created
+        one by one, before its orders are created. A failing order does not
+        stop the others.
+
+        :return: batch request objects of the created orders, in the order
+            of the channel orders
+        """
+        pages = self.prefetch_order_pages(get_orders)
+        order_batch_objects = []
+        try:
+            for page in pages:
+                order_batch_objects.extend(self.create_order_page(
+                    omnitron_integration, page, is_success_log, max_workers))
+        finally:
+            pages.close()
+        return order_batch_objects
+
+    def create_order_page(self, omnitron_integration: OmnitronIntegration,
+                          page: list, is_success_log=True,
+                          max_workers=5) -> List[dict]:
+        """
+        :return: batch request objects of the created orders of the page
+        """
+        order_batch_objects = []
+        for channel_create_order, report_list, _ in page:
+            self.send_order_reports(omnitron_integration,
+                                    channel_create_order, report_list,
+                                    is_success_log)
+        channel_orders = [channel_create_order
+                          for channel_create_order, _, _ in page]
+        omnitron_integration.do_action(
+            key='prefetch_customers',
+            objects=[channel_order.order.customer
+                     for channel_order in channel_orders])
+        omnitron_integration.do_action(
+            key='prefetch_order_numbers',
+            objects=[channel_order.order.number
+                     for channel_order in channel_orders])
+        self.get_or_create_customers(omnitron_integration, channel_orders)
+
+        results = run_concurrently(
+            lambda channel_order: self.create_order_isolated(
+                omnitron_integration, channel_order),
+            channel_orders, max_workers=max_workers)
+        for batch_objects in results:
+            order_batch_objects.extend(batch_objects)
+        return order_batch_objects
+
+    def prefetch_order_pages(self, get_orders: Generator) -> Generator:
+        """
+        Reads the orders of the channel in pages of ORDER_PAGE_SIZE orders on
+        a reader thread and yields the pages. At most PREFETCHED_PAGE_COUNT
+        pages wait to be consumed. An exception raised by the channel is
+        raised from this generator.
+
+        Closing this generator (or stopping early) stops the reader thread,
+        which then closes get_orders.
+        """
+        pages = queue.Queue(maxsize=self.PREFETCHED_PAGE_COUNT)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=self.PAGE_PUT_TIMEOUT)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read_pages():
+            try:
+                page = []
+                for channel_order in get_orders:
+                    page.append(channel_order)
+                    if len(page) >= self.ORDER_PAGE_SIZE:
+                        if not put(page):
+                            return
+                        page = []
+                if page and not put(page):
+                    return
+                put(None)
+            except BaseException as exc:
+                put(exc)
+            finally:
+                close = getattr(get_orders, "close", None)
+                if close:
+                    close()
+
+        # The reader runs in the context of the caller, so that context
+        # variables like the open instrumentation measurements are visible
+        # to the channel requests.
+        threading.Thread(target=contextvars.copy_context().run,
+                         args=(read_pages,), daemon=True).start()
+        try:
+            while True:
+                page = pages.get()
+                if isinstance(page, BaseException):
+                    raise page
+                if page is None:
+                    return
+                yield page
+        finally:
+            stopped.set()
+
+    def get_or_create_customers(self,
+                                omnitron_integration: OmnitronIntegration,
+                                channel_orders: List[ChannelCreateOrderDto]):
+        """
+        Gets or creates each distinct customer of the orders one at a time,
+        so that the orders of a new customer which are created at the same
+        time find it on the cache instead of creating it twice.
+        """
+        seen = set()
+        for channel_order in channel_orders:
+            customer = channel_order.order.customer
+            key = (customer.email, customer.phone_number)
+            if key in seen:
+                continue
+            seen.add(key)
+            try:
+                omnitron_integration.do_action(
+                    key='get_or_create_customer', objects=customer)
+            except Exception:
+                logger.exception(
+                    f"Customer could not be created: {customer.email}")
+
+    def create_order_isolated(self, omnitron_integration: OmnitronIntegration,
+                              channel_order: ChannelCreateOrderDto
+                              ) -> List[dict]:
+        """
+        Creates the order, logging the exception if it fails.
+
+        :return: batch request objects of the order
+        """
+        batch_objects = []
+        try:
+            self.create_order(omnitron_integration=omnitron_integration,
+                              channel_order=channel_order,
+                              batch_objects=batch_objects)
+        except Exception:
+            logger.exception(
+                f"Order could not be created: {channel_order.order.number}")
+        return batch_objects
+
+    def send_order_reports(self, omnitron_integration: OmnitronIntegration,
+                           channel_create_order: ChannelCreateOrderDto,
+                           report_list: List[ErrorReportDto],
+                           is_success_log=True):
+        for report in report_list:
+            if is_success_log or not report.is_ok:
+                report.error_code = \
+                    f"{omnitron_integration.batch_request.local_batch_id}" \
+                    f"-Channel-GetOrders_{channel_create_order.order.number}"
+                omnitron_integration.do_action(
+                    key='create_error_report',
+                    objects=report)
+
     def create_order(self, omnitron_integration: OmnitronIntegration,
-                     channel_order: ChannelCreateOrderDto
+                     channel_order: ChannelCreateOrderDto,
+                     batch_objects: list = None
                      ) -> Union[Order, None]:
+        """
+        :param batch_objects: list which the batch request objects of the
+            created order are appended to
+        """
         order = channel_order.order
 
         try:
@@ -139,7 +356,8 @@ class OrderService(object):
         try:
             orders: List[Order] = omnitron_integration.do_action(
                 key='create_order',
-                objects=create_order_dto
+                objects=create_order_dto,
+                batch_objects=batch_objects
             )
             order = orders[0]
         except (OrderException, IndexError):
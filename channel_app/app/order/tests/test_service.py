@@ -0,0 +1,154 @@
+import contextvars
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("OMNITRON_MODULE", "channel_app.omnitron.integration")
+os.environ.setdefault("CHANNEL_MODULE", "channel_app.channel.integration")
+
+from channel_app.app.order.service import OrderService  # noqa: E402
+from channel_app.core.data import CustomerDto  # noqa: E402
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+def channel_order(number, email=None):
+    order = MagicMock()
+    order.order.number = number
+    order.order.customer = CustomerDto(
+        email=email or f"customer-{number}@akinon.com", first_name="John",
+        last_name="Doe", channel_code=str(number))
+    return order, [], None
+
+
+class TestCreateOrdersConcurrently(unittest.TestCase):
+    """
+    Test case for the pipelined order creation of OrderService
+
+    run: python -m unittest channel_app.app.order.tests.test_service.TestCreateOrdersConcurrently
+    """
+
+    def setUp(self):
+        self.service = OrderService()
+        self.service.ORDER_PAGE_SIZE = 2
+        self.service.PAGE_PUT_TIMEOUT = 0.01
+        self.integration = MagicMock()
+
+    def create_order(self, omnitron_integration, channel_order,
+                     batch_objects):
+        batch_objects.append(channel_order.order.number)
+
+    def test_pages_are_read_in_order(self):
+        get_orders = (channel_order(number) for number in range(5))
+
+        pages = list(self.service.prefetch_order_pages(get_orders))
+
+        self.assertEqual(
+            [[order.order.number for order, _, _ in page] for page in pages],
+            [[0, 1], [2, 3], [4]])
+
+    def test_batch_objects_are_aggregated_in_order(self):
+        get_orders = (channel_order(number) for number in range(5))
+
+        with patch.object(OrderService, "create_order",
+                          side_effect=self.create_order):
+            batch_objects = self.service.create_orders_concurrently(
+                self.integration, get_orders, max_workers=3)
+
+        self.assertEqual(batch_objects, [0, 1, 2, 3, 4])
+        prefetched_customers = [
+            call.kwargs["objects"]
+            for call in self.integration.do_action.call_args_list
+            if call.kwargs["key"] == "prefetch_customers"]
+        self.assertEqual(
+            [[customer.email for customer in customers]
+             for customers in prefetched_customers],
+            [["customer-0@akinon.com", "customer-1@akinon.com"],
+             ["customer-2@akinon.com", "customer-3@akinon.com"],
+             ["customer-4@akinon.com"]])
+
+    def test_customers_of_a_page_are_created_before_the_orders(self):
+        calls = []
+        self.integration.do_action.side_effect = \
+            lambda key, objects: calls.append((key, objects))
+
+        def create_order(omnitron_integration, channel_order, batch_objects):
+            calls.append(("create_order", channel_order.order.number))
+
+        get_orders = iter([channel_order(0, email="new@akinon.com"),
+                           channel_order(1, email="new@akinon.com")])
+
+        with patch.object(OrderService, "create_order",
+                          side_effect=create_order):
+            self.service.create_orders_concurrently(
+                self.integration, get_orders, max_workers=3)
+
+        customer_calls = [index for index, (key, _) in enumerate(calls)
+                          if key == "get_or_create_customer"]
+        order_calls = [index for index, (key, _) in enumerate(calls)
+                       if key == "create_order"]
+        self.assertEqual(len(customer_calls), 1)
+        self.assertEqual(calls[customer_calls[0]][1].email, "new@akinon.com")
+        self.assertEqual(len(order_calls), 2)
+        self.assertLess(customer_calls[0], min(order_calls))
+
+    def test_failing_order_does_not_stop_the_others(self):
+        def create_order(omnitron_integration, channel_order, batch_objects):
+            if channel_order.order.number == 1:
+                raise Exception("Order could not be created")
+            self.create_order(omnitron_integration, channel_order,
+                              batch_objects)
+
+        get_orders = (channel_order(number) for number in range(4))
+
+        with patch.object(OrderService, "create_order",
+                          side_effect=create_order), \
+                self.assertLogs("channel_app.app.order.service", "ERROR"):
+            batch_objects = self.service.create_orders_concurrently(
+                self.integration, get_orders, max_workers=3)
+
+        self.assertEqual(batch_objects, [0, 2, 3])
+
+    def test_channel_exception_is_raised(self):
+        def get_orders():
+            yield channel_order(0)
+            raise ValueError("channel is down")
+
+        with patch.object(OrderService, "create_order",
+                          side_effect=self.create_order), \
+                self.assertRaises(ValueError):
+            self.service.create_orders_concurrently(
+                self.integration, get_orders(), max_workers=3)
+
+    def test_reader_stops_when_consumer_fails(self):
+        closed = threading.Event()
+
+        def get_orders():
+            try:
+                number = 0
+                while True:
+                    yield channel_order(number)
+                    number += 1
+            finally:
+                closed.set()
+
+        with patch.object(OrderService, "create_order_page",
+                             side_effect=Exception("Omnitron is down")), \
+                self.assertRaises(Exception):
+            self.service.create_orders_concurrently(
+                self.integration, get_orders(), max_workers=3)
+
+        self.assertTrue(closed.wait(timeout=5))
+
+    def test_reader_runs_in_the_context_of_the_caller(self):
+        def get_orders():
+            yield channel_order(request_id.get())
+
+        token = request_id.set("request-1")
+        try:
+            pages = list(self.service.prefetch_order_pages(get_orders()))
+        finally:
+            request_id.reset(token)
+
+        self.assertEqual(pages[0][0][0].order.number, "request-1")
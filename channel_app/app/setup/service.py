@@ -1,10 +1,17 @@
+import functools
+import logging
+import traceback
+from datetime import datetime
 from typing import List
 
 from channel_app.core import settings
 from channel_app.core.data import CategoryTreeDto, ErrorReportDto, AttributeDto
 from channel_app.core.settings import OmnitronIntegration, ChannelIntegration
+from channel_app.core.utilities import run_concurrently
 from channel_app.omnitron.constants import ContentType
 
+logger = logging.getLogger(__name__)
+
 
 class SetupService(object):
     def create_or_update_category_tree_and_nodes(self, is_success_log=False):
@@ -27,31 +34,90 @@ class SetupService(object):
                 key='create_or_update_category_tree_and_nodes',
                 objects=category_tree)
 
-    def create_or_update_category_attributes(self, is_success_log=False):
+    def create_or_update_category_attributes(self, is_success_log=False,
+                                             max_workers=None):
+        """
+        Syncs the attributes of the categories returned by `get_category_ids`.
+        The error report of each category is sent to Omnitron once the
+        category is synced.
+
+        With more than one worker the categories are processed on a thread
+        pool and a category which raises is reported and does not stop the
+        others. With a single worker an exception stops the run as before.
+
+        :param is_success_log: send the reports of the successful categories
+        :param max_workers: number of categories synced at the same time,
+            defaults to the CATEGORY_ATTRIBUTES_MAX_WORKERS setting
+        """
+        max_workers = int(max_workers or getattr(
+            settings, "CATEGORY_ATTRIBUTES_MAX_WORKERS", 1))
         with OmnitronIntegration(
                 content_type=ContentType.attribute.value) as omnitron_integration:
             channel_integration = ChannelIntegration()
             category_integration_actions = omnitron_integration.do_action(
                 key='get_category_ids')
-
-            for category_ia in category_integration_actions:
-                if not category_ia.remote_id:
-                    continue
-
-                category, report, data = channel_integration.do_action(
-                    key='get_category_attributes',
-                    objects=category_ia,
-                    batch_request=omnitron_integration.batch_request
-                )
-                if report and (is_success_log or not report.is_ok):
-                    omnitron_integration.do_action(
-                        key='create_error_report',
-                        objects=report)
-
-                category = category if category.attributes else None
-                omnitron_integration.do_action(
-                    key='create_or_update_category_attributes',
-                    objects=(category_ia, category))
+            category_integration_actions = [
+                category_ia for category_ia in category_integration_actions
+                if category_ia.remote_id]
+
+            run_concurrently(
+                functools.partial(self.sync_and_report_category_attributes,
+                                  omnitron_integration, channel_integration,
+                                  is_success_log=is_success_log,
+                                  isolated=max_workers > 1),
+                category_integration_actions,
+                max_workers=max_workers)
+
+    def sync_and_report_category_attributes(self, omnitron_integration,
+                                            channel_integration, category_ia,
+                                            is_success_log=False,
+                                            isolated=True):
+        report = self.sync_category_attributes(
+            omnitron_integration, channel_integration, category_ia,
+            isolated=isolated)
+        if report and (is_success_log or not report.is_ok):
+            omnitron_integration.do_action(
+                key='create_error_report',
+                objects=report)
+
+    def sync_category_attributes(self, omnitron_integration,
+                                 channel_integration, category_ia,
+                                 isolated=True):
+        """
+        Gets the attributes of a category from the channel and creates or
+        updates them on Omnitron.
+
+        :param isolated: report the exceptions instead of raising them
+        :return: error report of the channel request, or of the exception
+            raised while syncing the category
+        """
+        try:
+            category, report, data = channel_integration.do_action(
+                key='get_category_attributes',
+                objects=category_ia,
+                batch_request=omnitron_integration.batch_request
+            )
+            category = category if category.attributes else None
+            omnitron_integration.do_action(
+                key='create_or_update_category_attributes',
+                objects=(category_ia, category))
+        except Exception as exc:
+            if not isolated:
+                raise
+            logger.exception(f"Category attributes could not be synced: "
+                             f"{category_ia.remote_id}")
+            batch_request = omnitron_integration.batch_request
+            report = ErrorReportDto(
+                action_content_type=ContentType.batch_request.value,
+                action_object_id=batch_request.pk,
+                modified_date=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                error_code=f"{batch_request.local_batch_id}-"
+                           f"CategoryAttributes-{category_ia.remote_id}",
+                error_description="CategoryAttributes",
+                raw_request=f"category remote_id: {category_ia.remote_id}",
+                raw_response=f"{exc} - {traceback.format_exc()}",
+                is_ok=False)
+        return report
 
     def create_or_update_attributes(self, is_success_log=False):
         with OmnitronIntegration(
@@ -0,0 +1,118 @@
+import os
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+os.environ.setdefault("OMNITRON_MODULE", "channel_app.omnitron.integration")
+os.environ.setdefault("CHANNEL_MODULE", "channel_app.channel.integration")
+
+from channel_app.app.setup import service  # noqa: E402
+from channel_app.app.setup.service import SetupService  # noqa: E402
+from channel_app.core.data import ErrorReportDto  # noqa: E402
+
+
+class TestCreateOrUpdateCategoryAttributes(unittest.TestCase):
+    """
+    Test case for SetupService.create_or_update_category_attributes
+
+    run: python -m unittest channel_app.app.setup.tests.test_service.TestCreateOrUpdateCategoryAttributes
+    """
+
+    def setUp(self):
+        self.service = SetupService()
+        self.category_ias = [MagicMock(remote_id=str(pk)) for pk in range(4)]
+        self.omnitron_integration = MagicMock()
+        self.omnitron_integration.batch_request.pk = 1
+        self.omnitron_integration.batch_request.local_batch_id = "batch"
+        self.omnitron_integration.__enter__.return_value = \
+            self.omnitron_integration
+        self.channel_integration = MagicMock()
+        self.threads = set()
+        self.sent_reports = []
+        self.synced = []
+
+        def omnitron_do_action(key, objects=None, **kwargs):
+            if key == "get_category_ids":
+                return self.category_ias
+            if key == "create_or_update_category_attributes":
+                self.threads.add(threading.get_ident())
+                self.synced.append(objects[0].remote_id)
+            if key == "create_error_report":
+                self.sent_reports.append(objects)
+
+        def channel_do_action(key, objects, **kwargs):
+            if objects.remote_id == "2":
+                raise Exception("Channel is down")
+            report = ErrorReportDto(action_content_type="batch_request",
+                                    action_object_id=1,
+                                    modified_date="2023-01-01 00:00:00",
+                                    error_code=objects.remote_id,
+                                    is_ok=True)
+            return MagicMock(attributes=[1]), report, None
+
+        self.omnitron_integration.do_action.side_effect = omnitron_do_action
+        self.channel_integration.do_action.side_effect = channel_do_action
+        patcher = patch.multiple(
+            service,
+            OmnitronIntegration=MagicMock(
+                return_value=self.omnitron_integration),
+            ChannelIntegration=MagicMock(
+                return_value=self.channel_integration))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_categories_are_synced_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        do_action = self.channel_integration.do_action.side_effect
+
+        def channel_do_action(key, objects, **kwargs):
+            if objects.remote_id in ("0", "1"):
+                # fails if the two categories are not synced at once
+                barrier.wait()
+            return do_action(key, objects, **kwargs)
+
+        self.channel_integration.do_action.side_effect = channel_do_action
+        self.service.create_or_update_category_attributes(max_workers=2)
+
+        self.assertEqual(sorted(self.synced), ["0", "1", "3"])
+        self.assertGreater(len(self.threads), 1)
+
+    def test_failing_category_is_reported(self):
+        self.service.create_or_update_category_attributes(max_workers=4)
+
+        self.assertEqual(len(self.sent_reports), 1)
+        report = self.sent_reports[0]
+        self.assertFalse(report.is_ok)
+        self.assertEqual(report.error_code, "batch-CategoryAttributes-2")
+        self.assertIn("Channel is down", report.raw_response)
+
+    def test_reports_of_all_categories_are_sent(self):
+        self.service.create_or_update_category_attributes(
+            is_success_log=True, max_workers=4)
+
+        self.assertEqual(
+            sorted(report.error_code for report in self.sent_reports),
+            ["0", "1", "3", "batch-CategoryAttributes-2"])
+
+    def test_reports_are_sent_as_categories_complete(self):
+        self.category_ias = self.category_ias[:2]
+        do_action = self.channel_integration.do_action.side_effect
+
+        def channel_do_action(key, objects, **kwargs):
+            if objects.remote_id == "1":
+                # the report of the first category is already sent
+                self.assertEqual(len(self.sent_reports), 1)
+            return do_action(key, objects, **kwargs)
+
+        self.channel_integration.do_action.side_effect = channel_do_action
+        self.service.create_or_update_category_attributes(
+            is_success_log=True, max_workers=1)
+
+        self.assertEqual(len(self.sent_reports), 2)
+
+    def test_exception_stops_the_run_with_single_worker(self):
+        with self.assertRaises(Exception):
+            self.service.create_or_update_category_attributes(max_workers=1)
+
+        self.assertEqual(self.synced, ["0", "1"])
+        self.assertEqual(len(self.threads), 1)
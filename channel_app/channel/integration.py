@@ -1,4 +1,11 @@
+import threading
+import time
+
 import requests
+from celery.signals import (worker_process_init, worker_process_shutdown,
+                            worker_shutdown)
+from omnisdk.omnitron.endpoints import ChannelEndpoint
+from omnisdk.omnitron.models import Channel
 
 from channel_app.channel.commands.orders.orders import (
     GetCancellationRequests, GetOrders, CheckOrders, SendUpdatedOrders, 
@@ -15,9 +22,85 @@ from channel_app.channel.commands.products import (
 from channel_app.channel.commands.setup import (
     GetCategoryTreeAndNodes, GetCategoryAttributes, GetChannelConfSchema,
     GetAttributes)
+from channel_app.core.instrumentation import (configure_instrumentation,
+                                               instrumentation)
 from channel_app.core.integration import BaseIntegration
 
 
+class ChannelSessionRegistry(object):
+    """
+    Process wide store of the channel http sessions and channel objects.
+
+    ChannelIntegration objects are created for almost every action, so
+    keeping these on the integration object means a new connection pool
+    (and TLS handshakes) and a channel retrieve request from Omnitron for
+    each action. Sessions are shared by all ChannelIntegration objects of
+    the process and kept alive until `clear` or `invalidate` is called.
+    Channel objects are refreshed after CHANNEL_TTL seconds so that conf
+    changes are applied.
+    """
+    CHANNEL_TTL = 60 * 5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions = {}
+        self.channels = {}
+
+    def get_session(self, channel_id, create_session) -> requests.Session:
+        session = self.sessions.get(channel_id)
+        if session:
+            return session
+        with self._lock:
+            if channel_id not in self.sessions:
+                self.sessions[channel_id] = create_session()
+            return self.sessions[channel_id]
+
+    def get_channel(self, channel_id) -> Channel:
+        channel, expires_at = self.channels.get(channel_id, (None, 0))
+        if channel and expires_at > time.monotonic():
+            return channel
+        channel = ChannelEndpoint().retrieve(id=channel_id)
+        self.channels[channel_id] = (channel,
+                                     time.monotonic() + self.CHANNEL_TTL)
+        return channel
+
+    def invalidate(self, channel_id):
+        """
+        Drops the channel object and the session of the channel, so that the
+        channel is retrieved again and the next session is created with its
+        current connection pool conf. The session is not closed, since other
+        integration objects may be sending requests with it; its connections
+        are released once it is garbage collected.
+        """
+        with self._lock:
+            self.channels.pop(channel_id, None)
+            self.sessions.pop(channel_id, None)
+
+    def clear(self):
+        with self._lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+            self.channels = {}
+
+
+channel_session_registry = ChannelSessionRegistry()
+
+
+@worker_process_init.connect
+def init_channel_sessions(**kwargs):
+    """
+    Forked worker processes must not share the connections of the parent.
+    """
+    channel_session_registry.clear()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def close_channel_sessions(**kwargs):
+    channel_session_registry.clear()
+
+
 class ChannelIntegration(BaseIntegration):
     """
     Communicates with the Channel Api services through the commands defined.
@@ -56,6 +139,7 @@ class ChannelIntegration(BaseIntegration):
 
     def __init__(self):
         from channel_app.core import settings
+        configure_instrumentation(settings)
         self.channel_id = settings.OMNITRON_CHANNEL_ID
         self.catalog_id = settings.OMNITRON_CATALOG_ID
 
@@ -75,16 +159,40 @@ class ChannelIntegration(BaseIntegration):
                                                 max_retries=retry)
         session.mount('http://', adapter)
         session.mount('https://', adapter)
-        return session
+        return instrumentation.instrument_session(session)
 
     @property
-    def _session(self):
-        __session = getattr(self, "__session", None)
-        if __session:
-            return __session
+    def channel(self) -> Channel:
+        """
+        Channel object is shared by the ChannelIntegration objects of the
+        process, see ChannelSessionRegistry. Deleting `self.channel_object`
+        (or setting it to None) drops the shared channel and session too, so
+        the channel is retrieved again on the next call.
+        """
+        if not getattr(self, 'channel_object', None):
+            self.channel_object = channel_session_registry.get_channel(
+                self.channel_id)
+        return self.channel_object
 
-        session = self.create_session()
-        setattr(self, "__session", session)
-        return session
+    @property
+    def channel_object(self):
+        return self.__dict__.get('channel_object')
+
+    @channel_object.setter
+    def channel_object(self, value):
+        if value is None:
+            del self.channel_object
+        else:
+            self.__dict__['channel_object'] = value
+
+    @channel_object.deleter
+    def channel_object(self):
+        self.__dict__.pop('channel_object', None)
+        channel_session_registry.invalidate(self.channel_id)
+
+    @property
+    def _session(self):
+        return channel_session_registry.get_session(self.channel_id,
+                                                    self.create_session)
 
 
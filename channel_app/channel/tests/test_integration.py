@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from omnisdk.omnitron.models import Channel
+
+from channel_app.channel.integration import (ChannelIntegration,
+                                             ChannelSessionRegistry,
+                                             channel_session_registry)
+
+
+class TestChannelSessionRegistry(unittest.TestCase):
+    """
+    Test case for ChannelSessionRegistry
+
+    run: python -m unittest channel_app.channel.tests.test_integration.TestChannelSessionRegistry
+    """
+
+    def setUp(self):
+        self.registry = ChannelSessionRegistry()
+
+    def test_get_session_creates_session_once(self):
+        create_session = MagicMock()
+
+        first = self.registry.get_session(1, create_session)
+        second = self.registry.get_session(1, create_session)
+
+        self.assertIs(first, second)
+        create_session.assert_called_once()
+
+    @patch("channel_app.channel.integration.ChannelEndpoint")
+    def test_get_channel_is_cached_until_ttl(self, mock_endpoint):
+        mock_endpoint.return_value.retrieve.side_effect = [
+            Channel(pk=1, conf={"a": 1}), Channel(pk=1, conf={"a": 2})]
+
+        with patch("channel_app.channel.integration.time.monotonic",
+                   return_value=100):
+            first = self.registry.get_channel(1)
+            self.assertIs(self.registry.get_channel(1), first)
+        with patch("channel_app.channel.integration.time.monotonic",
+                   return_value=100 + self.registry.CHANNEL_TTL + 1):
+            second = self.registry.get_channel(1)
+
+        self.assertEqual(second.conf, {"a": 2})
+        self.assertEqual(mock_endpoint.return_value.retrieve.call_count, 2)
+
+    @patch("channel_app.channel.integration.ChannelEndpoint")
+    def test_invalidate_drops_channel_and_session(self, mock_endpoint):
+        session = MagicMock()
+        self.registry.get_session(1, lambda: session)
+        self.registry.get_channel(1)
+
+        self.registry.invalidate(1)
+
+        session.close.assert_not_called()
+        self.assertNotIn(1, self.registry.sessions)
+        self.assertNotIn(1, self.registry.channels)
+        self.registry.get_channel(1)
+        self.assertEqual(mock_endpoint.return_value.retrieve.call_count, 2)
+
+    def test_clear_closes_sessions(self):
+        sessions = [MagicMock(), MagicMock()]
+        self.registry.get_session(1, lambda: sessions[0])
+        self.registry.get_session(2, lambda: sessions[1])
+
+        self.registry.clear()
+
+        for session in sessions:
+            session.close.assert_called_once()
+        self.assertEqual(self.registry.sessions, {})
+
+
+class TestChannelIntegrationChannel(unittest.TestCase):
+    """
+    Test case for the channel refresh of ChannelIntegration
+
+    run: python -m unittest channel_app.channel.tests.test_integration.TestChannelIntegrationChannel
+    """
+
+    def setUp(self):
+        channel_session_registry.clear()
+        self.integration = ChannelIntegration.__new__(ChannelIntegration)
+        self.integration.channel_id = 1
+
+    def tearDown(self):
+        channel_session_registry.clear()
+
+    @patch("channel_app.channel.integration.ChannelEndpoint")
+    def test_deleting_channel_object_retrieves_channel_again(
+            self, mock_endpoint):
+        mock_endpoint.return_value.retrieve.side_effect = [
+            Channel(pk=1, conf={"a": 1}), Channel(pk=1, conf={"a": 2})]
+        self.assertEqual(self.integration.channel.conf, {"a": 1})
+
+        del self.integration.channel_object
+
+        self.assertEqual(self.integration.channel.conf, {"a": 2})
+
+    @patch("channel_app.channel.integration.ChannelEndpoint")
+    def test_resetting_channel_object_drops_session(self, mock_endpoint):
+        session = MagicMock()
+        channel_session_registry.get_session(1, lambda: session)
+        self.integration.channel
+
+        self.integration.channel_object = None
+
+        session.close.assert_not_called()
+        self.assertNotIn(1, channel_session_registry.sessions)
+        self.assertIsNone(self.integration.channel_object)
+        self.integration.channel
+        self.assertEqual(mock_endpoint.return_value.retrieve.call_count, 2)
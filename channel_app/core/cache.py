@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from channel_app.core.clients import RedisClient
+
+MISSING = object()
+
+
+class TTLCache(object):
+    """
+    Thread safe in-process cache whose entries expire after `ttl` seconds.
+    When `maxsize` is given the least recently used entries are dropped
+    first.
+    """
+
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # {key: (value, expires_at)}
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires_at = self._data.get(key, (MISSING, 0))
+            if value is MISSING:
+                return default
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if self.maxsize:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache(object):
+    """
+    Cache on Redis shared by the workers of a channel. Values are stored as
+    json, so the callers convert the models to and from dicts.
+    """
+    redis_prefix = "channel_app_cache"
+
+    def __init__(self, channel_id, redis_client=None):
+        self.channel_id = channel_id
+        self.redis_client = redis_client or RedisClient()
+
+    def get_key(self, key) -> str:
+        return f"{self.redis_prefix}_{self.channel_id}_{key}"
+
+    def get(self, key, default=None):
+        value = self.redis_client.get(self.get_key(key))
+        if value is None:
+            return default
+        return json.loads(value)
+
+    def get_many(self, keys) -> dict:
+        """
+        :return: {key: value} of the keys found on the cache
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.redis_client.mget([self.get_key(key) for key in keys])
+        return {key: json.loads(value) for key, value in zip(keys, values)
+                if value is not None}
+
+    def set(self, key, value, ttl):
+        self.redis_client.set(self.get_key(key), json.dumps(value, default=str),
+                              ex=int(ttl))
+
+    def set_many(self, mapping: dict, ttl):
+        if not mapping:
+            return
+        pipeline = self.redis_client.pipeline()
+        for key, value in mapping.items():
+            pipeline.set(self.get_key(key), json.dumps(value, default=str),
+                         ex=int(ttl))
+        pipeline.execute()
+
+    def delete(self, key):
+        self.redis_client.delete(self.get_key(key))
+
+
+def get_shared_cache(integration):
+    """
+    Returns the shared cache attached to the integration or None if the
+    integration does not use one.
+    """
+    cache = getattr(integration, "shared_cache", None)
+    if isinstance(cache, SharedCache):
+        return cache
+    return None
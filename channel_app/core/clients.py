@@ -1,3 +1,6 @@
+import threading
+import time
+
 from redis import Redis
 from omnisdk.omnitron.client import OmnitronApiClient as BaseOmnitronApiClient
 
@@ -16,28 +19,86 @@ class RedisClient(Redis):
 class OmnitronApiClient(BaseOmnitronApiClient):
     """
     OmnitronApiClient class for Omnitron API requests.
+
+    The token is shared by the workers through Redis. Each process also keeps
+    an in-memory copy for TOKEN_CACHE_TTL seconds, so Redis is only asked
+    when that copy expires or Omnitron rejects the token. Refreshing the
+    token is guarded by a Redis lock so that only one worker logs in when
+    the token is missing or rejected.
     """
     client_route = "api/v1/"
     redis_prefix = "omnitron_auth_token_prefix"
+    TOKEN_CACHE_TTL = 60 * 5
+    REFRESH_LOCK_TIMEOUT = 30
+    # {redis_prefix: (token, expires_at)}
+    _token_cache = {}
+    _token_cache_lock = threading.Lock()
 
-    def __init__(self, base_url, username, password):
+    def __init__(self, base_url, username, password, channel_id=None):
         self.redis_client = RedisClient()
+        self.channel_id = channel_id
         super().__init__(base_url, username, password)
 
+    @property
+    def retry_count_key(self):
+        return f"{self.redis_prefix}_{self.channel_id}_retry_count"
+
     @property
     def token(self):
+        token, expires_at = self._token_cache.get(self.redis_prefix,
+                                                  (None, 0))
+        if token and expires_at > time.monotonic():
+            return token
+
         token = self.redis_client.get(self.redis_prefix)
         if token:
             token = token.decode("utf-8")
+            self.cache_token(token)
         else:
-            # Check redis key for retry count with max 3 attempts in 6 min.
-            retry_count = int(self.redis_client.get("retry_count") or 0)
-            if retry_count < 3:
-                token = self.refresh_key()
-                self.redis_client.set("retry_count", retry_count + 1, 360)
-            else:
-                raise Exception("Login attempts exceeded 3 times in 6 min.")
+            token = self.refresh_key()
         return token
 
     def set_token(self, token):
         self.redis_client.set(self.redis_prefix, token)
+        self.cache_token(token)
+
+    def cache_token(self, token):
+        with self._token_cache_lock:
+            self._token_cache[self.redis_prefix] = (
+                token, time.monotonic() + self.TOKEN_CACHE_TTL)
+
+    def invalidate_token_cache(self):
+        with self._token_cache_lock:
+            return self._token_cache.pop(self.redis_prefix, (None, 0))[0]
+
+    def refresh_key(self):
+        """
+        Logs in to Omnitron and stores the new token. This is also called by
+        the SDK once Omnitron responds with 401. If another worker has
+        already refreshed the token while waiting for the lock, its token
+        is used instead of logging in again.
+
+        The rejected token is the one this client sent, the token cached in
+        the process may already be a refreshed one.
+        """
+        rejected_token = self.session.headers.get("Authorization")
+        self.invalidate_token_cache()
+        with self.redis_client.lock(
+                f"{self.redis_prefix}_refresh_lock",
+                timeout=self.REFRESH_LOCK_TIMEOUT,
+                blocking_timeout=self.REFRESH_LOCK_TIMEOUT):
+            token = self.redis_client.get(self.redis_prefix)
+            if token and token.decode("utf-8") != rejected_token:
+                token = token.decode("utf-8")
+                self.cache_token(token)
+                return token
+
+            # Check redis key for retry count with max 3 failed attempts in
+            # 6 min, a successful login resets it.
+            retry_count = int(self.redis_client.get(self.retry_count_key) or 0)
+            if retry_count >= 3:
+                raise Exception("Login attempts exceeded 3 times in 6 min.")
+            self.redis_client.set(self.retry_count_key, retry_count + 1, 360)
+            token = super().refresh_key()
+            self.redis_client.delete(self.retry_count_key)
+            return token
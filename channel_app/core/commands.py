@@ -4,16 +4,20 @@ from datetime import datetime
 from io import StringIO
 from typing import List, Any
 
-from omnisdk.omnitron.models import BatchRequest
+from omnisdk.omnitron.endpoints import ChannelIntegrationActionEndpoint
+from omnisdk.omnitron.models import BatchRequest, IntegrationAction
 from requests import HTTPError, Request, Response
 
 from channel_app.core.data import ErrorReportDto
+from channel_app.core.instrumentation import instrumentation
 from channel_app.core.integration import BaseIntegration
 from channel_app.omnitron.batch_request import ClientBatchRequest
 from channel_app.omnitron.constants import BatchRequestStatus, ContentType
 from channel_app.omnitron.exceptions import (AppException, CityException,
                                              TownshipException,
                                              DistrictException)
+from channel_app.omnitron.integration_action_mirror import \
+    get_integration_action_mirror
 
 logger = logging.getLogger(__name__)
 
@@ -91,11 +95,16 @@ class ChannelCommandInterface(CommandInterface):
         This method must also call necessary command interface methods.
         :return: returns to response of the command if it has one.
         """
-        data = self.get_data()
-        validated_data = self.validated_data(data)
-        transformed_data = self.transform_data(validated_data)
-        response = self.send_request(transformed_data=transformed_data)
-        normalize_data = self.normalize_response(
+        run_phase = instrumentation.run_phase
+        data = run_phase("get_data", self.get_data)
+        validated_data = run_phase("validated_data", self.validated_data,
+                                   data)
+        transformed_data = run_phase("transform_data", self.transform_data,
+                                     validated_data)
+        response = run_phase("send_request", self.send_request,
+                             transformed_data=transformed_data)
+        normalize_data = run_phase(
+            "normalize_response", self.normalize_response,
             data=data,
             validated_data=validated_data,
             transformed_data=transformed_data,
@@ -203,10 +212,13 @@ class OmnitronCommandInterface(CommandInterface):
         formatted_data = None
         raw_request, raw_response = None, None
         try:
-            model_items = self.validated_data(self.get_data())
-            response = self.send(validated_data=model_items)
-            normalize_data = self.normalize_response(data=model_items,
-                                                     response=response)
+            run_phase = instrumentation.run_phase
+            model_items = run_phase("validated_data", self.validated_data,
+                                    run_phase("get_data", self.get_data))
+            response = run_phase("send", self.send, validated_data=model_items)
+            normalize_data = run_phase("normalize_response",
+                                       self.normalize_response,
+                                       data=model_items, response=response)
             if isinstance(normalize_data, list):
                 formatted_data = [model_obj for model_obj in normalize_data
                                   if
@@ -352,6 +364,38 @@ class OmnitronCommandInterface(CommandInterface):
             self.integration.batch_request)
         return state
 
+    def get_integration_actions_with_object_ids(
+            self, content_type: str, object_ids: list,
+            **filters) -> List[IntegrationAction]:
+        """
+        Fetches the integration actions of the objects. If the integration
+        uses an integration action mirror, only the objects that are missing
+        on the mirror are requested from Omnitron.
+
+        :param content_type: String values of the ContentType enum model
+        :param object_ids: Omnitron ids of the objects
+        :param filters: Extra filters such as status
+        """
+        def fetch(ids):
+            endpoint = ChannelIntegrationActionEndpoint(
+                channel_id=self.integration.channel_id)
+            params = {"object_id__in": ",".join(str(pk) for pk in ids),
+                      "content_type_name": content_type,
+                      "channel_id": self.integration.channel_id,
+                      "sort": "id"}
+            params.update(filters)
+            integration_actions = endpoint.list(params=params)
+            for batch in endpoint.iterator:
+                if not batch:
+                    break
+                integration_actions.extend(batch)
+            return integration_actions
+
+        mirror = get_integration_action_mirror(self.integration)
+        if not mirror:
+            return fetch(object_ids)
+        return mirror.lookup(content_type, object_ids, fetch=fetch, **filters)
+
     def create_batch_objects(self, data: list, content_type: str) -> List[dict]:
         """
         In batch requests, you can attach Omnitron objects that are being processed in that batch
@@ -114,6 +114,14 @@ class BatchRequestResponseDto:
     message: Optional[str] = ''
 
 
+@dataclass
+class IntegrationActionResultDto:
+    status: ResponseStatus
+    item: object  # data sent to create or update the integration action
+    integration_action: Optional[object] = None
+    message: Optional[str] = ''
+
+
 @dataclass
 class OrderBatchRequestResponseDto:
     status: ResponseStatus
@@ -0,0 +1,333 @@
+import abc
+import contextvars
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+from celery.signals import worker_process_shutdown, worker_shutdown
+
+logger = logging.getLogger(__name__)
+
+# Measurements which are open on the current thread/task. Nested actions
+# and http calls are added to all of them, so the measurements of an outer
+# command include the ones of the commands it runs.
+_open_measurements = contextvars.ContextVar("open_measurements", default=())
+
+
+def count_objects(objects) -> int:
+    if objects is None:
+        return 0
+    if isinstance(objects, (list, tuple, set, dict)):
+        return len(objects)
+    return 1
+
+
+class Measurement(object):
+    """
+    Counters of a single `do_action` call or a phase of a command run.
+    """
+
+    def __init__(self, key: str, phase: str, objects: int = 0):
+        self.key = key
+        self.phase = phase
+        self.objects = objects
+        self.duration = 0.0
+        self.http_calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+
+    def add_http_call(self, bytes_sent: int, bytes_received: int):
+        with self._lock:
+            self.http_calls += 1
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+
+    def as_dict(self) -> dict:
+        return {"key": self.key,
+                "phase": self.phase,
+                "duration": self.duration,
+                "http_calls": self.http_calls,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "objects": self.objects}
+
+
+class MetricsBackend(abc.ABC):
+    @abc.abstractmethod
+    def record(self, measurement: Measurement):
+        pass
+
+    def flush(self):
+        pass
+
+
+class AggregatingBackend(MetricsBackend):
+    """
+    Keeps the totals of the measurements per command key and phase.
+    """
+    metric_prefix = "channel_app_command"
+    # (metric name, measurement attribute, help text)
+    metrics = (
+        ("calls_total", None, "Number of runs"),
+        ("duration_seconds_total", "duration", "Wall time spent"),
+        ("http_requests_total", "http_calls", "Number of http requests"),
+        ("sent_bytes_total", "bytes_sent", "Bytes sent with http requests"),
+        ("received_bytes_total", "bytes_received",
+         "Bytes received with http responses"),
+        ("objects_total", "objects", "Number of objects processed"),
+    )
+
+    def __init__(self):
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, measurement: Measurement):
+        with self._lock:
+            totals = self.totals.setdefault(
+                (measurement.key, measurement.phase),
+                dict.fromkeys([name for name, _, _ in self.metrics], 0))
+            for name, attribute, _ in self.metrics:
+                totals[name] += getattr(measurement, attribute) \
+                    if attribute else 1
+
+    def to_prometheus_text(self, labels: dict = None) -> str:
+        """
+        :param labels: labels added to every sample, e.g. {"pid": 10}
+        """
+        extra_labels = "".join(f',{name}="{value}"'
+                               for name, value in (labels or {}).items())
+        with self._lock:
+            totals = {labels: dict(values)
+                      for labels, values in self.totals.items()}
+        lines = []
+        for name, _, help_text in self.metrics:
+            metric = f"{self.metric_prefix}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (key, phase), values in sorted(totals.items()):
+                lines.append(f'{metric}{{key="{key}",phase="{phase}"'
+                             f'{extra_labels}}} {values[name]}')
+        return "\n".join(lines) + "\n"
+
+
+class PrometheusFileBackend(AggregatingBackend):
+    """
+    Writes the totals in Prometheus text format to the file at most once in
+    `flush_interval` seconds, e.g. for the textfile collector of the node
+    exporter. The file is replaced atomically.
+
+    Each process keeps its own totals, e.g. the prefork Celery workers, so
+    each one writes its own file with the pid added to the name of the
+    file ("channel_app.prom" -> "channel_app.1234.prom") and as a label of
+    the samples. The collector merges the files of the directory.
+    """
+    FLUSH_INTERVAL = 15
+
+    def __init__(self, path: str, flush_interval: int = None):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.last_flush = time.monotonic()
+
+    def record(self, measurement: Measurement):
+        super().record(measurement)
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def get_process_path(self, pid: int) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{pid}{ext}"
+
+    def flush(self):
+        self.last_flush = time.monotonic()
+        # Read on every flush, the workers are forked after the backend is
+        # configured.
+        pid = os.getpid()
+        path = self.get_process_path(pid)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus_text(labels={"pid": pid}))
+        os.replace(tmp_path, path)
+
+
+class StatsdBackend(MetricsBackend):
+    """
+    Sends each measurement to a StatsD server over udp.
+    """
+
+    def __init__(self, host: str, port: int = 8125,
+                 prefix: str = "channel_app"):
+        self.address = (host, int(port))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def format(self, measurement: Measurement) -> List[str]:
+        name = f"{self.prefix}.{measurement.key}.{measurement.phase}"
+        return [f"{name}.duration:{measurement.duration * 1000:.3f}|ms",
+                f"{name}.http_calls:{measurement.http_calls}|c",
+                f"{name}.bytes_sent:{measurement.bytes_sent}|c",
+                f"{name}.bytes_received:{measurement.bytes_received}|c",
+                f"{name}.objects:{measurement.objects}|c"]
+
+    def record(self, measurement: Measurement):
+        try:
+            self.socket.sendto(
+                "\n".join(self.format(measurement)).encode("utf-8"),
+                self.address)
+        except OSError:
+            logger.exception("Metrics could not be sent to StatsD")
+
+
+class FileBackend(MetricsBackend):
+    """
+    Appends each measurement to the file as a json line.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, measurement: Measurement):
+        line = json.dumps(measurement.as_dict())
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class Instrumentation(object):
+    """
+    Measures the wall time, http calls, transferred bytes and object counts
+    of `do_action` calls and command phases, and hands them to the backends.
+    Nothing is measured while there are no backends.
+
+    Http calls are counted by a response hook, so sessions must be
+    registered with `instrument_session`.
+    """
+
+    def __init__(self, backends: List[MetricsBackend] = None):
+        self.backends = list(backends or [])
+        self.configured = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backends)
+
+    def add_backend(self, backend: MetricsBackend):
+        self.backends.append(backend)
+
+    def current_key(self):
+        measurements = _open_measurements.get()
+        return measurements[-1].key if measurements else None
+
+    @contextmanager
+    def measure(self, key: str, phase: str, objects=None):
+        measurement = Measurement(key=key, phase=phase,
+                                  objects=count_objects(objects))
+        token = _open_measurements.set(
+            _open_measurements.get() + (measurement,))
+        start = time.perf_counter()
+        try:
+            yield measurement
+        finally:
+            measurement.duration = time.perf_counter() - start
+            _open_measurements.reset(token)
+            self.record(measurement)
+
+    def run_phase(self, phase: str, func, *args, **kwargs):
+        """
+        Runs a phase of a command and measures it under the key of the
+        action being run. The result of the phase is taken as its objects.
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        key = self.current_key() or type(
+            getattr(func, "__self__", func)).__name__
+        with self.measure(key, phase) as measurement:
+            result = func(*args, **kwargs)
+            measurement.objects = count_objects(result)
+        return result
+
+    def record(self, measurement: Measurement):
+        for backend in self.backends:
+            try:
+                backend.record(measurement)
+            except Exception:
+                logger.exception("Measurement could not be recorded")
+
+    def flush(self):
+        for backend in self.backends:
+            try:
+                backend.flush()
+            except Exception:
+                logger.exception("Metrics could not be flushed")
+
+    def response_hook(self, response, *args, **kwargs):
+        measurements = _open_measurements.get()
+        if not measurements:
+            return response
+        body = response.request.body or b""
+        bytes_sent = len(body) if isinstance(body, (bytes, str)) else 0
+        bytes_received = self.get_bytes_received(response)
+        for measurement in measurements:
+            measurement.add_http_call(bytes_sent, bytes_received)
+        return response
+
+    @staticmethod
+    def get_bytes_received(response) -> int:
+        """
+        Size of the response body from its Content-Length header, or from
+        the body if it is already read. The body is not read here so that
+        streamed responses stay streamed, which counts them as 0.
+        """
+        content_length = response.headers.get("Content-Length")
+        if content_length:
+            return int(content_length)
+        content = getattr(response, "_content", None)
+        if isinstance(content, bytes):
+            return len(content)
+        return 0
+
+    def instrument_session(self, session):
+        hooks = session.hooks.setdefault("response", [])
+        if self.response_hook not in hooks:
+            hooks.append(self.response_hook)
+        return session
+
+
+instrumentation = Instrumentation()
+
+
+def configure_instrumentation(settings):
+    """
+    Adds the backends listed in `settings.INSTRUMENTATION_BACKENDS` once per
+    process. Available backends are "statsd", "prometheus" and "file".
+    """
+    if instrumentation.configured:
+        return
+    instrumentation.configured = True
+    backends = getattr(settings, "INSTRUMENTATION_BACKENDS", "") or ""
+    for name in [name.strip() for name in backends.split(",") if name.strip()]:
+        if name == "statsd":
+            instrumentation.add_backend(StatsdBackend(
+                host=settings.STATSD_HOST,
+                port=settings.STATSD_PORT,
+                prefix=settings.STATSD_PREFIX))
+        elif name == "prometheus":
+            instrumentation.add_backend(PrometheusFileBackend(
+                path=settings.INSTRUMENTATION_PROMETHEUS_FILE))
+        elif name == "file":
+            instrumentation.add_backend(FileBackend(
+                path=settings.INSTRUMENTATION_FILE))
+        else:
+            logger.warning(f"Unknown instrumentation backend: {name}")
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def flush_instrumentation(**kwargs):
+    instrumentation.flush()
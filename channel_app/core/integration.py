@@ -4,6 +4,8 @@ from typing import Any
 from omnisdk.omnitron.endpoints import CatalogEndpoint, ChannelEndpoint
 from omnisdk.omnitron.models import Catalog, Channel
 
+from channel_app.core.instrumentation import instrumentation
+
 
 class BaseIntegration(object):
     """
@@ -30,7 +32,11 @@ class BaseIntegration(object):
         """
         action_class = self.get_action(key)
         action_object = action_class(integration=self, **kwargs)
-        return action_object.run()
+        if not instrumentation.enabled:
+            return action_object.run()
+        with instrumentation.measure(key, "do_action",
+                                     objects=kwargs.get("objects")):
+            return action_object.run()
 
     def do_action_async_run(self, key: str, **kwargs) -> Any:
         """
@@ -47,7 +53,11 @@ class BaseIntegration(object):
 
         action_class = self.get_action(key)
         action_object = action_class(integration=self, **kwargs)
-        return asyncio.run(action_object.run_async())
+        if not instrumentation.enabled:
+            return asyncio.run(action_object.run_async())
+        with instrumentation.measure(key, "do_action",
+                                     objects=kwargs.get("objects")):
+            return asyncio.run(action_object.run_async())
 
     @property
     def catalog(self) -> Catalog:
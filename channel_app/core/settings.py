@@ -22,6 +22,28 @@ DEFAULT_CONNECTION_POOL_COUNT = os.getenv("DEFAULT_CONNECTION_POOL_COUNT") or 10
 DEFAULT_CONNECTION_POOL_MAX_SIZE = os.getenv("DEFAULT_CONNECTION_POOL_COUNT") or 10
 DEFAULT_CONNECTION_POOL_RETRY = os.getenv("DEFAULT_CONNECTION_POOL_RETRY") or 0
 REQUEST_LOG = os.getenv("REQUEST_LOG") or False
+INTEGRATION_ACTION_MIRROR = os.getenv("INTEGRATION_ACTION_MIRROR") or False
+# Shares the lookup caches of the order commands between workers on Redis
+SHARED_CACHE = os.getenv("SHARED_CACHE") or False
+# Sends the error reports in bulk, create_error_report then returns no report
+BUFFER_ERROR_REPORTS = os.getenv("BUFFER_ERROR_REPORTS") or False
+# Seconds to keep attribute configs on Redis, the cache is disabled unless
+# given. Configs edited on Omnitron are seen after this many seconds.
+ATTRIBUTE_CONFIG_CACHE_TTL = os.getenv("ATTRIBUTE_CONFIG_CACHE_TTL") or 0
+# Fetches product categories with product__in queries, Omnitron must support
+# the filter
+PRODUCT_CATEGORY_BATCHED = os.getenv("PRODUCT_CATEGORY_BATCHED") or False
+CATEGORY_ATTRIBUTE_FINGERPRINTS = os.getenv("CATEGORY_ATTRIBUTE_FINGERPRINTS") or False
+CATEGORY_ATTRIBUTES_MAX_WORKERS = os.getenv("CATEGORY_ATTRIBUTES_MAX_WORKERS") or 1
+ORDER_CREATION_MAX_WORKERS = os.getenv("ORDER_CREATION_MAX_WORKERS") or 1
+# Comma separated list of statsd, prometheus and file. The prometheus backend
+# writes one file per process, with the pid added before the extension
+INSTRUMENTATION_BACKENDS = os.getenv("INSTRUMENTATION_BACKENDS") or ""
+STATSD_HOST = os.getenv("STATSD_HOST") or "localhost"
+STATSD_PORT = os.getenv("STATSD_PORT") or 8125
+STATSD_PREFIX = os.getenv("STATSD_PREFIX") or "channel_app"
+INSTRUMENTATION_PROMETHEUS_FILE = os.getenv("INSTRUMENTATION_PROMETHEUS_FILE") or "channel_app.prom"
+INSTRUMENTATION_FILE = os.getenv("INSTRUMENTATION_FILE") or "channel_app_metrics.jsonl"
 
 omnitron_module = importlib.import_module(os.getenv("OMNITRON_MODULE"))
 OmnitronIntegration = omnitron_module.OmnitronIntegration
@@ -0,0 +1,40 @@
+import unittest
+from unittest.mock import patch
+
+from channel_app.core.cache import TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """
+    Test case for TTLCache
+
+    run: python -m unittest channel_app.core.tests.test_cache.TestTTLCache
+    """
+
+    def test_expired_entries_are_dropped(self):
+        cache = TTLCache(ttl=10)
+        with patch("channel_app.core.cache.time.monotonic", return_value=100):
+            cache.set("key", "value")
+        with patch("channel_app.core.cache.time.monotonic", return_value=105):
+            self.assertEqual(cache.get("key"), "value")
+        with patch("channel_app.core.cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("key"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_entries_are_dropped(self):
+        cache = TTLCache(ttl=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_cached_none_is_distinguished_from_missing_key(self):
+        cache = TTLCache(ttl=10)
+        cache.set("key", None)
+
+        self.assertIsNone(cache.get("key", default=False))
+        self.assertFalse(cache.get("other", default=False))
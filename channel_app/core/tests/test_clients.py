@@ -18,6 +18,7 @@ class TestOmnitronApiClient(unittest.TestCase):
     @patch('requests.Session')
     def setUp(self, mock_session, mock_redis_client):
         self.redis_con.flushall()
+        OmnitronApiClient._token_cache.clear()
         mock_redis_client.return_value = self.redis_con
         # Create a mock session and set it as the return value of
         # requests.Session()
@@ -79,6 +80,30 @@ class TestOmnitronApiClient(unittest.TestCase):
             "Token updated_key"
         )
 
+    def test_refresh_key_uses_token_refreshed_by_another_client(self):
+        self.mock_session.reset_mock()
+        self.mock_session.headers = {"Authorization": self.test_token}
+        # Another client of the process refreshed the token
+        self.client.set_token("Token refreshed_key")
+
+        token = self.client.refresh_key()
+
+        self.assertEqual(token, "Token refreshed_key")
+        self.mock_session.post.assert_not_called()
+
+    def test_refresh_key_resets_retry_count_after_login(self):
+        self.mock_session.headers = {}
+        for index in range(5):
+            self.mock_session.post.return_value = Mock(
+                status_code=200,
+                json=Mock(return_value={"key": f"key_{index}"})
+            )
+            self.mock_session.headers["Authorization"] = self.client.token
+
+            self.assertEqual(self.client.refresh_key(), f"Token key_{index}")
+
+        self.assertIsNone(self.redis_con.get(self.client.retry_count_key))
+
     def test_refresh_key_with_authentication_error(self):
         self.redis_con.flushall()
         self.mock_session.reset_mock()
@@ -139,13 +164,14 @@ class TestOmnitronApiClient(unittest.TestCase):
             new_token
         )
         self.assertEqual(
-            int(self.redis_con.get("retry_count").decode("utf-8")),
+            int(self.redis_con.get(self.client.retry_count_key).decode("utf-8")),
             1
         )
 
     def test_retry_count(self):
         self.redis_con.flushall()
         for i in range(3):
+            self.client.invalidate_token_cache()
             token = self.client.token
             self.assertEqual(
                 token,
@@ -153,12 +179,24 @@ class TestOmnitronApiClient(unittest.TestCase):
             )
             self.redis_con.delete(self.client.redis_prefix)
         with self.assertRaises(Exception) as context:
+            self.client.invalidate_token_cache()
             self.client.token
         self.assertIn(
             "Login attempts exceeded 3 times in 6 min.",
             str(context.exception)
         )
         self.assertEqual(
-            int(self.redis_con.get("retry_count").decode("utf-8")),
+            int(self.redis_con.get(self.client.retry_count_key).decode("utf-8")),
             i + 1
         )
+
+    def test_token_is_cached_in_memory(self):
+        self.redis_con.delete(self.client.redis_prefix)
+        self.assertEqual(self.client.token, self.test_token)
+        self.mock_session.post.assert_called_once()
+
+    def test_refresh_key_uses_token_refreshed_by_another_worker(self):
+        self.mock_session.reset_mock()
+        self.redis_con.set(self.client.redis_prefix, "Token other_key")
+        self.assertEqual(self.client.refresh_key(), "Token other_key")
+        self.mock_session.post.assert_not_called()
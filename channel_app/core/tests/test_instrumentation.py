@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, PropertyMock
+
+from channel_app.core.commands import OmnitronCommandInterface
+from channel_app.core.instrumentation import (AggregatingBackend,
+                                              Instrumentation,
+                                              MetricsBackend,
+                                              PrometheusFileBackend,
+                                              instrumentation)
+from channel_app.core.integration import BaseIntegration
+from channel_app.core.utilities import run_concurrently
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Test case for Instrumentation
+
+    run: python -m unittest channel_app.core.tests.test_instrumentation.TestInstrumentation
+    """
+
+    def setUp(self) -> None:
+        self.backend = AggregatingBackend()
+        self.instrumentation = Instrumentation(backends=[self.backend])
+
+    def get_response(self, body=b"{}", content=b"[1, 2]"):
+        return Mock(request=Mock(body=body), headers={}, _content=content)
+
+    def test_response_hook_does_not_read_unread_body(self):
+        response = Mock(request=Mock(body=None), headers={}, _content=False)
+        type(response).content = PropertyMock(
+            side_effect=AssertionError("body is read"))
+
+        with self.instrumentation.measure("outer", "do_action"):
+            self.instrumentation.response_hook(response)
+            response.headers = {"Content-Length": "7"}
+            self.instrumentation.response_hook(response)
+
+        totals = self.backend.totals[("outer", "do_action")]
+        self.assertEqual(totals["received_bytes_total"], 7)
+
+    def test_measure_counts_http_calls_of_nested_measurements(self):
+        with self.instrumentation.measure("outer", "do_action", objects=[1]):
+            with self.instrumentation.measure("inner", "do_action"):
+                self.instrumentation.response_hook(self.get_response())
+            self.instrumentation.response_hook(self.get_response())
+
+        outer = self.backend.totals[("outer", "do_action")]
+        inner = self.backend.totals[("inner", "do_action")]
+        self.assertEqual(outer["http_requests_total"], 2)
+        self.assertEqual(outer["sent_bytes_total"], 4)
+        self.assertEqual(outer["received_bytes_total"], 12)
+        self.assertEqual(outer["objects_total"], 1)
+        self.assertEqual(inner["http_requests_total"], 1)
+
+    def test_measurements_are_visible_to_run_concurrently(self):
+        with self.instrumentation.measure("outer", "do_action"):
+            run_concurrently(
+                lambda _: self.instrumentation.response_hook(
+                    self.get_response()),
+                range(4), max_workers=2)
+
+        totals = self.backend.totals[("outer", "do_action")]
+        self.assertEqual(totals["http_requests_total"], 4)
+
+    def test_run_phase(self):
+        with self.instrumentation.measure("get_products", "do_action"):
+            result = self.instrumentation.run_phase("get_data",
+                                                    lambda: [1, 2, 3])
+
+        self.assertEqual(result, [1, 2, 3])
+        totals = self.backend.totals[("get_products", "get_data")]
+        self.assertEqual(totals["calls_total"], 1)
+        self.assertEqual(totals["objects_total"], 3)
+
+    def test_to_prometheus_text(self):
+        with self.instrumentation.measure("get_products", "do_action"):
+            pass
+
+        text = self.backend.to_prometheus_text()
+        self.assertIn("# TYPE channel_app_command_calls_total counter", text)
+        self.assertIn('channel_app_command_calls_total{key="get_products",'
+                      'phase="do_action"} 1', text)
+
+    def test_prometheus_file_per_process(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backend = PrometheusFileBackend(
+                path=os.path.join(directory, "channel_app.prom"))
+            backend.totals[("get_products", "do_action")] = dict.fromkeys(
+                [name for name, _, _ in backend.metrics], 1)
+
+            backend.flush()
+
+            pid = os.getpid()
+            self.assertEqual(os.listdir(directory),
+                             [f"channel_app.{pid}.prom"])
+            with open(os.path.join(directory,
+                                   f"channel_app.{pid}.prom")) as f:
+                self.assertIn('channel_app_command_calls_total{'
+                              'key="get_products",phase="do_action",'
+                              f'pid="{pid}"}} 1', f.read())
+
+    def test_metrics_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            MetricsBackend()
+
+
+class TestDoActionInstrumentation(unittest.TestCase):
+    """
+    Test case for the instrumentation of BaseIntegration.do_action
+
+    run: python -m unittest channel_app.core.tests.test_instrumentation.TestDoActionInstrumentation
+    """
+
+    def setUp(self) -> None:
+        self.backend = AggregatingBackend()
+        instrumentation.add_backend(self.backend)
+        self.integration = BaseIntegration()
+        self.integration.actions = {"test": OmnitronCommandInterface}
+        self.integration.batch_request = None
+
+    def tearDown(self) -> None:
+        instrumentation.backends.remove(self.backend)
+
+    def test_do_action(self):
+        self.integration.do_action(key="test", objects=[1, 2])
+
+        self.assertEqual(
+            self.backend.totals[("test", "do_action")]["objects_total"], 2)
+        for phase in ("get_data", "validated_data", "send",
+                      "normalize_response"):
+            self.assertEqual(
+                self.backend.totals[("test", phase)]["calls_total"], 1)
@@ -0,0 +1,79 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from celery.utils.threads import LocalStack
+from redis import Redis
+
+os.environ.setdefault("OMNITRON_MODULE", "channel_app.omnitron.integration")
+os.environ.setdefault("CHANNEL_MODULE", "channel_app.channel.integration")
+
+from channel_app.core.utilities import LockTask  # noqa: E402
+
+
+class TestLockTask(unittest.TestCase):
+    """
+    Test the locking of the LockTask class.
+
+    run: python -m unittest channel_app.core.tests.test_utilities.TestLockTask
+    """
+    redis_con = Redis()
+    lock_cache_key = "test_task"
+
+    @patch("channel_app.core.utilities.RedisClient")
+    def setUp(self, mock_redis_client):
+        self.redis_con.flushall()
+        mock_redis_client.return_value = self.redis_con
+        self.task = LockTask()
+        self.task.TTL = 10
+        self.task.request_stack = LocalStack()
+        self.task.push_request(id="task-1")
+        self.lock_key = f"{self.task.lock_prefix}_{self.lock_cache_key}"
+
+    def tearDown(self):
+        self.task.pop_request()
+
+    def test_acquire_lock(self):
+        lock_value = self.task.acquire_lock(self.lock_cache_key)
+
+        self.assertEqual(lock_value, "1:task-1")
+        self.assertEqual(self.redis_con.get(self.lock_key).decode("utf-8"),
+                         lock_value)
+        self.assertGreater(self.redis_con.pttl(self.lock_key), 0)
+
+    def test_acquire_lock_when_locked(self):
+        self.task.acquire_lock(self.lock_cache_key)
+
+        self.assertIsNone(self.task.acquire_lock(self.lock_cache_key))
+        self.assertEqual(
+            self.redis_con.get(self.lock_key).decode("utf-8"), "1:task-1")
+
+    def test_fencing_tokens_increase(self):
+        tokens = []
+        for _ in range(3):
+            lock_value = self.task.acquire_lock(self.lock_cache_key)
+            # failed acquisitions do not consume a token
+            self.assertIsNone(self.task.acquire_lock(self.lock_cache_key))
+            tokens.append(int(lock_value.split(":")[0]))
+            self.task.release_lock(self.lock_key, lock_value)
+
+        self.assertEqual(tokens, [1, 2, 3])
+
+    def test_renew_lock(self):
+        lock_value = self.task.acquire_lock(self.lock_cache_key)
+        self.redis_con.pexpire(self.lock_key, 1000)
+
+        self.assertEqual(self.task.renew_lock_script(
+            keys=[self.lock_key], args=[lock_value, 10000]), 1)
+        self.assertGreater(self.redis_con.pttl(self.lock_key), 1000)
+        self.assertEqual(self.task.renew_lock_script(
+            keys=[self.lock_key], args=["2:task-2", 10000]), 0)
+
+    def test_release_lock(self):
+        lock_value = self.task.acquire_lock(self.lock_cache_key)
+
+        self.task.release_lock(self.lock_key, "2:task-2")
+        self.assertIsNotNone(self.redis_con.get(self.lock_key))
+
+        self.task.release_lock(self.lock_key, lock_value)
+        self.assertIsNone(self.redis_con.get(self.lock_key))
@@ -1,5 +1,8 @@
+import contextvars
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from celery import current_app as app
 from requests import Response, Request
@@ -10,13 +13,55 @@ logger = logging.getLogger(__name__)
 
 
 class LockTask(app.Task):
-    """this abstract class ensures the same tasks run only once at a time"""
+    """
+    This abstract class ensures the same tasks run only once at a time.
+
+    The lock is a Redis key set by a Lua script, so acquiring it is a single
+    round-trip. While the task runs, a heartbeat thread renews the
+    lock before it expires; if the worker dies the lock is released after
+    TTL. Each acquisition gets an increasing fencing token which is
+    available as `self.request.fencing_token` to guard writes against a
+    holder whose lock has expired.
+    """
     abstract = True
+    lock_prefix = "task_lock"
+    fencing_token_prefix = "task_lock_fencing_token"
+
+    # Sets the lock with the next fencing token if it is free, the token is
+    # not consumed when the lock is held by another task
+    ACQUIRE_SCRIPT = """
+    if redis.call("exists", KEYS[1]) == 1 then
+        return false
+    end
+    local value = redis.call("incr", KEYS[2]) .. ":" .. ARGV[1]
+    redis.call("set", KEYS[1], value, "PX", ARGV[2])
+    return value
+    """
+    # Extends the expiry only if the lock still belongs to the caller
+    RENEW_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("pexpire", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    # Deletes the lock only if it still belongs to the caller
+    RELEASE_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
 
     def __init__(self, *args, **kwargs):
         from channel_app.core import settings
         self.TTL = getattr(settings, 'DEFAULT_TASK_LOCK_TTL', 60 * 15)
         self.redis = RedisClient()
+        self.acquire_lock_script = self.redis.register_script(
+            self.ACQUIRE_SCRIPT)
+        self.renew_lock_script = self.redis.register_script(
+            self.RENEW_SCRIPT)
+        self.release_lock_script = self.redis.register_script(
+            self.RELEASE_SCRIPT)
         super(LockTask, self).__init__(*args, **kwargs)
 
     def generate_lock_cache_key(self, *args, **kwargs):
@@ -31,27 +76,58 @@ class LockTask(app.Task):
         if not lock_cache_key:
             lock_cache_key = self.generate_lock_cache_key(*args, **kwargs)
 
-        if self.lock_acquired(lock_cache_key):
-            try:
-                return self.run(*args, **kwargs)
-            finally:
-                pass
-        else:
+        lock_key = f"{self.lock_prefix}_{lock_cache_key}"
+        lock_value = self.acquire_lock(lock_cache_key)
+        if not lock_value:
             return f'Task {self.name} is already running..'
 
-    def lock_acquired(self, lock_cache_key):
-        lock_acquired = True
-        app_inspect = self.app.control.inspect()
-        active_task = app_inspect.active(safe=True)
-        if not active_task:
-            return lock_acquired
-        for worker_name, task_list in active_task.items():
-            for task in task_list:
-                if (task.get("name", None) == lock_cache_key) and (
-                        self.request.id != task['id']):
-                    lock_acquired = False
-                    break
-        return lock_acquired
+        self.request.fencing_token = int(lock_value.split(":")[0])
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(target=self.renew_lock,
+                                     args=(lock_key, lock_value,
+                                           heartbeat_stop),
+                                     daemon=True)
+        heartbeat.start()
+        try:
+            return self.run(*args, **kwargs)
+        finally:
+            heartbeat_stop.set()
+            heartbeat.join()
+            self.release_lock(lock_key, lock_value)
+
+    def acquire_lock(self, lock_cache_key):
+        """
+        :return: Lock value as "{fencing_token}:{task_id}" if the lock is
+            acquired, otherwise None
+        """
+        lock_value = self.acquire_lock_script(
+            keys=[f"{self.lock_prefix}_{lock_cache_key}",
+                  f"{self.fencing_token_prefix}_{lock_cache_key}"],
+            args=[str(self.request.id), int(self.TTL * 1000)])
+        if not lock_value:
+            return None
+        if isinstance(lock_value, bytes):
+            lock_value = lock_value.decode()
+        return lock_value
+
+    def renew_lock(self, lock_key, lock_value, stop_event):
+        interval = self.TTL / 3
+        while not stop_event.wait(interval):
+            try:
+                is_renewed = self.renew_lock_script(
+                    keys=[lock_key], args=[lock_value, int(self.TTL * 1000)])
+            except Exception as e:
+                logger.warning(f"{lock_key} lock renewal failed: {str(e)}")
+                continue
+            if not is_renewed:
+                logger.warning(f"{lock_key} lock is lost, it is not renewed")
+                return
+
+    def release_lock(self, lock_key, lock_value):
+        try:
+            self.release_lock_script(keys=[lock_key], args=[lock_value])
+        except Exception as e:
+            logger.warning(f"{lock_key} lock release failed: {str(e)}")
 
 
 def split_list(lst, n):
@@ -65,6 +141,27 @@ def split_list(lst, n):
         yield lst[i:i + n]
 
 
+def run_concurrently(func, items, max_workers=5):
+    """
+    Calls func for each item on a bounded thread pool
+    :param func: callable which takes a single item
+    :param items: iterable of items
+    :param max_workers: maximum number of calls in flight at the same time
+    :return list of results in the order of items
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    # Calls run in the context of the caller, so that context variables
+    # like the open instrumentation measurements are visible to them.
+    with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, func, item)
+                   for item in items]
+        return [future.result() for future in futures]
+
+
 def request_log():
     import logging
     try:
@@ -0,0 +1,68 @@
+import json
+from typing import Callable, List
+
+from omnisdk.omnitron.models import ChannelAttributeConfig
+
+from channel_app.core.clients import RedisClient
+
+
+class AttributeConfigCache(object):
+    """
+    Attribute configs of the attribute sets of a channel stored on Redis for
+    TTL seconds, so that the workers do not download the same config pages
+    for every batch.
+
+    The configs of an attribute set are invalidated when one of them is
+    created or updated through the channel app. Configs edited on Omnitron
+    are seen once their entry expires, so the cache is only used when the
+    ATTRIBUTE_CONFIG_CACHE_TTL setting is given.
+    """
+    redis_prefix = "attribute_config_cache"
+    TTL = 60 * 60
+
+    def __init__(self, channel_id, redis_client=None, ttl=None):
+        self.channel_id = channel_id
+        self.redis_client = redis_client or RedisClient()
+        self.ttl = int(ttl or self.TTL)
+
+    def get_key(self, attribute_set_id) -> str:
+        return f"{self.redis_prefix}_{self.channel_id}_{attribute_set_id}"
+
+    @staticmethod
+    def serialize(configs: List[ChannelAttributeConfig]) -> str:
+        return json.dumps([vars(config) for config in configs], default=str)
+
+    @staticmethod
+    def deserialize(value) -> List[ChannelAttributeConfig]:
+        return [ChannelAttributeConfig(**config)
+                for config in json.loads(value)]
+
+    def get(self, attribute_set_id,
+            fetch: Callable[[], List[ChannelAttributeConfig]]
+            ) -> List[ChannelAttributeConfig]:
+        """
+        Returns the configs of the attribute set, `fetch` is called to get
+        them from Omnitron if they are not cached.
+        """
+        key = self.get_key(attribute_set_id)
+        value = self.redis_client.get(key)
+        if value:
+            return self.deserialize(value)
+
+        configs = fetch()
+        self.redis_client.set(key, self.serialize(configs), ex=self.ttl)
+        return configs
+
+    def invalidate(self, attribute_set_id):
+        self.redis_client.delete(self.get_key(attribute_set_id))
+
+
+def get_attribute_config_cache(integration):
+    """
+    Returns the cache attached to the integration or None if the integration
+    does not use one.
+    """
+    cache = getattr(integration, "attribute_config_cache", None)
+    if isinstance(cache, AttributeConfigCache):
+        return cache
+    return None
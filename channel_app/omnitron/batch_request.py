@@ -1,3 +1,6 @@
+import threading
+import time
+
 from omnisdk.omnitron.endpoints import ChannelBatchRequestEndpoint
 from omnisdk.omnitron.models import BatchRequest
 
@@ -85,3 +88,71 @@ class ClientBatchRequest(object):
         return self.endpoint(channel_id=self.channel_id).update(
             id=batch_request.pk, item=br)
 
+
+class BatchRequestCommitBuffer(object):
+    """
+    Collects the objects of a batch request and commits them in bulk instead
+    of one commit per processed item. Objects are committed once
+    `flush_size` objects are waiting, `flush_interval` seconds passed since
+    the last commit or `flush` is called at the end of the flow. A commit
+    carries at most `max_commit_size` objects, larger flushes are split.
+    """
+    FLUSH_SIZE = 500
+    FLUSH_INTERVAL = 30
+    MAX_COMMIT_SIZE = 1000
+
+    def __init__(self, integration, flush_size=None, flush_interval=None,
+                 max_commit_size=None):
+        self.integration = integration
+        self.flush_size = flush_size or self.FLUSH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.max_commit_size = max_commit_size or self.MAX_COMMIT_SIZE
+        self.objects = []
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def add(self, objects: list):
+        with self._lock:
+            self.objects.extend(objects)
+            if not self.should_flush():
+                return
+            objects = self._pop_objects()
+        self.commit(objects)
+
+    def flush(self):
+        with self._lock:
+            objects = self._pop_objects()
+        self.commit(objects)
+
+    def should_flush(self) -> bool:
+        if len(self.objects) >= self.flush_size:
+            return True
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def commit(self, objects: list):
+        if not objects:
+            return
+        batch_request = self.integration.batch_request
+        service = ClientBatchRequest(self.integration.channel_id)
+        with self._commit_lock:
+            for index in range(0, len(objects), self.max_commit_size):
+                batch_request.objects = \
+                    objects[index:index + self.max_commit_size]
+                service.to_commit(batch_request)
+
+    def _pop_objects(self) -> list:
+        objects, self.objects = self.objects, []
+        self.last_flush = time.monotonic()
+        return objects
+
+
+def get_batch_commit_buffer(integration):
+    """
+    Returns the commit buffer attached to the integration or None if the
+    integration does not use one.
+    """
+    buffer = getattr(integration, "batch_commit_buffer", None)
+    if isinstance(buffer, BatchRequestCommitBuffer):
+        return buffer
+    return None
@@ -0,0 +1,83 @@
+import dataclasses
+import hashlib
+import json
+from typing import List
+
+from channel_app.core.clients import RedisClient
+from channel_app.core.data import CategoryAttributeDto, CategoryDto
+
+
+class CategoryAttributeFingerprintStore(object):
+    """
+    Hashes of the channel categories whose attributes were synced to
+    Omnitron, stored on Redis. Each category keeps a hash with the
+    fingerprint of the whole category and of each of its attributes
+    (including the values):
+
+        {prefix}_{channel_id}_{category_remote_id}: field -> fingerprint
+
+    A category whose fingerprint did not change since the last sync can be
+    skipped, and only the changed attributes of a changed category need to
+    be synced.
+    """
+    redis_prefix = "category_attribute_fingerprint"
+    category_field = "__category__"
+
+    def __init__(self, channel_id, redis_client=None):
+        self.channel_id = channel_id
+        self.redis_client = redis_client or RedisClient()
+
+    def get_key(self, category_remote_id) -> str:
+        return f"{self.redis_prefix}_{self.channel_id}_{category_remote_id}"
+
+    @staticmethod
+    def fingerprint(dto) -> str:
+        data = json.dumps(dataclasses.asdict(dto), sort_keys=True, default=str)
+        return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+    def get_fingerprints(self, category: CategoryDto) -> dict:
+        fingerprints = {self.category_field: self.fingerprint(category)}
+        for attribute in category.attributes:
+            fingerprints[str(attribute.remote_id)] = self.fingerprint(
+                attribute)
+        return fingerprints
+
+    def is_changed(self, category_remote_id, category: CategoryDto) -> bool:
+        stored = self.redis_client.hget(self.get_key(category_remote_id),
+                                        self.category_field)
+        return not stored or \
+            stored.decode("utf-8") != self.fingerprint(category)
+
+    def get_changed_attributes(self, category_remote_id,
+                               category: CategoryDto
+                               ) -> List[CategoryAttributeDto]:
+        attributes = category.attributes
+        if not attributes:
+            return []
+        stored = self.redis_client.hmget(
+            self.get_key(category_remote_id),
+            [str(attribute.remote_id) for attribute in attributes])
+        return [attribute for attribute, fingerprint in zip(attributes, stored)
+                if not fingerprint or
+                fingerprint.decode("utf-8") != self.fingerprint(attribute)]
+
+    def save(self, category_remote_id, category: CategoryDto):
+        key = self.get_key(category_remote_id)
+        pipeline = self.redis_client.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping=self.get_fingerprints(category))
+        pipeline.execute()
+
+    def clear(self, category_remote_id):
+        self.redis_client.delete(self.get_key(category_remote_id))
+
+
+def get_category_attribute_fingerprint_store(integration):
+    """
+    Returns the fingerprint store attached to the integration or None if the
+    integration does not use one.
+    """
+    store = getattr(integration, "category_attribute_fingerprint_store", None)
+    if isinstance(store, CategoryAttributeFingerprintStore):
+        return store
+    return None
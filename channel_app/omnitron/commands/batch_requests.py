@@ -1,4 +1,5 @@
 import functools
+import threading
 from collections import defaultdict
 
 from omnisdk.omnitron.endpoints import (ChannelBatchRequestEndpoint,
@@ -9,8 +10,10 @@ from omnisdk.omnitron.endpoints import (ChannelBatchRequestEndpoint,
                                         ChannelProductImageEndpoint)
 
 from channel_app.core.commands import OmnitronCommandInterface
-from channel_app.core.utilities import split_list
+from channel_app.core.utilities import split_list, run_concurrently
 from channel_app.omnitron.constants import FailedReasonType, ResponseStatus
+from channel_app.omnitron.integration_action_mirror import \
+    get_integration_action_mirror
 
 
 class GetBatchRequests(OmnitronCommandInterface):
@@ -59,6 +62,38 @@ class BatchRequestUpdate(OmnitronCommandInterface):
 
 
 class ProcessBatchRequests(object):
+    # Maximum number of model lookup requests in flight at the same time
+    MAX_WORKERS = 5
+
+    @property
+    def max_workers(self) -> int:
+        return getattr(self, "param_max_workers", None) or self.MAX_WORKERS
+
+    def fetch_in_chunks(self, endpoint_class, id_list, lookup="pk__in"):
+        """
+        Fetches objects of the id_list in chunks of CHUNK_SIZE. Chunks are
+        requested concurrently, at most `max_workers` requests are in flight
+        for the whole command including the other content types.
+
+        :param endpoint_class: Omnitron endpoint of the model
+        :param id_list: list of object ids as string
+        :param lookup: filter name of the id list
+        :return: list of model objects
+        """
+        if not getattr(self, "_in_flight", None):
+            self._in_flight = threading.BoundedSemaphore(self.max_workers)
+
+        def fetch(chunk):
+            endpoint = endpoint_class(channel_id=self.integration.channel_id)
+            with self._in_flight:
+                return endpoint.list(params={lookup: ",".join(chunk),
+                                             "limit": len(chunk)})
+
+        batches = run_concurrently(fetch,
+                                   split_list(id_list, self.CHUNK_SIZE),
+                                   max_workers=self.max_workers)
+        return [item for batch in batches for item in batch]
+
     def get_integration_actions_to_processing(self):
         integration_action_endpoint = ChannelIntegrationActionEndpoint(
             channel_id=self.integration.channel_id)
@@ -84,20 +119,22 @@ class ProcessBatchRequests(object):
             ...
         }
         """
-        batch_items = {}
-        for model, model_pks in items_by_content.items():
-            if model == "product":
-                group_items = self.get_products(model_pks)
-            elif model == "productstock":
-                group_items = self.get_stocks(model_pks)
-            elif model == "productprice":
-                group_items = self.get_prices(model_pks)
-            elif model == "productimage":
-                group_items = self.get_images(model_pks)
-            else:
+        getters = {
+            "product": self.get_products,
+            "productstock": self.get_stocks,
+            "productprice": self.get_prices,
+            "productimage": self.get_images,
+        }
+        for model in items_by_content:
+            if model not in getters:
                 raise NotImplementedError
-            batch_items[model] = group_items
-        return batch_items
+
+        self._in_flight = threading.BoundedSemaphore(self.max_workers)
+        models = list(items_by_content.keys())
+        group_items = run_concurrently(
+            lambda model: getters[model](items_by_content[model]),
+            models, max_workers=len(models))
+        return dict(zip(models, group_items))
 
     def group_integration_actions_by_content_type(self,
                                                   batch_integration_actions):
@@ -119,15 +156,7 @@ class ProcessBatchRequests(object):
         return items_by_content
 
     def get_products(self, id_list) -> dict:
-        end_point = ChannelProductEndpoint(
-            channel_id=self.integration.channel_id)
-        products = []
-        for chunk_id_list in split_list(id_list, self.CHUNK_SIZE):
-            products_batch = end_point.list(
-                params={"pk__in": ",".join(chunk_id_list),
-                        "limit": len(chunk_id_list)})
-            products.extend(products_batch)
-
+        products = self.fetch_in_chunks(ChannelProductEndpoint, id_list)
         return {s.pk: s for s in products}
 
     def get_prices(self, id_list: list) -> dict:
@@ -141,15 +170,9 @@ class ProcessBatchRequests(object):
         if not id_list:
             return {}
 
-        endpoint = ChannelProductPriceEndpoint(
-            channel_id=self.integration.channel_id)
-        prices = []
-        for chunk in split_list(id_list, self.CHUNK_SIZE):
-            # TODO should we check the size of chunk (len(chunk) == len(stock_batch))
-            #  to validate something is missing on omnitron side?
-            price_batch = endpoint.list(params={"pk__in": ",".join(chunk),
-                                                "limit": len(chunk)})
-            prices.extend(price_batch)
+        # TODO should we check the size of chunk (len(chunk) == len(stock_batch))
+        #  to validate something is missing on omnitron side?
+        prices = self.fetch_in_chunks(ChannelProductPriceEndpoint, id_list)
         return {p.product: p for p in prices if str(p.pk) in id_list}
 
     def get_stocks(self, id_list: list) -> dict:
@@ -162,31 +185,16 @@ class ProcessBatchRequests(object):
         """
         if not id_list:
             return {}
-        endpoint = ChannelProductStockEndpoint(
-            channel_id=self.integration.channel_id)
-        stocks = []
-        for chunk in split_list(id_list, self.CHUNK_SIZE):
-            # TODO should we check the size of chunk (len(chunk) == len(stock_batch))
-            #  to validate something is missing on omnitron side?
-            stock_batch = endpoint.list(params={"pk__in": ",".join(chunk),
-                                                "limit": len(chunk)})
-            stocks.extend(stock_batch)
-            if not stock_batch:
-                break
+        # TODO should we check the size of chunk (len(chunk) == len(stock_batch))
+        #  to validate something is missing on omnitron side?
+        stocks = self.fetch_in_chunks(ChannelProductStockEndpoint, id_list)
         return {s.product: s for s in stocks if str(s.pk) in id_list}
 
     def get_images(self, id_list):
         if not id_list:
             return {}
-        endpoint = ChannelProductImageEndpoint(
-            channel_id=self.integration.channel_id)
-        images = []
-        for chunk in split_list(id_list, self.CHUNK_SIZE):
-            image_batch = endpoint.list(params={"id__in": ",".join(chunk),
-                                                "limit": len(chunk)})
-            images.extend(image_batch)
-            if not image_batch:
-                break
+        images = self.fetch_in_chunks(ChannelProductImageEndpoint, id_list,
+                                      lookup="id__in")
         product_images = defaultdict(list)
         [product_images[i.product].append(i) for i in images]
         return product_images
@@ -282,3 +290,8 @@ class ProcessBatchRequests(object):
 
         # [6] update batch request and object list
         self._update_batch_request(model_items_by_content)
+
+        # [7] Mirrored integration actions of the batch are outdated now
+        mirror = get_integration_action_mirror(self.integration)
+        if mirror:
+            mirror.delete(batch_integration_actions)
@@ -1,11 +1,17 @@
+import logging
+from typing import List
+
 from omnisdk.omnitron.endpoints import ChannelErrorReportEndpoint, \
     ContentTypeEndpoint
 from omnisdk.omnitron.models import ErrorReport
 
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import ErrorReportDto
+from channel_app.core.utilities import run_concurrently
 from channel_app.omnitron.constants import CONTENT_TYPE_IDS
 
+logger = logging.getLogger(__name__)
+
 
 class CreateAddressErrorReports(OmnitronCommandInterface):
     endpoint = ChannelErrorReportEndpoint
@@ -32,6 +38,12 @@ class CreateAddressErrorReports(OmnitronCommandInterface):
         return False
 
 class CreateErrorReports(OmnitronCommandInterface):
+    """
+    Creates the error report on Omnitron.
+
+    :return: [ErrorReport], or an empty list if the integration buffers the
+        error reports, which are then sent later by its ErrorReportBuffer
+    """
     endpoint = ChannelErrorReportEndpoint
 
     def get_data(self) -> object:
@@ -42,6 +54,14 @@ class CreateErrorReports(OmnitronCommandInterface):
         return data
 
     def send(self, validated_data: ErrorReportDto) -> object:
+        error_report_buffer = getattr(self.integration,
+                                      "error_report_buffer", None)
+        if error_report_buffer is not None:
+            error_report_buffer.add(validated_data)
+            return []
+        return [self.create_error_report(validated_data)]
+
+    def create_error_report(self, validated_data: ErrorReportDto) -> ErrorReport:
         error_report = ErrorReport(
             action_content_type=self.get_content_type(
                 validated_data.action_content_type),
@@ -58,7 +78,7 @@ class CreateErrorReports(OmnitronCommandInterface):
         )
         report = self.endpoint(
             channel_id=self.integration.channel_id).create(item=error_report)
-        return [report]
+        return report
 
     def get_content_type(self, content_type: str):
         try:
@@ -84,3 +104,30 @@ class CreateErrorReports(OmnitronCommandInterface):
 
     def check_run(self, is_ok, formatted_data):
         return False
+
+
+class CreateBulkErrorReports(CreateErrorReports):
+    """
+    Sends a list of error reports, at most MAX_WORKERS of them at the same
+    time. A failing report is logged and does not prevent the others
+    from being sent.
+    """
+    MAX_WORKERS = 5
+
+    def validated_data(self, data):
+        for report in data:
+            assert isinstance(report, ErrorReportDto)
+        return data
+
+    def send(self, validated_data: List[ErrorReportDto]) -> object:
+        reports = run_concurrently(self.create_error_report_or_log,
+                                   validated_data,
+                                   max_workers=self.MAX_WORKERS)
+        return [report for report in reports if report]
+
+    def create_error_report_or_log(self, validated_data: ErrorReportDto):
+        try:
+            return self.create_error_report(validated_data)
+        except Exception as e:
+            logger.error(f"ErrorReport could not be created: "
+                         f"{validated_data.error_code} - {str(e)}")
@@ -1,3 +1,5 @@
+import functools
+import logging
 from collections import defaultdict
 from typing import List
 
@@ -5,9 +7,16 @@ from omnisdk.omnitron.endpoints import ChannelIntegrationActionEndpoint, \
     ChannelProductEndpoint, ChannelProductPriceEndpoint, \
     ChannelProductStockEndpoint
 from omnisdk.omnitron.models import IntegrationAction
+from requests import HTTPError
 
 from channel_app.core.commands import OmnitronCommandInterface
-from channel_app.core.utilities import split_list
+from channel_app.core.data import IntegrationActionResultDto
+from channel_app.core.utilities import run_concurrently, split_list
+from channel_app.omnitron.constants import ResponseStatus
+from channel_app.omnitron.integration_action_mirror import \
+    get_integration_action_mirror
+
+logger = logging.getLogger(__name__)
 
 
 class CreateIntegrationActions(OmnitronCommandInterface):
@@ -31,12 +40,20 @@ class CreateIntegrationActions(OmnitronCommandInterface):
     def send(self, validated_data) -> object:
         integration_actions = []
         for item in validated_data:
-            integration_action = self.endpoint(
-                channel_id=self.integration.channel_id).create(item=item)
-
+            integration_action = self.send_item(item)
             integration_actions.append(integration_action)
+        self.update_mirror(integration_actions)
         return integration_actions
 
+    def send_item(self, item) -> IntegrationAction:
+        return self.endpoint(
+            channel_id=self.integration.channel_id).create(item=item)
+
+    def update_mirror(self, integration_actions):
+        mirror = get_integration_action_mirror(self.integration)
+        if mirror:
+            mirror.set(integration_actions)
+
 
 class UpdateIntegrationActions(CreateIntegrationActions):
     endpoint = ChannelIntegrationActionEndpoint
@@ -44,18 +61,60 @@ class UpdateIntegrationActions(CreateIntegrationActions):
     def get_data(self) -> list:
         return self.objects
 
-    def send(self, validated_data) -> object:
-        integration_actions = []
-        for item in validated_data:
-            item.content_type_id = item.content_type['id']
-            delattr(item, "content_type")
-
-            integration_action = self.endpoint(
-                channel_id=self.integration.channel_id
-            ).update(id=item.pk, item=item)
-
-            integration_actions.append(integration_action)
-        return integration_actions
+    def send_item(self, item) -> IntegrationAction:
+        item.content_type_id = item.content_type['id']
+        delattr(item, "content_type")
+
+        return self.endpoint(
+            channel_id=self.integration.channel_id
+        ).update(id=item.pk, item=item)
+
+
+class CreateBulkIntegrationActions(CreateIntegrationActions):
+    """
+    Omnitron does not have a bulk endpoint for integration actions, so they
+    are sent concurrently with at most `max_workers` requests in flight. A
+    failing item does not stop the others; the result of each item is
+    returned in the order of the objects.
+
+    These are meant for the channel apps which send the integration actions
+    of many objects at once. The setup and order flows of this package create
+    an integration action right after its object and use it at once, so they
+    keep creating them one by one.
+    """
+    MAX_WORKERS = 10
+
+    @property
+    def max_workers(self) -> int:
+        return getattr(self, "param_max_workers", None) or self.MAX_WORKERS
+
+    def send(self, validated_data) -> List[IntegrationActionResultDto]:
+        results = run_concurrently(self.send_item_or_fail, validated_data,
+                                   max_workers=self.max_workers)
+        self.update_mirror([result.integration_action for result in results
+                            if result.status == ResponseStatus.success])
+        return results
+
+    def send_item_or_fail(self, item) -> IntegrationActionResultDto:
+        try:
+            integration_action = self.send_item(item)
+        except Exception as e:
+            message = str(e)
+            if isinstance(e, HTTPError) and e.response is not None:
+                message = f"{message} - {e.response.text}"
+            logger.error(f"IntegrationAction could not be sent: {message}")
+            return IntegrationActionResultDto(status=ResponseStatus.fail,
+                                              item=item, message=message)
+        return IntegrationActionResultDto(status=ResponseStatus.success,
+                                          item=item,
+                                          integration_action=integration_action)
+
+
+class UpdateBulkIntegrationActions(CreateBulkIntegrationActions,
+                                   UpdateIntegrationActions):
+    """
+    Bulk variant of UpdateIntegrationActions, see CreateBulkIntegrationActions
+    """
 
 
 class GetIntegrationActionsWithObjectId(OmnitronCommandInterface):
@@ -69,23 +128,35 @@ class GetIntegrationActionsWithObjectId(OmnitronCommandInterface):
     def get_data(self) -> List:
         integration_action_list = []
         group_by_content_type = self.get_grup_by_content_type_pk_list()
+        mirror = get_integration_action_mirror(self.integration)
 
         for ct, pk_list in group_by_content_type.items():
-            for chunk_pk_list in split_list(pk_list, self.CHUNK_SIZE):
-                chunk_ia = self.endpoint(
-                    channel_id=self.integration.channel_id
-                ).list(params={
-                    "limit": len(chunk_pk_list),
-                    "channel_id": self.integration.channel_id,
-                    "content_type_name": ct,
-                    self.id_type: ",".join([str(pk) for pk in chunk_pk_list])
-                })
-                integration_action_list.extend(chunk_ia)
+            fetch = functools.partial(self.fetch_integration_actions, ct)
+            if mirror:
+                integration_action_list.extend(mirror.lookup(
+                    ct, pk_list, fetch=fetch,
+                    by_remote_id=self.id_type == "remote_id__in"))
+            else:
+                integration_action_list.extend(fetch(pk_list))
 
         ia_dict = self.get_ia_dict(integration_action_list)
         self.update_objects(ia_dict)
         return self.objects
 
+    def fetch_integration_actions(self, content_type, id_list):
+        integration_action_list = []
+        for chunk_pk_list in split_list(id_list, self.CHUNK_SIZE):
+            chunk_ia = self.endpoint(
+                channel_id=self.integration.channel_id
+            ).list(params={
+                "limit": len(chunk_pk_list),
+                "channel_id": self.integration.channel_id,
+                "content_type_name": content_type,
+                self.id_type: ",".join([str(pk) for pk in chunk_pk_list])
+            })
+            integration_action_list.extend(chunk_ia)
+        return integration_action_list
+
     def update_objects(self, ia_dict):
         for obj in self.objects:
             obj.integration_action = ia_dict[obj.pk]
@@ -200,3 +271,26 @@ class GetObjectsFromIntegrationAction(OmnitronCommandInterface):
         for key, value_list in group.items():
             object_list.extend(value_list)
         return object_list
+
+
+class SyncIntegrationActionMirror(OmnitronCommandInterface):
+    """
+    Copies the integration actions modified since the last sync to the
+    integration action mirror of the integration.
+
+    :param objects: List of content type names, e.g. ["product", "order"]
+    :param full: (optional param) copy all integration actions, see
+        IntegrationActionMirror.sync
+    :return: Number of integration actions synced per content type
+    """
+
+    def get_data(self) -> List[str]:
+        return self.objects
+
+    def send(self, validated_data) -> object:
+        mirror = get_integration_action_mirror(self.integration)
+        if not mirror:
+            raise Exception("Integration action mirror is not enabled")
+        full = getattr(self, "param_full", None)
+        return [{content_type: mirror.sync(content_type, full=full)}
+                for content_type in validated_data]
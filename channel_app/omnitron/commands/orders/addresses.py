@@ -1,3 +1,7 @@
+import hashlib
+import json
+from typing import Union
+
 from omnisdk.omnitron.endpoints import (ChannelAddressEndpoint,
                                         ChannelCountryEndpoint,
                                         ChannelCityEndpoint,
@@ -8,8 +12,10 @@ from omnisdk.omnitron.models import (City, Country, Township, District, Address,
                                      Customer)
 from requests import HTTPError
 
+from channel_app.core.cache import MISSING, TTLCache, get_shared_cache
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import AddressDto
+from channel_app.omnitron import exceptions
 from channel_app.omnitron.constants import INTEGRATION_TYPE, ErrorType
 from channel_app.omnitron.exceptions import (CountryException,
                                              IntegrationMappingException,
@@ -18,7 +24,35 @@ from channel_app.omnitron.exceptions import (CountryException,
 
 
 class GetOrCreateAddress(OmnitronCommandInterface):
+    """
+    Creates the address of an order on Omnitron.
+
+    Countries, cities, townships and districts are resolved through a
+    gazetteer cache kept in the process, and on the shared cache of the
+    integration if it has one. Found locations are cached for
+    LOCATION_CACHE_TTL seconds and the locations which could not be found
+    for LOCATION_NEGATIVE_CACHE_TTL seconds. Cities and townships are
+    looked up case insensitively by name on Omnitron, so their names are
+    casefolded in the cache keys of the name lookups. The integration
+    mappings which they fall back to match the code exactly, so those are
+    cached by the raw value.
+
+    Created addresses are cached for ADDRESS_CACHE_TTL seconds by a hash of
+    their payload, so the addresses of returning customers are not posted
+    again.
+    """
     endpoint = ChannelAddressEndpoint
+    LOCATION_CACHE_TTL = 60 * 60 * 6
+    LOCATION_NEGATIVE_CACHE_TTL = 60 * 5
+    LOCATION_CACHE_MAXSIZE = 100000
+    ADDRESS_CACHE_TTL = 60 * 60 * 6
+    ADDRESS_CACHE_MAXSIZE = 100000
+    # {(channel_id, key): Country, City, Township, District or
+    #  (exception class, params) of a location which was not found}
+    _locations = TTLCache(ttl=LOCATION_CACHE_TTL,
+                          maxsize=LOCATION_CACHE_MAXSIZE)
+    # {(channel_id, address hash): Address}
+    _addresses = TTLCache(ttl=ADDRESS_CACHE_TTL, maxsize=ADDRESS_CACHE_MAXSIZE)
 
     def get_data(self) -> dict:
         """
@@ -106,6 +140,11 @@ class GetOrCreateAddress(OmnitronCommandInterface):
         :param validated_data: data for address
         :return: address objects
         """
+        address_hash = self.get_address_hash(validated_data)
+        address = self.get_cached_address(address_hash)
+        if address:
+            return [address]
+
         try:
             address_obj = Address(**validated_data)
             address = self.endpoint(
@@ -127,8 +166,36 @@ class GetOrCreateAddress(OmnitronCommandInterface):
             if len(addresses) != 1:
                 raise
             address = addresses[0]
+        self.cache_address(address_hash, address)
         return [address]
 
+    @staticmethod
+    def get_address_hash(validated_data: dict) -> str:
+        data = json.dumps(validated_data, sort_keys=True, default=str)
+        return hashlib.md5(data.encode("utf-8")).hexdigest()
+
+    def get_cached_address(self, address_hash):
+        local_key = (self.integration.channel_id, address_hash)
+        address = self._addresses.get(local_key)
+        if address:
+            return address
+
+        shared_cache = get_shared_cache(self.integration)
+        if shared_cache:
+            data = shared_cache.get(f"address_{address_hash}")
+            if data:
+                address = Address(**data)
+                self._addresses.set(local_key, address)
+        return address
+
+    def cache_address(self, address_hash, address: Address):
+        self._addresses.set((self.integration.channel_id, address_hash),
+                            address)
+        shared_cache = get_shared_cache(self.integration)
+        if shared_cache:
+            shared_cache.set(f"address_{address_hash}", vars(address),
+                             ttl=self.ADDRESS_CACHE_TTL)
+
     def check_run(self,  is_ok, formatted_data):
         if formatted_data:
             return True
@@ -180,7 +247,156 @@ class GetOrCreateAddress(OmnitronCommandInterface):
             raise IntegrationMappingException(params={"code": integration_code})
         return objects
 
+    @staticmethod
+    def normalize_name(name) -> str:
+        return " ".join(str(name).split()).casefold()
+
+    def get_cached_location(self, model, key, fetch):
+        """
+        Returns the location with the key from the caches or calls fetch and
+        caches its result. The exceptions raised by fetch for the locations
+        which do not exist on Omnitron are cached too and raised again.
+
+        :param model: omnisdk model of the location
+        :param key: cache key of the location
+        :param fetch: callable which returns the location from Omnitron, or
+            None if it is not found and the caller falls back to another
+            lookup
+        """
+        local_key = (self.integration.channel_id, key)
+        shared_cache = get_shared_cache(self.integration)
+        location = self._locations.get(local_key, MISSING)
+        if location is MISSING and shared_cache:
+            data = shared_cache.get(key)
+            if data is not None:
+                location = self.load_location(model, data)
+                self._locations.set(local_key, location)
+
+        if location is MISSING:
+            try:
+                location = fetch()
+            except IntegrationMappingException as exc:
+                location = (type(exc), exc.params)
+                self.cache_location(model, key, location,
+                                    ttl=self.LOCATION_NEGATIVE_CACHE_TTL)
+            else:
+                ttl = self.LOCATION_NEGATIVE_CACHE_TTL if location is None \
+                    else self.LOCATION_CACHE_TTL
+                self.cache_location(model, key, location, ttl=ttl)
+
+        if isinstance(location, tuple):
+            exception_class, params = location
+            raise exception_class(params=params)
+        return location
+
+    def cache_location(self, model, key, location, ttl):
+        self._locations.set((self.integration.channel_id, key), location,
+                            ttl=ttl)
+        shared_cache = get_shared_cache(self.integration)
+        if shared_cache:
+            shared_cache.set(key, self.dump_location(location), ttl=ttl)
+
+    @staticmethod
+    def dump_location(location) -> dict:
+        if isinstance(location, tuple):
+            exception_class, params = location
+            return {"exception": exception_class.__name__, "params": params}
+        if location is None:
+            return {"location": None}
+        return {"location": vars(location)}
+
+    @staticmethod
+    def load_location(model, data):
+        if "exception" in data:
+            return getattr(exceptions, data["exception"]), data["params"]
+        if data["location"] is None:
+            return None
+        return model(**data["location"])
+
+    def preload_locations(self, country_code: str) -> int:
+        """
+        Caches the cities and townships of a country in bulk. Names which
+        are used by more than one city of the country or township of a city
+        are skipped, since Omnitron can not resolve them by name either.
+
+        :param country_code: country code ("Tr")
+        :return: number of cached locations
+        """
+        country = self.get_country(country_code=country_code)
+        params = {"country": country.pk, "is_active": True}
+        locations = {}
+        duplicates = set()
+        for city in self.list_all(ChannelCityEndpoint, params):
+            key = f"location_city_{country.pk}_" \
+                  f"{self.normalize_name(city.name)}"
+            if key in locations:
+                duplicates.add(key)
+            locations[key] = (City, city)
+        for township in self.list_all(ChannelTownshipEndpoint, params):
+            city_pk = township.city
+            if isinstance(city_pk, dict):
+                city_pk = city_pk.get("pk")
+            key = f"location_township_{city_pk}_" \
+                  f"{self.normalize_name(township.name)}"
+            if key in locations:
+                duplicates.add(key)
+            locations[key] = (Township, township)
+
+        for key, (model, location) in locations.items():
+            if key not in duplicates:
+                self.cache_location(model, key, location,
+                                    ttl=self.LOCATION_CACHE_TTL)
+        return len(locations) - len(duplicates)
+
+    def list_all(self, endpoint_class, params) -> list:
+        endpoint = endpoint_class(channel_id=self.integration.channel_id)
+        objects = endpoint.list(params=params)
+        for next_objects in endpoint.iterator:
+            objects.extend(next_objects)
+        return objects
+
     def get_country(self, country_code: str) -> Country:
+        return self.get_cached_location(
+            Country, f"location_country_{country_code}",
+            lambda: self.fetch_country(country_code=country_code))
+
+    def get_city(self, country: Country, city_name: str) -> City:
+        city = self.get_cached_location(
+            City, f"location_city_{country.pk}_"
+                  f"{self.normalize_name(city_name)}",
+            lambda: self.fetch_city_by_name(country=country,
+                                            city_name=city_name))
+        if city is None:
+            city = self.get_cached_location(
+                City, f"location_city_mapping_{country.pk}_{city_name}",
+                lambda: self.fetch_city_by_mapping(country=country,
+                                                   city_name=city_name))
+        return city
+
+    def get_township(self, country: Country, city: City,
+                     township_name: str) -> Township:
+        township = self.get_cached_location(
+            Township, f"location_township_{city.pk}_"
+                      f"{self.normalize_name(township_name)}",
+            lambda: self.fetch_township_by_name(
+                country=country, city=city, township_name=township_name))
+        if township is None:
+            township = self.get_cached_location(
+                Township, f"location_township_mapping_{city.pk}_"
+                          f"{township_name}",
+                lambda: self.fetch_township_by_mapping(
+                    country=country, city=city, township_name=township_name))
+        return township
+
+    def get_district(self, country: Country, city: City, township: Township,
+                     district_name: str) -> District:
+        return self.get_cached_location(
+            District, f"location_district_{township.pk}_{district_name}",
+            lambda: self.fetch_district(country=country, city=city,
+                                        township=township,
+                                        district_name=district_name))
+
+    def fetch_country(self, country_code: str) -> Country:
         endpoint = ChannelCountryEndpoint(channel_id=self.integration.channel_id)
 
         params = {"code__exact": country_code, "is_active": True}
@@ -204,7 +420,8 @@ class GetOrCreateAddress(OmnitronCommandInterface):
                 "err_desc": f"Country code {country_code} was not found in Omnitron"})
         return countries[0]
 
-    def get_city(self, country: Country, city_name: str) -> City:
+    def fetch_city_by_name(self, country: Country,
+                           city_name: str) -> Union[City, None]:
         endpoint = ChannelCityEndpoint(channel_id=self.integration.channel_id)
 
         params = {
@@ -215,6 +432,10 @@ class GetOrCreateAddress(OmnitronCommandInterface):
         cities = endpoint.list(params=params)
         if len(cities) == 1:
             return cities[0]
+        return None
+
+    def fetch_city_by_mapping(self, country: Country, city_name: str) -> City:
+        endpoint = ChannelCityEndpoint(channel_id=self.integration.channel_id)
         try:
             cities = self.get_mapping_object(code=city_name, endpoint=endpoint)
         except IntegrationMappingException as exc:
@@ -229,7 +450,8 @@ class GetOrCreateAddress(OmnitronCommandInterface):
                                     f"model: City country id: {country.pk}"})
         return cities[0]
 
-    def get_township(self, country: Country, city: City, township_name: str) -> Township:
+    def fetch_township_by_name(self, country: Country, city: City,
+                               township_name: str) -> Union[Township, None]:
         endpoint = ChannelTownshipEndpoint(channel_id=self.integration.channel_id)
 
         params = {
@@ -241,6 +463,11 @@ class GetOrCreateAddress(OmnitronCommandInterface):
         townships = endpoint.list(params=params)
         if len(townships) == 1:
             return townships[0]
+        return None
+
+    def fetch_township_by_mapping(self, country: Country, city: City,
+                                  township_name: str) -> Township:
+        endpoint = ChannelTownshipEndpoint(channel_id=self.integration.channel_id)
         try:
             extra_filters = {"city": city.pk, "is_active": True}
             townships = self.get_mapping_object(township_name, endpoint, extra_filters)
@@ -257,8 +484,8 @@ class GetOrCreateAddress(OmnitronCommandInterface):
                                     f"model: Township city id: {city.pk}"})
         return townships[0]
 
-    def get_district(self, country: Country, city: City, township: Township,
-                     district_name: str) -> District:
+    def fetch_district(self, country: Country, city: City, township: Township,
+                       district_name: str) -> District:
         endpoint = ChannelDistrictEndpoint(channel_id=self.integration.channel_id)
 
         params = {
@@ -288,3 +515,17 @@ class GetOrCreateAddress(OmnitronCommandInterface):
                                     f"model: District township id: {township.pk}"}
             )
         return districts[0]
+
+
+class PreloadLocations(GetOrCreateAddress):
+    """
+    Caches the cities and townships of the country whose code is given as
+    objects, so that the addresses of the orders do not query them one by
+    one.
+    """
+
+    def get_data(self) -> str:
+        return self.objects
+
+    def send(self, validated_data) -> object:
+        return [self.preload_locations(country_code=validated_data)]
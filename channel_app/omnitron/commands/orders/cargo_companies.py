@@ -1,14 +1,27 @@
-from typing import List
+import json
+from typing import Dict, List
 
 from omnisdk.omnitron.endpoints import ChannelCargoEndpoint
 from omnisdk.omnitron.models import CargoCompany
 
+from channel_app.core.cache import TTLCache, get_shared_cache
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.omnitron.exceptions import CargoCompanyException
 
 
 class GetCargoCompany(OmnitronCommandInterface):
+    """
+    Returns the cargo company whose erp code is given as objects.
+
+    Cargo companies of the channel are indexed by erp code and kept in the
+    process for CACHE_TTL seconds, and on the shared cache of the
+    integration if it has one. The index is downloaded again when the erp
+    code is not in it.
+    """
     endpoint = ChannelCargoEndpoint
+    CACHE_TTL = 60 * 10
+    # {(channel_id, params): {erp_code: CargoCompany}}
+    _cargo_companies = TTLCache(ttl=CACHE_TTL)
 
     def get_cargo_company(self, data):
         cargo_company_code = self.objects
@@ -29,13 +42,57 @@ class GetCargoCompany(OmnitronCommandInterface):
             },
         ]
         """
-        params = getattr(self, "param_{}".format("params"), {})
+        cargo_companies = self.get_cargo_companies()
+        if self.objects not in cargo_companies:
+            cargo_companies = self.get_cargo_companies(refresh=True)
+
+        cargo_company = self.get_cargo_company(data=cargo_companies.values())
+        return [cargo_company]
 
+    @property
+    def params(self) -> dict:
+        return getattr(self, "param_{}".format("params"), {})
+
+    @property
+    def cache_key(self) -> str:
+        params = json.dumps(self.params, sort_keys=True, default=str)
+        return f"cargo_companies_{params}"
+
+    def get_cargo_companies(self, refresh=False) -> Dict[str, CargoCompany]:
+        """
+        :param refresh: skip the caches and download the cargo companies
+        :return: {erp_code: CargoCompany}
+        """
+        local_key = (self.integration.channel_id, self.cache_key)
+        shared_cache = get_shared_cache(self.integration)
+        if not refresh:
+            cargo_companies = self._cargo_companies.get(local_key)
+            if cargo_companies is not None:
+                return cargo_companies
+            if shared_cache:
+                data = shared_cache.get(self.cache_key)
+                if data is not None:
+                    cargo_companies = {
+                        erp_code: CargoCompany(**cargo_company)
+                        for erp_code, cargo_company in data.items()}
+                    self._cargo_companies.set(local_key, cargo_companies)
+                    return cargo_companies
+
+        cargo_companies = {cargo_company.erp_code: cargo_company
+                           for cargo_company in self.fetch_cargo_companies()}
+        self._cargo_companies.set(local_key, cargo_companies)
+        if shared_cache:
+            shared_cache.set(
+                self.cache_key,
+                {erp_code: vars(cargo_company)
+                 for erp_code, cargo_company in cargo_companies.items()},
+                ttl=self.CACHE_TTL)
+        return cargo_companies
+
+    def fetch_cargo_companies(self) -> List[CargoCompany]:
         end_point = self.endpoint(channel_id=self.integration.channel_id)
         cargo_companies = end_point.list(
-            params=params)
+            params=self.params)
         for next_cargo_companies in end_point.iterator:
             cargo_companies.extend(next_cargo_companies)
-
-        cargo_company = self.get_cargo_company(data=cargo_companies)
-        return [cargo_company]
+        return cargo_companies
@@ -1,25 +1,89 @@
 from dataclasses import asdict
+from typing import List
+
 from omnisdk.omnitron.endpoints import ChannelCustomerEndpoint
 from omnisdk.omnitron.models import Customer
 
+from channel_app.core.cache import TTLCache, get_shared_cache
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import CustomerDto
 from channel_app.omnitron.constants import CustomerIdentifierField
 
 
 class GetOrCreateCustomer(OmnitronCommandInterface):
+    """
+    Returns the customer of an order, creating it on Omnitron if it does
+    not exist and updating it if its fields changed on the channel.
+
+    Customers are cached by their identifier (email or phone number,
+    depending on the CUSTOMER_IDENTIFIER_FIELD conf of the channel) in the
+    process for CUSTOMER_CACHE_TTL seconds, and on the shared cache of the
+    integration if it has one.
+    """
     endpoint = ChannelCustomerEndpoint
+    CUSTOMER_CACHE_TTL = 60 * 30
+    CUSTOMER_CACHE_MAXSIZE = 50000
+    compared_fields = ("email", "phone_number", "first_name", "last_name")
+    # {(channel_id, identifier field, identifier): Customer}
+    _customers = TTLCache(ttl=CUSTOMER_CACHE_TTL,
+                          maxsize=CUSTOMER_CACHE_MAXSIZE)
 
     def get_data(self) -> Customer:
         data = self.objects
         data: CustomerDto
         return self.get_customer(data)
 
-    def get_customer(self, data: CustomerDto) -> Customer:
-        customer_identifier_field = self.integration.channel.conf.get(
+    @property
+    def customer_identifier_field(self) -> CustomerIdentifierField:
+        return self.integration.channel.conf.get(
             "CUSTOMER_IDENTIFIER_FIELD", CustomerIdentifierField.email)
+
+    @property
+    def identifier_attribute(self) -> str:
+        """
+        Name of the customer attribute used as the identifier
+        """
+        field = self.customer_identifier_field
+        return getattr(field, "value", field)
+
+    def get_cache_key(self, identifier) -> str:
+        return f"customer_{self.identifier_attribute}_{identifier}"
+
+    def get_cached_customer(self, data: CustomerDto):
+        identifier = getattr(data, self.identifier_attribute, None)
+        if not identifier:
+            return None
+        key = self.get_cache_key(identifier)
+        local_key = (self.integration.channel_id, key)
+        customer = self._customers.get(local_key)
+        if customer is None:
+            shared_cache = get_shared_cache(self.integration)
+            cached_data = shared_cache and shared_cache.get(key)
+            if cached_data:
+                customer = Customer(**cached_data)
+                self._customers.set(local_key, customer)
+        return customer
+
+    def cache_customers(self, customers: List[Customer]):
+        shared_cache = get_shared_cache(self.integration)
+        shared_data = {}
+        for customer in customers:
+            identifier = getattr(customer, self.identifier_attribute, None)
+            if not identifier:
+                continue
+            key = self.get_cache_key(identifier)
+            self._customers.set((self.integration.channel_id, key), customer)
+            shared_data[key] = vars(customer)
+        if shared_cache:
+            shared_cache.set_many(shared_data, ttl=self.CUSTOMER_CACHE_TTL)
+
+    def get_customer(self, data: CustomerDto) -> Customer:
+        customer_identifier_field = self.customer_identifier_field
         customers = None
-        if customer_identifier_field == CustomerIdentifierField.email:
+        cached_customer = self.get_cached_customer(data)
+        if cached_customer:
+            customers = [cached_customer]
+        elif customer_identifier_field == CustomerIdentifierField.email:
             customers = self.endpoint(channel_id=self.integration.channel_id).list(params={
                 "email": data.email,
                 "channel": self.integration.channel_id
@@ -38,23 +102,13 @@ class GetOrCreateCustomer(OmnitronCommandInterface):
 
         if customers:
             customer = customers[0]
-            must_update = False
-            new_customer = Customer()
-            new_customer.channel = customer.channel
-            new_customer.channel_code = customer.channel_code
-            if "email" in asdict(data) and data.email != customer.email:
-                must_update = True
-                new_customer.email = data.email
-            if "phone_number" in asdict(data) and data.phone_number != customer.phone_number:
-                must_update = True
-                new_customer.phone_number = data.phone_number
-            if "first_name" in asdict(data) and data.first_name != customer.first_name:
-                must_update = True
-                new_customer.first_name = data.first_name
-            if "last_name" in asdict(data) and data.last_name != customer.last_name:
-                must_update = True
-                new_customer.last_name = data.last_name
-            if must_update:
+            changed_fields = self.get_changed_fields(data, customer)
+            if changed_fields:
+                new_customer = Customer()
+                new_customer.channel = customer.channel
+                new_customer.channel_code = customer.channel_code
+                for field in changed_fields:
+                    setattr(new_customer, field, getattr(data, field))
                 customer = self.endpoint(channel_id=self.integration.channel_id).update(
                     id=customer.pk, item=new_customer)
         else:
@@ -70,4 +124,60 @@ class GetOrCreateCustomer(OmnitronCommandInterface):
             new_customer = self.endpoint(channel_id=self.integration.channel_id).create(
                 item=new_customer)
             customer = new_customer
+        self.cache_customers([customer])
         return [customer]
+
+    def get_changed_fields(self, data: CustomerDto,
+                           customer: Customer) -> List[str]:
+        """
+        :return: names of the compared fields whose values on the channel
+            differ from the customer on Omnitron
+        """
+        data_fields = asdict(data)
+        return [field for field in self.compared_fields
+                if field in data_fields and
+                data_fields[field] != getattr(customer, field, None)]
+
+
+class PrefetchCustomers(GetOrCreateCustomer):
+    """
+    Caches the customers of a page of channel orders with one query per
+    CHUNK_SIZE customers instead of one query per order.
+
+    objects: list of CustomerDto
+    """
+    CHUNK_SIZE = 100
+
+    def get_data(self) -> List[CustomerDto]:
+        return self.objects
+
+    def send(self, validated_data) -> List[Customer]:
+        identifier_field = self.identifier_attribute
+        identifiers = []
+        for data in validated_data:
+            identifier = getattr(data, identifier_field, None)
+            if identifier and not self.get_cached_customer(data):
+                identifiers.append(identifier)
+        identifiers = list(dict.fromkeys(identifiers))
+
+        customers = []
+        endpoint = self.endpoint(channel_id=self.integration.channel_id)
+        for index in range(0, len(identifiers), self.CHUNK_SIZE):
+            chunk = identifiers[index:index + self.CHUNK_SIZE]
+            chunk_customers = endpoint.list(params={
+                f"{identifier_field}__in": ",".join(chunk),
+                "channel": self.integration.channel_id,
+                "limit": len(chunk)
+            })
+            # The customers of other identifiers are ignored in case the
+            # filter is not applied.
+            identifier_set = set(chunk)
+            customers.extend(
+                customer for customer in chunk_customers
+                if getattr(customer, identifier_field, None) in identifier_set)
+
+        self.cache_customers(customers)
+        return customers
+
+    def check_run(self, is_ok, formatted_data):
+        return is_ok
@@ -1,3 +1,4 @@
+import threading
 from dataclasses import asdict
 from typing import Any, List
 
@@ -11,19 +12,23 @@ from omnisdk.omnitron.endpoints import (ChannelCreateOrderEndpoint,
                                         ChannelOrderEndpoint,
                                         ChannelCargoEndpoint,
                                         ChannelCancellationRequestEndpoint)
-from omnisdk.omnitron.models import Order, OrderShippingInfo, \
+from omnisdk.omnitron.models import Order, OrderItem, OrderShippingInfo, \
     CancellationRequest
 
+from channel_app.core.cache import MISSING, TTLCache, get_shared_cache
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import (OrderBatchRequestResponseDto,
                                    OmnitronCreateOrderDto, OmnitronOrderDto,
                                    OrderItemDto, CancelOrderDto, 
                                    CancellationRequestDto)
 from channel_app.core.utilities import split_list
-from channel_app.omnitron.batch_request import ClientBatchRequest
+from channel_app.omnitron.batch_request import (ClientBatchRequest,
+                                                get_batch_commit_buffer)
 from channel_app.omnitron.commands.batch_requests import ProcessBatchRequests
 from channel_app.omnitron.constants import (ContentType, BatchRequestStatus)
 from channel_app.omnitron.exceptions import AppException, OrderException
+from channel_app.omnitron.integration_action_mirror import \
+    get_integration_action_mirror
 
 
 class GetOrders(OmnitronCommandInterface):
@@ -119,34 +124,51 @@ class ProcessOrderBatchRequests(OmnitronCommandInterface, ProcessBatchRequests):
             if integration_action.object_id == obj.pk:
                 return integration_action.remote_id
 
+    def get_remote_order_numbers(self, integration_actions) -> dict:
+        """
+        :return: {order pk: remote order number}, the first integration
+            action of an order wins like in `get_remote_order_number`
+        """
+        remote_order_numbers = {}
+        for integration_action in integration_actions:
+            if integration_action.content_type["model"] != "order":
+                continue
+            remote_order_numbers.setdefault(integration_action.object_id,
+                                            integration_action.remote_id)
+        return remote_order_numbers
+
+    def get_channel_items_by_number(self, channel_response) -> dict:
+        """
+        :return: {order number: channel item}, the first channel item of a
+            number wins
+        """
+        channel_items_by_number = {}
+        for channel_item in channel_response:
+            channel_items_by_number.setdefault(channel_item.number,
+                                               channel_item)
+        return channel_items_by_number
+
     def get_channel_items_by_reference_object_ids(self, channel_response,
                                                   model_items_by_content,
                                                   integration_actions):
+        remote_order_numbers = self.get_remote_order_numbers(
+            integration_actions)
+        channel_items_by_number = self.get_channel_items_by_number(
+            channel_response)
         channel_items_by_order_id = {}
         for order_id, order in model_items_by_content["order"].items():
-            number = self.get_remote_order_number(
-                obj=order, integration_actions=integration_actions)
-            for channel_item in channel_response:
-                # TODO: comment
-                if channel_item.number != number:
-                    continue
-                remote_item = channel_item
-                channel_items_by_order_id[order_id] = remote_item
-                break
+            number = remote_order_numbers.get(order.pk)
+            if number not in channel_items_by_number:
+                continue
+            channel_items_by_order_id[order_id] = \
+                channel_items_by_number[number]
         return channel_items_by_order_id
 
     def get_orders(self, id_list) -> dict:
         if not id_list:
             return {}
 
-        end_point = ChannelOrderEndpoint(
-            channel_id=self.integration.channel_id)
-        orders = []
-        for chunk_id_list in split_list(id_list, self.CHUNK_SIZE):
-            orders_batch = end_point.list(
-                params={"pk__in": ",".join(chunk_id_list),
-                        "limit": len(chunk_id_list)})
-            orders.extend(orders_batch)
+        orders = self.fetch_in_chunks(ChannelOrderEndpoint, id_list)
         return {order.pk: order for order in orders}
 
     def group_model_items_by_content_type(self, items_by_content):
@@ -160,9 +182,41 @@ class ProcessOrderBatchRequests(OmnitronCommandInterface, ProcessBatchRequests):
 
 
 class CreateOrders(OmnitronCommandInterface):
+    """
+    Creates an order and its items on Omnitron.
+
+    Orders can be created concurrently with the same integration. The batch
+    request objects of an order are then also appended to the list given as
+    `batch_objects`, since the objects of the shared batch request are
+    replaced by every order. If the integration has a batch commit buffer,
+    the objects are committed through it in bulk instead of one commit per
+    order.
+
+    Order numbers checked by `prefetch_order_numbers` are kept in the
+    process, so the orders of a prefetched page do not query Omnitron one
+    by one before they are created. Numbers which exist on Omnitron are kept
+    for KNOWN_ORDER_NUMBER_TTL seconds and the missing ones only for
+    MISSING_ORDER_NUMBER_TTL seconds, since another worker may create them.
+
+    Product ids of the order item remote ids are cached in the process, and
+    on the shared cache of the integration if it has one, for
+    PRODUCT_CACHE_TTL seconds. Remote ids without a product are cached for
+    PRODUCT_NEGATIVE_CACHE_TTL seconds.
+    """
     endpoint = ChannelCreateOrderEndpoint
     content_type = ContentType.order.value
     CHUNK_SIZE = 50
+    KNOWN_ORDER_NUMBER_TTL = 60 * 30
+    MISSING_ORDER_NUMBER_TTL = 60
+    PRODUCT_CACHE_TTL = 60 * 60
+    PRODUCT_NEGATIVE_CACHE_TTL = 60
+    PRODUCT_CACHE_MAXSIZE = 100000
+    _batch_request_lock = threading.Lock()
+    # {(channel_id, order number): whether the order exists on Omnitron}
+    _order_numbers = TTLCache(ttl=KNOWN_ORDER_NUMBER_TTL, maxsize=100000)
+    # {(channel_id, product remote id): product pk or None}
+    _product_ids = TTLCache(ttl=PRODUCT_CACHE_TTL,
+                            maxsize=PRODUCT_CACHE_MAXSIZE)
 
     def get_data(self) -> dict:
         assert isinstance(self.objects, OmnitronCreateOrderDto)
@@ -215,20 +269,26 @@ class CreateOrders(OmnitronCommandInterface):
     def send(self, validated_data) -> object:
         order_obj = Order(**validated_data)
         order_endpoint = ChannelOrderEndpoint
+        order_number = order_obj.order.get("number")
+        is_order_known = self._order_numbers.get(
+            (self.integration.channel_id, order_number))
+        if is_order_known:
+            return []
         try:
-            order_number = order_obj.order.get("number")
-            is_order_exists = order_endpoint(
-                channel_id=self.integration.channel_id
-            ).list(
-                params={
-                    "number": order_number,
-                    "channel_id": self.integration.channel_id
-                    }
-            )
-            if is_order_exists:
-                raise OrderException(params="Order Already Exist On Omnitron")
+            if is_order_known is None:
+                is_order_exists = order_endpoint(
+                    channel_id=self.integration.channel_id
+                ).list(
+                    params={
+                        "number": order_number,
+                        "channel_id": self.integration.channel_id
+                        }
+                )
+                if is_order_exists:
+                    raise OrderException(params="Order Already Exist On Omnitron")
 
         except OrderException:
+            self.set_order_numbers([order_number], exists=True)
             return is_order_exists
         try:
             order = self.endpoint(
@@ -237,9 +297,17 @@ class CreateOrders(OmnitronCommandInterface):
         except requests_exceptions.HTTPError as exc:
             raise OrderException(params=exc.response.text)
 
+        self.set_order_numbers([order_number], exists=True)
         self._update_batch_request(order)
         return order
 
+    def set_order_numbers(self, order_numbers, exists: bool):
+        ttl = self.KNOWN_ORDER_NUMBER_TTL if exists else \
+            self.MISSING_ORDER_NUMBER_TTL
+        for order_number in order_numbers:
+            self._order_numbers.set(
+                (self.integration.channel_id, order_number), exists, ttl=ttl)
+
     def normalize_response(self, data, response) -> List[object]:
         return [data]
 
@@ -247,7 +315,8 @@ class CreateOrders(OmnitronCommandInterface):
         order.remote_id = order.extra_field.get("id")
         objects_data_order = self.create_batch_objects(data=[order],
                                                        content_type=ContentType.order.value)
-        order_items = self.get_order_items(order_pk=order.pk)
+        order_items = self.get_created_order_items(order) or \
+            self.get_order_items(order_pk=order.pk)
         for item in order_items:
             item.remote_id = item.extra_field["id"]
         objects_data_order_items = self.create_batch_objects(
@@ -256,7 +325,32 @@ class CreateOrders(OmnitronCommandInterface):
         objects_data = []
         objects_data.extend(objects_data_order)
         objects_data.extend(objects_data_order_items)
-        self.update_batch_request(objects_data=objects_data)
+        batch_objects = getattr(self, "param_batch_objects", None)
+        if batch_objects is not None:
+            batch_objects.extend(objects_data)
+        commit_buffer = get_batch_commit_buffer(self.integration)
+        if commit_buffer:
+            commit_buffer.add(objects_data)
+            return
+        with self._batch_request_lock:
+            self.update_batch_request(objects_data=objects_data)
+
+    def get_created_order_items(self, order) -> List[OrderItem]:
+        """
+        Returns the order items in the create response of the order if they
+        carry the fields needed for the batch request objects, otherwise an
+        empty list.
+        """
+        order_items = getattr(order, "order_item", None)
+        if not isinstance(order_items, list):
+            return []
+        required_fields = ("pk", "modified_date", "extra_field")
+        if not all(isinstance(item, dict) and
+                   all(field in item for field in required_fields) and
+                   "id" in (item["extra_field"] or {})
+                   for item in order_items):
+            return []
+        return [OrderItem(**item) for item in order_items]
 
     def get_order_items(self, order_pk):
         params = {"order": order_pk, "sort": "id"}
@@ -311,7 +405,82 @@ class CreateOrders(OmnitronCommandInterface):
         return extra_field
 
     def get_products(self, order_items: List[OrderItemDto]) -> dict:
+        """
+        :return: {remote_id: product pk} of the order items whose product
+            exists
+        """
         product_remote_ids = self.get_product_remote_id_list(order_items)
+        product_ids = {}
+        missing_remote_ids = []
+        for remote_id in product_remote_ids:
+            product_id = self._product_ids.get(
+                (self.integration.channel_id, remote_id), MISSING)
+            if product_id is MISSING:
+                missing_remote_ids.append(remote_id)
+            else:
+                product_ids[remote_id] = product_id
+
+        shared_cache = get_shared_cache(self.integration)
+        if missing_remote_ids and shared_cache:
+            shared_product_ids = shared_cache.get_many(
+                f"product_{remote_id}" for remote_id in missing_remote_ids)
+            for remote_id in list(missing_remote_ids):
+                product_id = shared_product_ids.get(
+                    f"product_{remote_id}", MISSING)
+                if product_id is not MISSING:
+                    missing_remote_ids.remove(remote_id)
+                    product_ids[remote_id] = product_id
+                    self.cache_product_id(remote_id, product_id)
+
+        if missing_remote_ids:
+            fetched_product_ids = self.fetch_products(missing_remote_ids)
+            shared_product_ids = {}
+            for remote_id in missing_remote_ids:
+                product_id = fetched_product_ids.get(remote_id)
+                product_ids[remote_id] = product_id
+                self.cache_product_id(remote_id, product_id)
+                shared_product_ids[f"product_{remote_id}"] = product_id
+            if shared_cache:
+                self.share_product_ids(shared_cache, shared_product_ids)
+
+        return {remote_id: product_id
+                for remote_id, product_id in product_ids.items()
+                if product_id is not None}
+
+    def cache_product_id(self, remote_id, product_id):
+        ttl = self.PRODUCT_CACHE_TTL if product_id is not None else \
+            self.PRODUCT_NEGATIVE_CACHE_TTL
+        self._product_ids.set((self.integration.channel_id, remote_id),
+                              product_id, ttl=ttl)
+
+    def share_product_ids(self, shared_cache, shared_product_ids: dict):
+        shared_cache.set_many(
+            {key: product_id for key, product_id in shared_product_ids.items()
+             if product_id is not None},
+            ttl=self.PRODUCT_CACHE_TTL)
+        shared_cache.set_many(
+            {key: product_id for key, product_id in shared_product_ids.items()
+             if product_id is None},
+            ttl=self.PRODUCT_NEGATIVE_CACHE_TTL)
+
+    def fetch_products(self, product_remote_ids: list) -> dict:
+        """
+        :return: {remote_id: product pk} of the remote ids found on Omnitron
+        """
+        mirror = get_integration_action_mirror(self.integration)
+        if mirror:
+            product_integration_actions = mirror.lookup(
+                ContentType.product.value, product_remote_ids,
+                fetch=self.get_product_integration_actions,
+                by_remote_id=True)
+        else:
+            product_integration_actions = \
+                self.get_product_integration_actions(product_remote_ids)
+
+        return {ia.remote_id: ia.object_id for ia in
+                product_integration_actions}
+
+    def get_product_integration_actions(self, product_remote_ids):
         endpoint = ChannelIntegrationActionEndpoint(
             channel_id=self.integration.channel_id)
         product_integration_actions = []
@@ -327,9 +496,7 @@ class CreateOrders(OmnitronCommandInterface):
                 ia.extend(item)
 
             product_integration_actions.extend(ia)
-
-        return {ia.remote_id: ia.object_id for ia in
-                product_integration_actions}
+        return product_integration_actions
 
     def get_product_remote_id_list(self, order_items: List[OrderItemDto]):
         product_remote_ids = list(set(item.product for item in order_items))
@@ -341,6 +508,50 @@ class CreateOrders(OmnitronCommandInterface):
         return False
 
 
+class PrefetchOrderNumbers(CreateOrders):
+    """
+    Checks which of the order numbers given as objects exist on Omnitron
+    with one `number__in` query per CHUNK_SIZE numbers and keeps the result
+    for CreateOrders.
+
+    :return: order numbers which exist on Omnitron
+    """
+
+    def get_data(self) -> List[str]:
+        return [order_number[:128] for order_number in self.objects]
+
+    def send(self, validated_data) -> List[str]:
+        order_numbers = [
+            order_number for order_number in dict.fromkeys(validated_data)
+            if self._order_numbers.get(
+                (self.integration.channel_id, order_number)) is None]
+        endpoint = ChannelOrderEndpoint(channel_id=self.integration.channel_id)
+        existing_numbers = set()
+        for chunk in split_list(order_numbers, self.CHUNK_SIZE):
+            orders = endpoint.list(params={
+                "number__in": ",".join(chunk),
+                "channel_id": self.integration.channel_id,
+                "limit": len(chunk)
+            })
+            # Orders of other numbers are ignored in case the filter is not
+            # applied.
+            chunk_numbers = set(chunk)
+            existing_numbers.update(order.number for order in orders
+                                    if order.number in chunk_numbers)
+
+        self.set_order_numbers(existing_numbers, exists=True)
+        self.set_order_numbers(
+            [order_number for order_number in order_numbers
+             if order_number not in existing_numbers], exists=False)
+        return list(existing_numbers)
+
+    def normalize_response(self, data, response) -> List[object]:
+        return response
+
+    def check_run(self, is_ok, formatted_data):
+        return is_ok
+
+
 class CreateOrderShippingInfo(OmnitronCommandInterface):
     endpoint = ChannelOrderShippingInfoEndpoint
 
@@ -70,18 +70,11 @@ class GetInsertedProductImages(GetUpdatedProductImages):
     def get_integration_actions(self, images: List[ProductImage]):
         if not images:
             return []
-        endpoint = ChannelIntegrationActionEndpoint(
-            channel_id=self.integration.channel_id)
         product_ids = [str(image.product) for image in images]
-        product_ias = endpoint.list(
-            params={"object_id__in": ",".join(product_ids),
-                    "content_type_name": ContentType.product.value,
-                    "status": IntegrationActionStatus.success,
-                    "channel_id": self.integration.channel_id,
-                    "sort": "id"
-                    })
-        for product_batch in endpoint.iterator:
-            product_ias.extend(product_batch)
+        product_ias = self.get_integration_actions_with_object_ids(
+            content_type=ContentType.product.value,
+            object_ids=product_ids,
+            status=IntegrationActionStatus.success)
         product_integrations_by_id = {ia.object_id: ia for ia in product_ias}
 
         for image in images:
@@ -67,18 +67,11 @@ class GetInsertedProductPrices(GetUpdatedProductPrices):
     def get_integration_actions(self, prices: List[ProductPrice]):
         if not prices:
             return []
-        endpoint = ChannelIntegrationActionEndpoint(
-            channel_id=self.integration.channel_id)
         product_ids = [str(price.product) for price in prices]
-        product_ias = endpoint.list(
-            params={"object_id__in": ",".join(product_ids),
-                    "content_type_name": ContentType.product.value,
-                    "status": IntegrationActionStatus.success,
-                    "channel_id": self.integration.channel_id,
-                    "sort": "id"
-                    })
-        for product_batch in endpoint.iterator:
-            product_ias.extend(product_batch)
+        product_ias = self.get_integration_actions_with_object_ids(
+            content_type=ContentType.product.value,
+            object_ids=product_ids,
+            status=IntegrationActionStatus.success)
         product_integrations_by_id = {ia.object_id: ia for ia in product_ias}
 
         for price in prices:
@@ -146,17 +139,10 @@ class GetInsertedProductPricesFromExtraPriceList(
     def get_integration_actions(self, prices: List[ProductPrice]):
         if not prices:
             return []
-        endpoint = ChannelIntegrationActionEndpoint(
-            channel_id=self.integration.channel_id)
         product_ids = [str(price.product) for price in prices]
-        product_ias = endpoint.list(
-            params={"object_id__in": ",".join(product_ids),
-                    "content_type_name": ContentType.product.value,
-                    "channel_id": self.integration.channel_id,
-                    "sort": "id"
-                    })
-        for product_batch in endpoint.iterator:
-            product_ias.extend(product_batch)
+        product_ias = self.get_integration_actions_with_object_ids(
+            content_type=ContentType.product.value,
+            object_ids=product_ids)
         product_integrations_by_id = {ia.object_id: ia for ia in product_ias}
 
         for price in prices:
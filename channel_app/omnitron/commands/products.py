@@ -1,3 +1,6 @@
+import functools
+import logging
+import time
 from typing import List, Union
 
 from omnisdk.omnitron.endpoints import ChannelBatchRequestEndpoint, \
@@ -9,14 +12,20 @@ from omnisdk.omnitron.endpoints import ChannelProductEndpoint, \
     ChannelProductPriceEndpoint, ChannelMappedProductEndpoint
 from omnisdk.omnitron.models import Product, IntegrationAction, \
     ChannelAttributeConfig, ProductStock, ProductPrice
-from requests import HTTPError
+from requests import HTTPError, RequestException
 
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import ProductBatchRequestResponseDto
-from channel_app.core.utilities import split_list
+from channel_app.core.utilities import run_concurrently, split_list
 from channel_app.omnitron.commands.batch_requests import ProcessBatchRequests
+from channel_app.omnitron.attribute_config_cache import \
+    get_attribute_config_cache
 from channel_app.omnitron.constants import ContentType, FailedReasonType, \
     BatchRequestStatus, ResponseStatus
+from channel_app.omnitron.integration_action_mirror import \
+    get_integration_action_mirror
+
+logger = logging.getLogger(__name__)
 
 
 class GetInsertedProducts(OmnitronCommandInterface):
@@ -65,9 +74,24 @@ class GetInsertedProducts(OmnitronCommandInterface):
 
 
 class GetProductCategoryNodes(OmnitronCommandInterface):
+    """
+    Sets the category nodes of the products which belong to the category
+    tree of the channel.
+
+    Product categories are fetched with one request per product by default.
+    With `batched=True` or the PRODUCT_CATEGORY_BATCHED setting they are
+    fetched for CHUNK_SIZE products at once with a `product__in` query, which
+    is only correct if Omnitron supports that filter. The root path of the category tree is cached
+    for CATEGORY_TREE_TTL seconds in the process.
+    """
     endpoint = ChannelCategoryNodeEndpoint
     BATCH_SIZE = 100
+    CHUNK_SIZE = 50
+    MAX_WORKERS = 5
+    CATEGORY_TREE_TTL = 60 * 10
     content_type = ContentType.product.value
+    # {(channel_id, category_tree_id): (path, expires_at)}
+    _category_tree_paths = {}
 
     def get_data(self) -> List[Product]:
         """
@@ -86,27 +110,46 @@ class GetProductCategoryNodes(OmnitronCommandInterface):
         self.update_batch_request(object_list)
         return data
 
-    def get_product_category(self, products: List[Product]) -> List[Product]:
-        if not products:
-            empty_list: List[Product] = []
-            return empty_list
-
+    @property
+    def batched(self) -> bool:
+        batched = getattr(self, "param_batched", None)
+        if batched is None:
+            return getattr(self.integration, "product_category_batched",
+                           False) is True
+        return bool(batched)
+
+    def get_category_tree_path(self) -> str:
         category_tree_id = self.integration.channel.category_tree
+        cache_key = (self.integration.channel_id, category_tree_id)
+        path, expires_at = self._category_tree_paths.get(cache_key, (None, 0))
+        if path and expires_at > time.monotonic():
+            return path
+
         category_tree = ChannelCategoryTreeEndpoint(
             channel_id=self.integration.channel_id).retrieve(
             id=category_tree_id)
-        category_tree_path = category_tree.category_root["path"]
+        path = category_tree.category_root["path"]
+        self._category_tree_paths[cache_key] = (
+            path, time.monotonic() + self.CATEGORY_TREE_TTL)
+        return path
 
-        product_category_endpoint = ChannelProductCategoryEndpoint(
-            channel_id=self.integration.channel_id, path="detailed")
+    def get_product_category(self, products: List[Product]) -> List[Product]:
+        if not products:
+            empty_list: List[Product] = []
+            return empty_list
+
+        category_tree_path = self.get_category_tree_path()
+        if self.batched:
+            product_categories_map = self.get_product_categories_map(products)
+        else:
+            product_categories_map = {
+                product.pk: self.get_product_categories(product.pk)
+                for product in products}
 
         for product in products:
-            product_categories = product_category_endpoint.list(
-                params={"product": product.pk})
-            for item in product_category_endpoint.iterator:
-                product_categories.extend(item)
             category_node_list = []
-            for product_category in product_categories:
+            for product_category in product_categories_map.get(product.pk,
+                                                               []):
                 if not str(product_category.category["path"]).startswith(
                         category_tree_path):
                     continue
@@ -120,6 +163,42 @@ class GetProductCategoryNodes(OmnitronCommandInterface):
             product.category_nodes = category_node_list
         return products
 
+    def get_product_categories(self, product_pk) -> list:
+        product_category_endpoint = ChannelProductCategoryEndpoint(
+            channel_id=self.integration.channel_id, path="detailed")
+        product_categories = product_category_endpoint.list(
+            params={"product": product_pk})
+        for item in product_category_endpoint.iterator:
+            product_categories.extend(item)
+        return product_categories
+
+    def get_product_categories_map(self, products: List[Product]) -> dict:
+        """
+        :return: {product_pk: [ProductCategory, ...]}
+        """
+        def fetch_chunk(chunk):
+            product_category_endpoint = ChannelProductCategoryEndpoint(
+                channel_id=self.integration.channel_id, path="detailed")
+            product_categories = product_category_endpoint.list(
+                params={"product__in": ",".join(
+                    str(product.pk) for product in chunk),
+                    "limit": self.CHUNK_SIZE})
+            for item in product_category_endpoint.iterator:
+                product_categories.extend(item)
+            return product_categories
+
+        product_categories_map = {}
+        chunks = split_list(products, self.CHUNK_SIZE)
+        for product_categories in run_concurrently(
+                fetch_chunk, chunks, max_workers=self.MAX_WORKERS):
+            for product_category in product_categories:
+                product_pk = product_category.product
+                if isinstance(product_pk, dict):
+                    product_pk = product_pk["pk"]
+                product_categories_map.setdefault(product_pk, []).append(
+                    product_category)
+        return product_categories_map
+
 
 class GetProductCategoryNodesWithIntegrationAction(GetProductCategoryNodes):
 
@@ -168,6 +247,8 @@ class GetProductCategoryNodesWithIntegrationAction(GetProductCategoryNodes):
 class GetMappedProducts(OmnitronCommandInterface):
     endpoint = ChannelMappedProductEndpoint
     content_type = ContentType.product.value
+    # Maximum number of mapping requests in flight at the same time
+    MAX_WORKERS = 10
 
     def get_data(self) -> List[Product]:
         products = self.get_mapping(self.objects)
@@ -247,9 +328,8 @@ class GetMappedProducts(OmnitronCommandInterface):
         if attribute_set_id in attribute_set_ids:
             attribute_config_list = attribute_set_ids[attribute_set_id]
         else:
-            params = {"attribute_set": attribute_set_id, "limit": 10}
-            attribute_config_list = self.get_attribute_config_list(
-                params=params)
+            attribute_config_list = self.get_attribute_configs(
+                attribute_set_id)
             attribute_set_ids[attribute_set_id] = attribute_config_list
 
         for config in attribute_config_list:
@@ -292,6 +372,20 @@ class GetMappedProducts(OmnitronCommandInterface):
              "is_meta": config.is_meta})
         return True
 
+    def get_attribute_configs(self, attribute_set_id) -> List[
+            ChannelAttributeConfig]:
+        """
+        Returns the configs of the attribute set from the attribute config
+        cache if the integration has one, otherwise from Omnitron.
+        """
+        params = {"attribute_set": attribute_set_id, "limit": 10}
+        cache = get_attribute_config_cache(self.integration)
+        if cache is None:
+            return self.get_attribute_config_list(params=params)
+        return cache.get(
+            attribute_set_id,
+            fetch=lambda: self.get_attribute_config_list(params=params))
+
     def get_attribute_config_list(self, params: dict) -> List[
         ChannelAttributeConfig]:
         config_endpoint = ChannelAttributeConfigEndpoint(path="detailed",
@@ -328,41 +422,84 @@ class GetMappedProducts(OmnitronCommandInterface):
     def get_mapping(self, products: List[Product]) -> List[Product]:
         """
         Get mapping output of the products according to the schema
-        definitions for this channel and product
+        definitions for this channel and product. Mappings are retrieved
+        concurrently with at most `max_workers` requests in flight.
+
+        If `language` parameter is a list, the mapping is retrieved for each
+        language; `mapped_attributes` is the mapping of the first language
+        and `mapped_attributes_by_language` contains all of them.
 
         :param products: List[Product]
         :return: List[Product]
         """
-        language = getattr(self, "param_language", None)
-        if language:
-            headers = {"Accept-Language": language}
-        else:
-            headers = {}
+        languages = self.languages
+        mapping_requests = [(product, language) for product in products
+                            for language in languages]
+        results = iter(run_concurrently(self.retrieve_mapping,
+                                        mapping_requests,
+                                        max_workers=self.max_workers))
 
-        mapped_product_endpoint = self.endpoint(
-            channel_id=self.integration.channel_id)
-
-        for index, product in enumerate(list(products)):
-            try:
-                attributes = mapped_product_endpoint.retrieve(headers=headers,
-                                                              id=product.pk)
-                product.mapped_attributes = attributes
-            except HTTPError as http_err:
-                if http_err.response is not None and http_err.response.status_code == 406:
-                    try:
-                        error_content = http_err.response.json()
-                        fail_message = str(error_content.get('error', error_content))
-                    except ValueError:
-                        fail_message = http_err.response.text
+        for product in products:
+            mappings = {}
+            fail_messages = []
+            for language in languages:
+                attributes, fail_message = next(results)
+                if fail_message is not None:
+                    fail_messages.append(
+                        f"{language}: {fail_message}"
+                        if len(languages) > 1 else fail_message)
+                    continue
+                mappings[language] = attributes
 
+            if fail_messages:
                 product.mapped_attributes = {}
                 product.failed_reason_type = FailedReasonType.mapping.value
                 self.failed_object_list.append(
-                    (product, ContentType.product.value, fail_message))
+                    (product, ContentType.product.value,
+                     " | ".join(fail_messages)))
                 continue
+            product.mapped_attributes = mappings[languages[0]]
+            if len(languages) > 1:
+                product.mapped_attributes_by_language = mappings
 
         return products
 
+    @property
+    def max_workers(self) -> int:
+        return getattr(self, "param_max_workers", None) or self.MAX_WORKERS
+
+    @property
+    def languages(self) -> list:
+        language = getattr(self, "param_language", None)
+        if isinstance(language, (list, tuple)):
+            return list(language) or [None]
+        return [language]
+
+    def retrieve_mapping(self, request):
+        """
+        :param request: (product, language) tuple
+        :return: (mapped attributes, None) or (None, fail message) if the
+            product could not be mapped
+        """
+        product, language = request
+        headers = {"Accept-Language": language} if language else {}
+        mapped_product_endpoint = self.endpoint(
+            channel_id=self.integration.channel_id)
+        try:
+            attributes = mapped_product_endpoint.retrieve(headers=headers,
+                                                          id=product.pk)
+        except HTTPError as http_err:
+            if http_err.response is None or \
+                    http_err.response.status_code != 406:
+                raise
+            try:
+                error_content = http_err.response.json()
+                fail_message = str(error_content.get('error', error_content))
+            except ValueError:
+                fail_message = http_err.response.text
+            return None, fail_message
+        return attributes, None
+
 
 class GetMappedProductsWithOutCommit(GetMappedProducts):
     def validated_data(self, data) -> List[Product]:
@@ -541,18 +678,10 @@ class GetUpdatedProducts(GetInsertedProducts):
 
         return_products_as_dict = {}
         for chunk in split_list(products, 20):
-            endpoint = ChannelIntegrationActionEndpoint(
-                channel_id=self.integration.channel_id)
             product_ids = [str(product.pk) for product in chunk]
-            product_ias = endpoint.list(
-                params={"object_id__in": ",".join(product_ids),
-                        "content_type_name": ContentType.product.value,
-                        "channel_id": self.integration.channel_id,
-                        "sort": "id"
-                        })
-
-            for product_batch in endpoint.iterator:
-                product_ias.extend(product_batch)
+            product_ias = self.get_integration_actions_with_object_ids(
+                content_type=ContentType.product.value,
+                object_ids=product_ids)
 
             product_integrations_by_id = {ia.object_id: ia for ia in
                                           product_ias}
@@ -643,6 +772,17 @@ class ProcessDeletedProductBatchRequests(ProcessProductBatchRequests):
     content_type = ContentType.batch_request.value
     CHUNK_SIZE = 50
     BATCH_SIZE = 100
+    # Remote ids are sent in the query string, so a chunk is limited both by
+    # the number of ids and by the length of the joined ids.
+    REMOTE_ID_CHUNK_SIZE = 200
+    REMOTE_ID_CHUNK_LENGTH = 2000
+    MAX_WORKERS = 10
+    DELETE_RETRY_COUNT = 3
+    DELETE_RETRY_BACKOFF = 0.5
+    deleted_content_types = (ContentType.product.value,
+                             ContentType.product_price.value,
+                             ContentType.product_stock.value,
+                             ContentType.product_image.value)
 
     def get_data(self):
         return self.objects
@@ -663,6 +803,7 @@ class ProcessDeletedProductBatchRequests(ProcessProductBatchRequests):
         remote_ids = []
         fail_remote_ids = []
         integration_actions = []
+        fail_integration_actions = []
         for remote_item in channel_response:
             if remote_item.status == ResponseStatus.success:
                 remote_ids.append(remote_item.remote_id)
@@ -674,23 +815,39 @@ class ProcessDeletedProductBatchRequests(ProcessProductBatchRequests):
                 remote_ids)
 
             # successful integration action objects are deleted
-            for integration_action in integration_actions:
+            deletable_integration_actions = [
+                integration_action for integration_action
+                in integration_actions
                 if integration_action.content_type.get(
-                        "model") in [ContentType.product.value,
-                                     ContentType.product_price.value,
-                                     ContentType.product_stock.value,
-                                     ContentType.product_image.value]:
-                    endpoint.delete(id=integration_action.pk)
+                    "model") in self.deleted_content_types]
+            failed = run_concurrently(
+                functools.partial(self.delete_integration_action, endpoint),
+                deletable_integration_actions,
+                max_workers=self.max_workers)
+            deleted_integration_actions = []
+            for integration_action, error in zip(
+                    deletable_integration_actions, failed):
+                if error is None:
+                    deleted_integration_actions.append(integration_action)
+                    continue
+                integration_action.failed_reason_type = \
+                    FailedReasonType.channel_app.value
+                fail_integration_actions.append(integration_action)
+
+            mirror = get_integration_action_mirror(self.integration)
+            if mirror:
+                mirror.delete(deleted_integration_actions)
 
         # faulty integration action objects are reported
         if fail_remote_ids:
-            fail_integration_actions = self.get_integration_actions_for_remote_ids(
-                fail_remote_ids)
-
-            for integration_action_obj in fail_integration_actions:
+            for integration_action_obj in \
+                    self.get_integration_actions_for_remote_ids(
+                        fail_remote_ids):
                 integration_action_obj.failed_reason_type = \
                     FailedReasonType.channel_app.value
+                fail_integration_actions.append(integration_action_obj)
 
+        if fail_integration_actions:
             objects_data = self.create_batch_objects(
                 data=fail_integration_actions,
                 content_type=ContentType.integration_action.value)
@@ -698,11 +855,58 @@ class ProcessDeletedProductBatchRequests(ProcessProductBatchRequests):
             self.update_batch_request(objects_data=objects_data)
         return integration_actions
 
+    def delete_integration_action(self, endpoint, integration_action):
+        """
+        Deletes the integration action, retrying rate limited (429) requests
+        with a backoff. Server errors and connection problems are already
+        retried by omnisdk. An integration action which is already deleted
+        counts as deleted.
+
+        :return: None if deleted, otherwise the error message
+        """
+        for attempt in range(self.DELETE_RETRY_COUNT):
+            try:
+                endpoint.delete(id=integration_action.pk)
+                return None
+            except HTTPError as e:
+                status_code = getattr(e.response, "status_code", None)
+                if status_code == 404:
+                    return None
+                error = f"{e} - {getattr(e.response, 'text', '')}"
+                if status_code != 429:
+                    break
+            except RequestException as e:
+                error = str(e)
+                break
+            if attempt + 1 < self.DELETE_RETRY_COUNT:
+                time.sleep(self.DELETE_RETRY_BACKOFF * 2 ** attempt)
+        logger.error(f"IntegrationAction {integration_action.pk} could not "
+                     f"be deleted: {error}")
+        return error
+
+    def get_remote_id_chunks(self, remote_ids) -> List[list]:
+        chunks = []
+        chunk = []
+        length = 0
+        for remote_id in remote_ids:
+            remote_id_length = len(str(remote_id)) + 1
+            if chunk and (len(chunk) >= self.REMOTE_ID_CHUNK_SIZE or
+                          length + remote_id_length >
+                          self.REMOTE_ID_CHUNK_LENGTH):
+                chunks.append(chunk)
+                chunk = []
+                length = 0
+            chunk.append(remote_id)
+            length += remote_id_length
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
     def get_integration_actions_for_remote_ids(self, remote_ids):
         if not remote_ids:
             return []
-        integration_actions_list = []
-        for chunk in split_list(remote_ids, 10):
+
+        def fetch(chunk):
             endpoint = ChannelIntegrationActionEndpoint(
                 channel_id=self.integration.channel_id)
             integration_actions = endpoint.list(params={
@@ -714,8 +918,13 @@ class ProcessDeletedProductBatchRequests(ProcessProductBatchRequests):
                 if not ia_batch:
                     break
                 integration_actions.extend(ia_batch)
-            integration_actions_list.extend(integration_actions)
-        return [ial for ial in integration_actions_list if ial.remote_id in remote_ids]
+            return integration_actions
+
+        remote_id_set = set(remote_ids)
+        batches = run_concurrently(fetch, self.get_remote_id_chunks(
+            list(dict.fromkeys(remote_ids))), max_workers=self.max_workers)
+        return [ial for batch in batches for ial in batch
+                if ial.remote_id in remote_id_set]
 
 
 class GetProductObjects(OmnitronCommandInterface):
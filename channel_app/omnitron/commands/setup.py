@@ -1,6 +1,10 @@
 import asyncio
+import contextvars
+import functools
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from typing import Dict
 
 import requests
 from omnisdk.omnitron.endpoints import ChannelAttributeSetEndpoint, \
@@ -22,7 +26,12 @@ from requests import HTTPError
 
 from channel_app.core.commands import OmnitronCommandInterface
 from channel_app.core.data import CategoryTreeDto
-from channel_app.core.utilities import is_updated, split_list
+from channel_app.core.utilities import is_updated, run_concurrently, \
+    split_list
+from channel_app.omnitron.attribute_config_cache import \
+    get_attribute_config_cache
+from channel_app.omnitron.category_attribute_fingerprint import \
+    get_category_attribute_fingerprint_store
 from channel_app.omnitron.constants import ContentType
 
 
@@ -30,16 +39,23 @@ class CreateOrUpdateCategoryTreeAndNodes(OmnitronCommandInterface):
     """
     Using the channel category tree data (including all nodes)
     Create/Update category tree and nodes on the Omnitron side.
+
+    Integration actions of the category nodes are fetched once and indexed
+    by remote id. The name of a node is kept in the state of its
+    integration action, so only new and renamed nodes are written. Nodes
+    are processed level by level, the nodes of a level concurrently.
     """
     endpoint = ChannelCategoryTreeEndpoint
+    MAX_WORKERS = 10
+    INTEGRATION_ACTION_PAGE_SIZE = 500
 
     def get_data(self) -> CategoryTreeDto:
         return self.objects
 
     def send(self, validated_data):
         """
-        Iterative tree traversal implementation with stack by processing parents first
-        children later.
+        Level order tree traversal, parents of a level are created before
+        its nodes.
         :return:
         """
         # TODO what should we do once a leaf node becomes a parent node?
@@ -58,41 +74,80 @@ class CreateOrUpdateCategoryTreeAndNodes(OmnitronCommandInterface):
             channel_endpoint.update(id=self.integration.channel_id,
                                     item=channel)
             self.integration.channel_object = None
-        stack = []
-        current = tree.root
         node_endpoint = ChannelCategoryNodeEndpoint(
             channel_id=self.integration.channel_id)
         content_type = \
             ContentTypeEndpoint().list(params={"model": "categorynode"})[0]
         integration_action_endpoint = ChannelIntegrationActionEndpoint(
             channel_id=self.integration.channel_id)
-        while True:
-            if current:
-                integration_action = self.get_integration_action(
-                    content_type_model=content_type.model,
-                    remote_id=current.remote_id)
-                if integration_action:  # update node
-                    node_object = CategoryNode()
-                    node_object.name = current.name
-                    node_endpoint.update(id=integration_action.object_id,
-                                         item=node_object)
-                    current.omnitron_id = integration_action.object_id
-                elif not current.remote_id:
-                    # if block to skip node creation for root node
-                    pass
-
-                else:  # create node
-                    self.create_node(content_type, current,
-                                     integration_action_endpoint,
-                                     node_endpoint)
-                stack.extend(current.children)
-                current = None
-            elif stack:
-                current = stack.pop()
-            else:
-                break
+        integration_actions = self.get_integration_actions_by_remote_id(
+            content_type_model=content_type.model)
+
+        sync_node = functools.partial(
+            self.sync_node, content_type=content_type,
+            integration_actions=integration_actions,
+            integration_action_endpoint=integration_action_endpoint,
+            node_endpoint=node_endpoint)
+        level = [tree.root] if tree.root else []
+        while level:
+            run_concurrently(sync_node, level, max_workers=self.max_workers)
+            level = [child for current in level for child in current.children]
         return []
 
+    @property
+    def max_workers(self) -> int:
+        return getattr(self, "param_max_workers", None) or self.MAX_WORKERS
+
+    def sync_node(self, current, content_type, integration_actions,
+                  integration_action_endpoint, node_endpoint):
+        if not current.remote_id:
+            # skip node creation for root node
+            return
+
+        integration_action = integration_actions.get(current.remote_id)
+        if not integration_action:  # create node
+            node, integration_action = self.create_node(
+                content_type, current, integration_action_endpoint,
+                node_endpoint)
+            integration_actions[current.remote_id] = integration_action
+            return
+
+        current.omnitron_id = integration_action.object_id
+        state = getattr(integration_action, "state", None) or {}
+        if state.get("name") == current.name:
+            return
+
+        # update node
+        node_object = CategoryNode()
+        node_object.name = current.name
+        node_endpoint.update(id=integration_action.object_id,
+                             item=node_object)
+        integration_action_endpoint.update(
+            id=integration_action.pk,
+            item=IntegrationAction(state={**state, "name": current.name}))
+
+    def get_integration_actions_by_remote_id(
+            self, content_type_model) -> Dict[str, IntegrationAction]:
+        integration_action_endpoint = ChannelIntegrationActionEndpoint(
+            channel_id=self.integration.channel_id)
+        integration_actions = integration_action_endpoint.list(params={
+            "channel_id": self.integration.channel_id,
+            "content_type_name": content_type_model,
+            "limit": self.INTEGRATION_ACTION_PAGE_SIZE,
+            "sort": "id"
+        })
+        for batch in integration_action_endpoint.iterator:
+            if not batch:
+                break
+            integration_actions.extend(batch)
+
+        integration_actions_by_remote_id = {}
+        for integration_action in integration_actions:
+            # the first one wins like in `get_integration_action`
+            integration_actions_by_remote_id.setdefault(
+                integration_action.remote_id, integration_action)
+        return integration_actions_by_remote_id
+
     def create_node(self, content_type, current, integration_action_endpoint,
                     node_endpoint) -> (
             CategoryNode, IntegrationAction):
@@ -100,10 +155,13 @@ class CreateOrUpdateCategoryTreeAndNodes(OmnitronCommandInterface):
         parent_remote_id = current.parent and current.parent.remote_id
 
         if parent_remote_id:
-            node_object_parent = self.get_integration_action(
-                content_type_model=content_type.model,
-                remote_id=parent_remote_id)
-            node_object_parent_id = node_object_parent.object_id
+            node_object_parent_id = getattr(current.parent, "omnitron_id",
+                                            None)
+            if not node_object_parent_id:
+                node_object_parent = self.get_integration_action(
+                    content_type_model=content_type.model,
+                    remote_id=parent_remote_id)
+                node_object_parent_id = node_object_parent.object_id
         else:
             root_node = self.root_node()
             node_object_parent_id = root_node["pk"]
@@ -135,7 +193,8 @@ class CreateOrUpdateCategoryTreeAndNodes(OmnitronCommandInterface):
             content_type_id=content_type.id,
             version_date=node.modified_date,
             object_id=node.pk,
-            remote_id=current.remote_id)
+            remote_id=current.remote_id,
+            state={"name": node_object_name})
 
         integration_action = integration_action_endpoint.create(
             item=integration_action)
@@ -169,10 +228,13 @@ class CreateOrUpdateCategoryTreeAndNodes(OmnitronCommandInterface):
         return detailed_node
 
     def root_node(self):
-        category_tree_endpoint = ChannelCategoryTreeEndpoint(
-            channel_id=self.integration.channel_id)
-        return category_tree_endpoint.retrieve(
-            id=self.integration.channel.category_tree).category_root
+        # Root node is the parent of the whole first level of the tree
+        if not getattr(self, "_root_node", None):
+            category_tree_endpoint = ChannelCategoryTreeEndpoint(
+                channel_id=self.integration.channel_id)
+            self._root_node = category_tree_endpoint.retrieve(
+                id=self.integration.channel.category_tree).category_root
+        return self._root_node
 
     def check_run(self, is_ok, formatted_data):
         return True
@@ -182,6 +244,11 @@ class CreateOrUpdateCategoryAttributes(OmnitronCommandInterface):
     """
     Create Attribute related entries on the Omnitron using the
     attribute data created from a CategoryDto object.
+
+    If the integration has a category attribute fingerprint store, a
+    category which did not change since its last sync is skipped without
+    any request to Omnitron and only the changed attributes of a changed
+    category are synced.
     """
     integration_action_endpoint = ChannelIntegrationActionEndpoint
 
@@ -193,6 +260,8 @@ class CreateOrUpdateCategoryAttributes(OmnitronCommandInterface):
         if not channel_category:
             self.update_category_node_version_date(integration_action)
             return [integration_action]
+        if not self.is_changed(integration_action, channel_category):
+            return [integration_action]
         attribute_set_name = self.get_attribute_set_name(channel_category)
         attribute_set = self.integration.do_action(
             key="create_or_update_channel_attribute_set",
@@ -204,7 +273,9 @@ class CreateOrUpdateCategoryAttributes(OmnitronCommandInterface):
                      "object_id": integration_action.object_id,
                      "content_type": ContentType.category_node.value})
 
-        for channel_attribute in channel_category.attributes:
+        attribute = None
+        for channel_attribute in self.get_changed_attributes(
+                integration_action, channel_category):
             attribute = self.integration.do_action(
                 key="create_or_update_channel_attribute",
                 objects={"name": channel_attribute.name,
@@ -227,8 +298,28 @@ class CreateOrUpdateCategoryAttributes(OmnitronCommandInterface):
                     attribute=attribute, attribute_set=attribute_set,
                     channel_attribute_value=channel_attribute_value)
 
+        self.save_fingerprints(integration_action, channel_category)
         self.update_category_node_version_date(integration_action)
-        return [attribute]
+        return [attribute] if attribute else [integration_action]
+
+    def is_changed(self, integration_action, channel_category) -> bool:
+        store = get_category_attribute_fingerprint_store(self.integration)
+        if store is None:
+            return True
+        return store.is_changed(integration_action.remote_id,
+                                channel_category)
+
+    def get_changed_attributes(self, integration_action, channel_category):
+        store = get_category_attribute_fingerprint_store(self.integration)
+        if store is None:
+            return channel_category.attributes
+        return store.get_changed_attributes(integration_action.remote_id,
+                                            channel_category)
+
+    def save_fingerprints(self, integration_action, channel_category):
+        store = get_category_attribute_fingerprint_store(self.integration)
+        if store is not None:
+            store.save(integration_action.remote_id, channel_category)
 
     def update_category_node_version_date(self, integration_action):
         category_node_endpoint = ChannelCategoryNodeEndpoint(
@@ -266,69 +357,92 @@ class AsyncCreateOrUpdateCategoryAttributes(CreateOrUpdateCategoryAttributes):
     Async process
     Create Attribute related entries on the Omnitron using the
     attribute data created from a CategoryDto object.
+
+    Omnitron requests are blocking, so each of them runs on a thread pool
+    executor. Attributes and attribute values are synced concurrently with
+    at most MAX_WORKERS requests in flight.
     """
+    MAX_WORKERS = 10
 
     async def run_async(self):
-        integration_action, channel_category = self.get_data()
+        max_workers = getattr(self, "param_max_workers",
+                              None) or self.MAX_WORKERS
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            self.executor = executor
+            return await self.send_async(self.get_data())
+
+    async def send_async(self, validated_data):
+        integration_action, channel_category = validated_data
+        if not channel_category or not self.is_changed(integration_action,
+                                                        channel_category):
+            await self.run_in_executor(self.update_category_node_version_date,
+                                       integration_action)
+            return [integration_action]
+
         attribute_set_name = self.get_attribute_set_name(channel_category)
-        attribute_set = self.integration.do_action(
+        attribute_set = (await self.do_action_async(
             key="create_or_update_channel_attribute_set",
             objects={"name": attribute_set_name,
-                     "remote_id": integration_action.remote_id})
-        self.integration.do_action(
+                     "remote_id": integration_action.remote_id}))[0]
+        await self.do_action_async(
             key="get_or_create_channel_attribute_set_config",
-            objects={"attribute_set": attribute_set.remote_id,
+            objects={"attribute_set": attribute_set.id,
                      "object_id": integration_action.object_id,
                      "content_type": ContentType.category_node.value})
 
-        for channel_attribute in channel_category.attributes:
-            attribute = self.integration.do_action(
-                key="create_or_update_channel_attribute",
-                objects={"name": channel_attribute.name,
-                         "remote_id": channel_attribute.remote_id})
-            self.integration.do_action(
-                key="create_or_update_channel_attribute_config",
-                objects={"attribute": attribute.pk,
-                         "attribute_set": attribute_set.remote_id,
-                         "attribute_remote_id": channel_attribute.remote_id,
-                         "is_required": channel_attribute.required,
-                         "is_custom": channel_attribute.allow_custom_value,
-                         "is_variant": channel_attribute.variant,
-                         })
-
-            await asyncio.gather(
-                *[self.get_or_create_attribute_value_and_config(attribute,
-                                                                attribute_set,
-                                                                channel_attribute_value)
-                  for
-                  channel_attribute_value in channel_attribute.values])
-
-        category_node_endpoint = ChannelCategoryNodeEndpoint(
-            channel_id=self.integration.channel_id)
-        category_node = category_node_endpoint.update(
-            id=integration_action.object_id,
-            item=CategoryNode())
-        self.integration_action_endpoint(
-            channel_id=self.integration.channel_id).update(
-            id=integration_action.pk,
-            item=IntegrationAction(version_date=category_node.modified_date))
+        attributes = await asyncio.gather(
+            *[self.create_attribute_and_values(attribute_set,
+                                               channel_attribute)
+              for channel_attribute in self.get_changed_attributes(
+                integration_action, channel_category)])
+
+        self.save_fingerprints(integration_action, channel_category)
+        await self.run_in_executor(self.update_category_node_version_date,
+                                   integration_action)
+        return attributes[-1:]
+
+    async def create_attribute_and_values(self, attribute_set,
+                                          channel_attribute):
+        attribute = (await self.do_action_async(
+            key="create_or_update_channel_attribute",
+            objects={"name": channel_attribute.name,
+                     "remote_id": channel_attribute.remote_id}))[0]
+        await self.do_action_async(
+            key="get_or_create_channel_attribute_schema",
+            objects={"name": f"{attribute.name} Schema"})
+        await self.do_action_async(
+            key="create_or_update_channel_attribute_config",
+            objects={"attribute": attribute.pk,
+                     "attribute_set": attribute_set.id,
+                     "attribute_remote_id": channel_attribute.remote_id,
+                     "is_required": channel_attribute.required,
+                     "is_custom": channel_attribute.allow_custom_value,
+                     "is_variant": channel_attribute.variant,
+                     })
+
+        await asyncio.gather(
+            *[self.get_or_create_attribute_value_and_config(
+                attribute, attribute_set, channel_attribute_value)
+              for channel_attribute_value in channel_attribute.values])
+        return attribute
 
     async def get_or_create_attribute_value_and_config(self, attribute,
                                                        attribute_set,
                                                        channel_attribute_value):
-        attribute_value = self.integration.do_action(
-            key="create_or_update_channel_attribute_value",
-            objects={
-                "attribute": attribute.pk,
-                "label": channel_attribute_value.name,
-                "value": channel_attribute_value.remote_id,
-                "remote_id": channel_attribute_value.remote_id})
-        attribute_value_config = self.integration.do_action(
-            key="get_or_create_channel_attribute_value_config",
-            objects={
-                "attribute_value": attribute_value.pk,
-                "attribute_set": attribute_set.remote_id})
-        await asyncio.sleep(0)
+        await self.run_in_executor(self.create_attribute_value_and_config,
+                                   attribute=attribute,
+                                   attribute_set=attribute_set,
+                                   channel_attribute_value=channel_attribute_value)
+
+    async def do_action_async(self, key, **kwargs):
+        return await self.run_in_executor(self.integration.do_action,
+                                          key=key, **kwargs)
+
+    async def run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(contextvars.copy_context().run,
+                                             func, *args, **kwargs))
 
 
 class GetCategoryIds(OmnitronCommandInterface):
@@ -644,9 +758,16 @@ class CreateOrUpdateChannelAttributeConfig(OmnitronCommandInterface):
                         is_custom=is_custom,
                         is_image_attribute=is_image_attribute,
                         is_meta=is_meta))
+                self.invalidate_attribute_config_cache(attribute_set)
             return [attributeconfig]
+        self.invalidate_attribute_config_cache(attribute_set)
         return [attributeconfig]
 
+    def invalidate_attribute_config_cache(self, attribute_set):
+        cache = get_attribute_config_cache(self.integration)
+        if cache is not None:
+            cache.invalidate(attribute_set)
+
 
 class CreateOrUpdateChannelAttributeValue(OmnitronCommandInterface):
     endpoint = ChannelAttributeValueEndpoint
@@ -0,0 +1,146 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from channel_app.core.data import ErrorReportDto
+from channel_app.core.tests import BaseTestCaseMixin
+from channel_app.omnitron.commands.error_reports import (
+    CreateBulkErrorReports,
+    CreateErrorReports)
+from channel_app.omnitron.error_report import ErrorReportBuffer
+
+
+class TestCreateErrorReports(BaseTestCaseMixin):
+    """
+    Test case for CreateErrorReports
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_error_reports.TestCreateErrorReports
+    """
+
+    def setUp(self) -> None:
+        self.integration = MagicMock()
+        self.report = ErrorReportDto(action_content_type="order",
+                                     action_object_id=1,
+                                     modified_date="2023-01-01 00:00:00")
+
+    def test_send_with_buffer(self):
+        self.integration.error_report_buffer = ErrorReportBuffer(
+            integration=self.integration, flush_size=2)
+        instance = CreateErrorReports(integration=self.integration)
+
+        instance.send(self.report)
+        self.integration.do_action.assert_not_called()
+
+        instance.send(self.report)
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=[self.report, self.report])
+        self.assertEqual(self.integration.error_report_buffer.reports, [])
+
+    @patch.object(CreateErrorReports, 'create_error_report')
+    def test_send_without_buffer(self, mock_create_error_report):
+        self.integration.error_report_buffer = None
+        instance = CreateErrorReports(integration=self.integration)
+
+        result = instance.send(self.report)
+
+        mock_create_error_report.assert_called_once_with(self.report)
+        self.assertEqual(result, [mock_create_error_report.return_value])
+
+
+class TestCreateBulkErrorReports(BaseTestCaseMixin):
+    """
+    Test case for CreateBulkErrorReports
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_error_reports.TestCreateBulkErrorReports
+    """
+
+    def setUp(self) -> None:
+        self.instance = CreateBulkErrorReports(
+            integration=self.mock_integration)
+        self.reports = [
+            ErrorReportDto(action_content_type="order",
+                           action_object_id=pk,
+                           modified_date="2023-01-01 00:00:00")
+            for pk in range(3)
+        ]
+
+    def test_validated_data(self):
+        with self.assertRaises(AssertionError):
+            self.instance.validated_data([{"test": "test"}])
+
+    @patch.object(CreateBulkErrorReports, 'create_error_report')
+    def test_send_skips_failed_reports(self, mock_create_error_report):
+        def create_error_report(report):
+            if report.action_object_id == 1:
+                raise Exception("Invalid Content Type")
+            return report.action_object_id
+
+        mock_create_error_report.side_effect = create_error_report
+        result = self.instance.send(self.reports)
+
+        self.assertEqual(mock_create_error_report.call_count, 3)
+        self.assertEqual(result, [2])
+
+
+class TestErrorReportBuffer(BaseTestCaseMixin):
+    """
+    Test case for ErrorReportBuffer
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_error_reports.TestErrorReportBuffer
+    """
+
+    def setUp(self) -> None:
+        self.integration = MagicMock()
+        self.buffer = ErrorReportBuffer(integration=self.integration,
+                                        flush_size=10, flush_interval=60)
+
+    def test_flush(self):
+        self.buffer.add("report")
+        self.buffer.flush()
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=["report"])
+
+        self.integration.do_action.reset_mock()
+        self.buffer.flush()
+        self.integration.do_action.assert_not_called()
+
+    def test_add_after_flush_interval(self):
+        self.buffer.last_flush -= 60
+        self.buffer.add("report")
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=["report"])
+
+    def test_flush_if_due(self):
+        self.buffer.add("report")
+        self.buffer.flush_if_due()
+        self.integration.do_action.assert_not_called()
+
+        self.buffer.last_flush -= 60
+        self.buffer.flush_if_due()
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=["report"])
+
+    def test_timer_flushes_after_flush_interval(self):
+        flushed = threading.Event()
+        self.integration.do_action.side_effect = \
+            lambda **kwargs: flushed.set()
+        self.buffer.flush_interval = 0.01
+        self.buffer.add("report")
+
+        self.buffer.start()
+        try:
+            self.assertTrue(flushed.wait(timeout=5))
+        finally:
+            self.buffer.close()
+
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=["report"])
+
+    def test_close_flushes_reports(self):
+        self.buffer.start()
+        self.buffer.add("report")
+
+        self.buffer.close()
+
+        self.integration.do_action.assert_called_once_with(
+            key="create_error_reports", objects=["report"])
+        self.assertIsNone(self.buffer._timer)
@@ -0,0 +1,252 @@
+from unittest.mock import MagicMock, patch
+
+from omnisdk.omnitron.models import IntegrationAction
+
+from channel_app.core.tests import BaseTestCaseMixin
+from channel_app.omnitron.commands.integration_actions import (
+    CreateBulkIntegrationActions,
+    GetIntegrationActionsWithObjectId,
+    UpdateBulkIntegrationActions)
+from channel_app.omnitron.constants import ResponseStatus
+from channel_app.omnitron.integration_action_mirror import (
+    IntegrationActionMirror)
+
+
+class TestIntegrationActionMirror(BaseTestCaseMixin):
+    """
+    Test case for IntegrationActionMirror
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_integration_actions.TestIntegrationActionMirror
+    """
+
+    def setUp(self) -> None:
+        self.mirror = IntegrationActionMirror(channel_id=1,
+                                              redis_client=MagicMock())
+        self.integration_actions = [
+            IntegrationAction(pk=pk, object_id=pk, remote_id=str(pk * 10),
+                              status="success",
+                              content_type={"model": "product"})
+            for pk in range(1, 4)
+        ]
+
+    def test_serialize(self):
+        integration_action = self.mirror.deserialize(
+            self.mirror.serialize(self.integration_actions[0]))
+        self.assertEqual(integration_action.remote_id, "10")
+        self.assertEqual(integration_action.content_type["model"], "product")
+
+    @patch.object(IntegrationActionMirror, 'set')
+    @patch.object(IntegrationActionMirror, 'get_by_object_ids')
+    def test_lookup(self, mock_get_by_object_ids, mock_set):
+        mock_get_by_object_ids.return_value = {
+            1: self.integration_actions[0]}
+        fetch = MagicMock(return_value=self.integration_actions[1:])
+
+        result = self.mirror.lookup("product", [1, 2, 3], fetch=fetch)
+
+        fetch.assert_called_once_with([2, 3])
+        mock_set.assert_called_once_with(self.integration_actions[1:],
+                                         content_type="product")
+        self.assertEqual(result, self.integration_actions)
+
+    @patch.object(IntegrationActionMirror, 'set')
+    @patch.object(IntegrationActionMirror, 'get_by_object_ids')
+    def test_lookup_refetches_entries_not_matching_filters(
+            self, mock_get_by_object_ids, mock_set):
+        self.integration_actions[0].status = "processing"
+        mock_get_by_object_ids.return_value = {
+            1: self.integration_actions[0]}
+        fetch = MagicMock(return_value=[])
+
+        result = self.mirror.lookup("product", [1], fetch=fetch,
+                                    status="success")
+
+        fetch.assert_called_once_with([1])
+        self.assertEqual(result, [])
+
+    def test_set_deletes_previous_remote_id(self):
+        pipeline = self.mirror.redis_client.pipeline.return_value
+        previous = IntegrationAction(pk=1, object_id=1, remote_id="old")
+        pipeline.execute.return_value = [self.mirror.serialize(previous)]
+
+        self.mirror.set(self.integration_actions[:1], content_type="product")
+
+        pipeline.hdel.assert_called_once_with(
+            "integration_action_mirror_1_product_remote", "old")
+        pipeline.hset.assert_any_call(
+            "integration_action_mirror_1_product_remote", "10", "1")
+
+    def test_set_keeps_unchanged_remote_id(self):
+        pipeline = self.mirror.redis_client.pipeline.return_value
+        pipeline.execute.return_value = [
+            self.mirror.serialize(self.integration_actions[0])]
+
+        self.mirror.set(self.integration_actions[:1], content_type="product")
+
+        pipeline.hdel.assert_not_called()
+
+    @patch('channel_app.omnitron.integration_action_mirror.'
+           'ChannelIntegrationActionEndpoint')
+    @patch.object(IntegrationActionMirror, 'set')
+    def test_sync_skips_already_synced_entries(self, mock_set,
+                                               mock_endpoint):
+        for integration_action in self.integration_actions:
+            integration_action.modified_date = "2026-01-01T00:00:00"
+        self.integration_actions[2].modified_date = "2026-01-02T00:00:00"
+        redis_client = self.mirror.redis_client
+        redis_client.exists.return_value = True
+        redis_client.mget.return_value = [b"2026-01-01T00:00:00", b"[1]"]
+        mock_endpoint.return_value.list.return_value = \
+            self.integration_actions
+        mock_endpoint.return_value.iterator = iter([])
+
+        count = self.mirror.sync("product")
+
+        params = mock_endpoint.return_value.list.call_args.kwargs["params"]
+        self.assertEqual(params["modified_date__gte"], "2026-01-01T00:00:00")
+        self.assertEqual(count, 2)
+        self.assertEqual(mock_set.call_args.args[0],
+                         self.integration_actions[1:])
+        redis_client.mset.assert_called_once_with({
+            "integration_action_mirror_1_product_synced_at":
+                "2026-01-02T00:00:00",
+            "integration_action_mirror_1_product_synced_pks": "[3]"})
+
+    @patch('channel_app.omnitron.integration_action_mirror.'
+           'ChannelIntegrationActionEndpoint')
+    def test_sync_replaces_entries_when_full(self, mock_endpoint):
+        for integration_action in self.integration_actions:
+            integration_action.modified_date = "2026-01-01T00:00:00"
+        redis_client = self.mirror.redis_client
+        redis_client.exists.return_value = False
+        mock_endpoint.return_value.list.return_value = \
+            self.integration_actions
+        mock_endpoint.return_value.iterator = iter([])
+
+        count = self.mirror.sync("product")
+
+        self.assertEqual(count, 3)
+        pipeline = redis_client.pipeline.return_value
+        pipeline.delete.assert_called_once_with(
+            "integration_action_mirror_1_product_object",
+            "integration_action_mirror_1_product_remote")
+        pipeline.rename.assert_any_call(
+            "integration_action_mirror_1_product_object_new",
+            "integration_action_mirror_1_product_object")
+        pipeline.rename.assert_any_call(
+            "integration_action_mirror_1_product_remote_new",
+            "integration_action_mirror_1_product_remote")
+        redis_client.set.assert_called_once_with(
+            "integration_action_mirror_1_product_full_synced", 1,
+            ex=self.mirror.FULL_SYNC_INTERVAL)
+
+
+class TestGetIntegrationActionsWithObjectId(BaseTestCaseMixin):
+    """
+    Test case for GetIntegrationActionsWithObjectId
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_integration_actions.TestGetIntegrationActionsWithObjectId
+    """
+
+    def setUp(self) -> None:
+        self.integration = MagicMock()
+        self.objects = [MagicMock(pk=1, content_type="product"),
+                        MagicMock(pk=2, content_type="product")]
+        self.integration_actions = [
+            IntegrationAction(pk=pk, object_id=pk, remote_id=str(pk * 10))
+            for pk in (1, 2)
+        ]
+
+    @patch.object(GetIntegrationActionsWithObjectId,
+                  'fetch_integration_actions')
+    def test_get_data_without_mirror(self, mock_fetch):
+        mock_fetch.return_value = self.integration_actions
+        instance = GetIntegrationActionsWithObjectId(
+            integration=self.integration, objects=self.objects)
+
+        instance.get_data()
+
+        mock_fetch.assert_called_once_with("product", [1, 2])
+        self.assertEqual(self.objects[1].integration_action.remote_id, "20")
+
+    @patch.object(IntegrationActionMirror, 'lookup')
+    def test_get_data_with_mirror(self, mock_lookup):
+        mock_lookup.return_value = self.integration_actions
+        self.integration.integration_action_mirror = IntegrationActionMirror(
+            channel_id=1, redis_client=MagicMock())
+        instance = GetIntegrationActionsWithObjectId(
+            integration=self.integration, objects=self.objects)
+
+        instance.get_data()
+
+        self.assertEqual(mock_lookup.call_args.args[:2], ("product", [1, 2]))
+        self.assertFalse(mock_lookup.call_args.kwargs["by_remote_id"])
+        self.assertEqual(self.objects[0].integration_action.remote_id, "10")
+
+
+class TestCreateBulkIntegrationActions(BaseTestCaseMixin):
+    """
+    Test case for CreateBulkIntegrationActions
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_integration_actions.TestCreateBulkIntegrationActions
+    """
+
+    def setUp(self) -> None:
+        self.integration = MagicMock()
+        self.instance = CreateBulkIntegrationActions(
+            integration=self.integration)
+        self.items = [{"object_id": pk, "remote_id": str(pk * 10)}
+                      for pk in range(1, 4)]
+
+    @patch.object(CreateBulkIntegrationActions, 'send_item')
+    def test_send(self, mock_send_item):
+        def send_item(item):
+            if item["object_id"] == 2:
+                raise Exception("Invalid Content Type")
+            return IntegrationAction(**item)
+
+        mock_send_item.side_effect = send_item
+        results = self.instance.send(self.items)
+
+        self.assertEqual([result.status for result in results],
+                         [ResponseStatus.success, ResponseStatus.fail,
+                          ResponseStatus.success])
+        self.assertEqual(results[0].integration_action.remote_id, "10")
+        self.assertEqual(results[1].item, self.items[1])
+        self.assertEqual(results[1].message, "Invalid Content Type")
+
+    @patch.object(IntegrationActionMirror, 'set')
+    @patch.object(CreateBulkIntegrationActions, 'send_item')
+    def test_send_updates_mirror_with_successful_items(self, mock_send_item,
+                                                        mock_set):
+        self.integration.integration_action_mirror = IntegrationActionMirror(
+            channel_id=1, redis_client=MagicMock())
+        mock_send_item.side_effect = [IntegrationAction(**self.items[0]),
+                                      Exception("Invalid Content Type")]
+
+        self.instance.MAX_WORKERS = 1
+        self.instance.send(self.items[:2])
+
+        mirrored = mock_set.call_args.args[0]
+        self.assertEqual([ia.object_id for ia in mirrored], [1])
+
+
+class TestUpdateBulkIntegrationActions(BaseTestCaseMixin):
+    """
+    Test case for UpdateBulkIntegrationActions
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_integration_actions.TestUpdateBulkIntegrationActions
+    """
+
+    def test_send_item(self):
+        endpoint = MagicMock()
+        instance = UpdateBulkIntegrationActions(integration=MagicMock())
+        instance.endpoint = MagicMock(return_value=endpoint)
+        item = IntegrationAction(pk=1, content_type={"id": 5})
+
+        results = instance.send([item])
+
+        endpoint.update.assert_called_once_with(id=1, item=item)
+        self.assertEqual(item.content_type_id, 5)
+        self.assertEqual(results[0].integration_action,
+                         endpoint.update.return_value)
@@ -2,25 +2,37 @@ from dataclasses import asdict
 from unittest.mock import MagicMock, patch
 from omnisdk.base_client import BaseClient
 from omnisdk.omnitron.endpoints import (
+    ChannelAddressEndpoint,
     ChannelCargoEndpoint, 
+    ChannelCityEndpoint,
+    ChannelTownshipEndpoint,
     ChannelCustomerEndpoint,
     ChannelOrderEndpoint,
     ChannelOrderItemEndpoint,
     ChannelCancellationRequestEndpoint,
-    ChannelBatchRequestEndpoint)
-from omnisdk.omnitron.models import CancellationRequest
+    ChannelBatchRequestEndpoint,
+    ChannelCreateOrderEndpoint)
+from omnisdk.omnitron.models import (CancellationRequest, City, Country,
+                                     Township)
 
 from channel_app.core.data import CancellationRequestDto, CustomerDto, OrderBatchRequestResponseDto
 from channel_app.core.tests import BaseTestCaseMixin
+from channel_app.omnitron.batch_request import (BatchRequestCommitBuffer,
+                                                ClientBatchRequest)
+from channel_app.omnitron.commands.orders.addresses import GetOrCreateAddress
 from channel_app.omnitron.commands.orders.cargo_companies import GetCargoCompany
-from channel_app.omnitron.commands.orders.customers import GetOrCreateCustomer
+from channel_app.omnitron.commands.orders.customers import (
+    GetOrCreateCustomer, PrefetchCustomers)
 from channel_app.omnitron.commands.orders.orders import (
     CreateCancellationRequest,
+    CreateOrders,
     GetCancellationRequestUpdates, 
     GetOrderItems, 
     GetOrderItemsWithOrder, 
+    PrefetchOrderNumbers,
     ProcessOrderBatchRequests,
     ChannelIntegrationActionEndpoint)
+from channel_app.omnitron.exceptions import CityException
 from channel_app.omnitron.constants import (
     BatchRequestStatus,
     CancellationType, 
@@ -124,6 +136,26 @@ class TestProcessOrderBatchRequests(BaseTestCaseMixin):
         self.assertEqual(result.get('1').number, "1")
         self.assertEqual(result.get('2').number, "2")
 
+    def test_get_channel_items_by_reference_object_ids_without_match(self):
+        channel_response = [
+            MagicMock(number='2'),
+            MagicMock(number='2'),
+        ]
+        model_items_by_content = {
+            "order": {
+                "1": MagicMock(pk=1),
+                "2": MagicMock(pk=2),
+                "3": MagicMock(pk=3),
+            }
+        }
+        result = self.instance.get_channel_items_by_reference_object_ids(
+            channel_response,
+            model_items_by_content,
+            self.integration_actions
+        )
+        self.assertEqual(list(result.keys()), ['2'])
+        self.assertIs(result['2'], channel_response[0])
+
     def test_get_orders_with_empty_list(self):
         id_list = []
         result = self.instance.get_orders(id_list)
@@ -216,6 +248,7 @@ class TestGetOrCreateCustomer(BaseTestCaseMixin):
         self.customer_endpoint_response = [
             MagicMock(**self.customer_endpoint_response_data)
         ]
+        GetOrCreateCustomer._customers.clear()
 
     @patch.object(GetOrCreateCustomer, 'get_customer')
     def test_get_data(self, mock_get_customer):
@@ -337,6 +370,72 @@ class TestGetOrCreateCustomer(BaseTestCaseMixin):
             for key, value in self.customer_endpoint_response_data.items():
                 self.assertEqual(getattr(customer, key), value)
 
+    def test_get_customer_uses_cached_customer(self):
+        self.instance.integration.channel.conf = {
+            "CUSTOMER_IDENTIFIER_FIELD": CustomerIdentifierField.email
+        }
+        response = MagicMock()
+        response.list.return_value = self.customer_endpoint_response
+
+        with patch.object(ChannelCustomerEndpoint, '__new__',
+                          return_value=response):
+            self.instance.get_customer(self.instance.objects)
+            customer = self.instance.get_customer(self.instance.objects)[0]
+
+        self.assertEqual(customer.pk, 1)
+        response.list.assert_called_once()
+        response.update.assert_not_called()
+
+    def test_prefetch_customers(self):
+        self.instance.integration.channel.conf = {
+            "CUSTOMER_IDENTIFIER_FIELD": CustomerIdentifierField.email
+        }
+        other_customer = MagicMock(
+            **dict(self.customer_endpoint_response_data, pk=2,
+                   email="jane.doe@akinon.com"))
+        response = MagicMock()
+        response.list.return_value = self.customer_endpoint_response + [
+            other_customer]
+        prefetch = PrefetchCustomers(
+            integration=self.mock_integration,
+            objects=[self.instance.objects, self.instance.objects])
+
+        with patch.object(ChannelCustomerEndpoint, '__new__',
+                          return_value=response):
+            customers = prefetch.send(prefetch.get_data())
+            customer = self.instance.get_customer(self.instance.objects)[0]
+
+        self.assertEqual([c.pk for c in customers], [1])
+        self.assertEqual(customer.pk, 1)
+        response.list.assert_called_once_with(params={
+            "email__in": "john.doe@akinon.com",
+            "channel": self.mock_integration.channel_id,
+            "limit": 1})
+
+    @patch.object(ClientBatchRequest, 'to_fail')
+    @patch.object(ClientBatchRequest, 'to_done')
+    def test_prefetch_customers_run_keeps_batch_request(self, mock_to_done,
+                                                        mock_to_fail):
+        integration = MagicMock()
+        integration.channel.conf = {
+            "CUSTOMER_IDENTIFIER_FIELD": CustomerIdentifierField.email
+        }
+        response = MagicMock()
+        response.list.return_value = []
+        prefetch = PrefetchCustomers(integration=integration,
+                                     objects=[self.instance.objects])
+
+        with patch.object(ChannelCustomerEndpoint, '__new__',
+                          return_value=response), \
+                patch.object(ClientBatchRequest, '__init__',
+                             return_value=None):
+            result = prefetch.run()
+
+        self.assertEqual(result, [])
+        mock_to_done.assert_not_called()
+        mock_to_fail.assert_not_called()
+        self.assertIsNot(integration.batch_request.objects, None)
+
 
 class TestGetCargoCompany(BaseTestCaseMixin):
     """
@@ -362,6 +461,7 @@ class TestGetCargoCompany(BaseTestCaseMixin):
         self.channel_cargo_endpoint_response = [
             MagicMock(**self.channel_cargo_endpoint_response_data)
         ]
+        GetCargoCompany._cargo_companies.clear()
 
     def test_get_cargo_company(self):
         cargo_company = self.instance.get_cargo_company(
@@ -402,8 +502,279 @@ class TestGetCargoCompany(BaseTestCaseMixin):
                 cargo_company.erp_code, 
                 self.channel_cargo_endpoint_response_data['erp_code']
             )
+
+    def test_get_data_uses_cached_cargo_companies(self):
+        endpoint = MagicMock()
+        endpoint.list.return_value = list(self.channel_cargo_endpoint_response)
+        endpoint.iterator = iter([])
+
+        with patch.object(ChannelCargoEndpoint, '__new__',
+                          return_value=endpoint):
+            self.instance.get_data()
+            cargo_company = self.instance.get_data()[0]
+
+        self.assertEqual(cargo_company.pk, 1)
+        self.assertEqual(endpoint.list.call_count, 1)
+
+    def test_get_data_refreshes_cargo_companies_on_miss(self):
+        endpoint = MagicMock()
+        endpoint.list.return_value = []
+        endpoint.iterator = iter([])
+
+        with patch.object(ChannelCargoEndpoint, '__new__',
+                          return_value=endpoint):
+            self.instance.get_cargo_companies()
+            endpoint.list.return_value = list(
+                self.channel_cargo_endpoint_response)
+            cargo_company = self.instance.get_data()[0]
+
+        self.assertEqual(cargo_company.pk, 1)
+        self.assertEqual(endpoint.list.call_count, 2)
         
 
+class TestGetOrCreateAddress(BaseTestCaseMixin):
+    """
+    Test case for the location lookups of GetOrCreateAddress
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_orders.TestGetOrCreateAddress
+    """
+
+    def setUp(self) -> None:
+        self.instance = GetOrCreateAddress(
+            integration=self.mock_integration,
+        )
+        GetOrCreateAddress._locations.clear()
+        GetOrCreateAddress._addresses.clear()
+        self.country = Country(pk=1, name="Turkey", code="tr")
+        self.city = City(pk=34, name="İstanbul", country=1)
+
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_name')
+    def test_get_city_is_cached_by_normalized_name(self, mock_fetch_city):
+        mock_fetch_city.return_value = self.city
+
+        self.instance.get_city(country=self.country, city_name="İstanbul")
+        city = self.instance.get_city(country=self.country,
+                                      city_name=" İSTANBUL ".lower())
+
+        self.assertEqual(city.pk, 34)
+        mock_fetch_city.assert_called_once()
+
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_mapping')
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_name')
+    def test_mapped_city_is_cached_by_raw_code(self, mock_fetch_by_name,
+                                               mock_fetch_by_mapping):
+        mock_fetch_by_name.return_value = None
+        mock_fetch_by_mapping.side_effect = lambda country, city_name: \
+            self.city if city_name == "IST" else None
+
+        city = self.instance.get_city(country=self.country, city_name="IST")
+        other_city = self.instance.get_city(country=self.country,
+                                            city_name="ist")
+
+        self.assertEqual(city.pk, 34)
+        self.assertIsNone(other_city)
+        self.assertEqual(mock_fetch_by_name.call_count, 1)
+        self.assertEqual(mock_fetch_by_mapping.call_count, 2)
+
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_mapping')
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_name')
+    def test_missing_city_is_negative_cached(self, mock_fetch_by_name,
+                                             mock_fetch_by_mapping):
+        mock_fetch_by_name.return_value = None
+        mock_fetch_by_mapping.side_effect = CityException(
+            params={"code": "x"})
+
+        for _ in range(2):
+            with self.assertRaises(CityException) as context:
+                self.instance.get_city(country=self.country, city_name="x")
+            self.assertEqual(context.exception.params, {"code": "x"})
+
+        mock_fetch_by_name.assert_called_once()
+        mock_fetch_by_mapping.assert_called_once()
+
+    @patch.object(GetOrCreateAddress, 'fetch_township_by_name')
+    @patch.object(GetOrCreateAddress, 'fetch_city_by_name')
+    @patch.object(GetOrCreateAddress, 'get_country')
+    def test_preload_locations(self, mock_get_country, mock_fetch_city,
+                               mock_fetch_township):
+        mock_get_country.return_value = self.country
+        city_endpoint = MagicMock()
+        city_endpoint.list.return_value = [self.city]
+        city_endpoint.iterator = iter([])
+        township_endpoint = MagicMock()
+        township_endpoint.list.return_value = [
+            Township(pk=1, city=34, name="Kadıköy"),
+            Township(pk=2, city=34, name="Fatih"),
+            Township(pk=3, city=34, name="fatih")]
+        township_endpoint.iterator = iter([])
+
+        with patch.object(ChannelCityEndpoint, '__new__',
+                          return_value=city_endpoint), \
+                patch.object(ChannelTownshipEndpoint, '__new__',
+                             return_value=township_endpoint):
+            count = self.instance.preload_locations(country_code="tr")
+
+        self.assertEqual(count, 2)
+        city = self.instance.get_city(country=self.country,
+                                      city_name="İstanbul")
+        township = self.instance.get_township(
+            country=self.country, city=city, township_name="Kadıköy")
+        self.assertEqual(township.pk, 1)
+        mock_fetch_city.assert_not_called()
+        mock_fetch_township.assert_not_called()
+        self.instance.get_township(country=self.country, city=city,
+                                   township_name="Fatih")
+        mock_fetch_township.assert_called_once()
+
+    def test_send_reuses_created_address(self):
+        validated_data = {"customer": 1, "line": "Moda Cd. 1", "city": 34}
+        endpoint = MagicMock()
+        endpoint.create.return_value = MagicMock(pk=5)
+
+        with patch.object(ChannelAddressEndpoint, '__new__',
+                          return_value=endpoint):
+            self.instance.send(validated_data)
+            address = self.instance.send(dict(validated_data))[0]
+            self.instance.send(dict(validated_data, line="Moda Cd. 2"))
+
+        self.assertEqual(address.pk, 5)
+        self.assertEqual(endpoint.create.call_count, 2)
+
+
+class TestCreateOrders(BaseTestCaseMixin):
+    """
+    Test case for the duplicate order checks of CreateOrders
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_orders.TestCreateOrders
+    """
+
+    def setUp(self) -> None:
+        self.instance = CreateOrders(
+            integration=self.mock_integration,
+        )
+        CreateOrders._order_numbers.clear()
+        CreateOrders._product_ids.clear()
+        self.order_endpoint = MagicMock()
+        self.create_order_endpoint = MagicMock()
+        self.validated_data = {"order": {"number": "1001"}, "order_item": []}
+
+    def send(self):
+        with patch.object(ChannelOrderEndpoint, '__new__',
+                          return_value=self.order_endpoint), \
+                patch.object(ChannelCreateOrderEndpoint, '__new__',
+                             return_value=self.create_order_endpoint), \
+                patch.object(CreateOrders, '_update_batch_request'):
+            return self.instance.send(self.validated_data)
+
+    def prefetch(self, order_numbers):
+        prefetch = PrefetchOrderNumbers(integration=self.mock_integration,
+                                        objects=order_numbers)
+        with patch.object(ChannelOrderEndpoint, '__new__',
+                          return_value=self.order_endpoint):
+            return prefetch.send(prefetch.get_data())
+
+    def test_prefetched_existing_order_is_not_created(self):
+        self.order_endpoint.list.return_value = [
+            MagicMock(number="1001"), MagicMock(number="9999")]
+
+        existing_numbers = self.prefetch(["1001", "1002", "1001"])
+        self.send()
+
+        self.assertEqual(existing_numbers, ["1001"])
+        self.order_endpoint.list.assert_called_once_with(params={
+            "number__in": "1001,1002",
+            "channel_id": self.mock_integration.channel_id,
+            "limit": 2})
+        self.create_order_endpoint.create.assert_not_called()
+
+    def test_prefetched_missing_order_is_created_without_check(self):
+        self.order_endpoint.list.return_value = []
+
+        self.prefetch(["1001"])
+        self.send()
+
+        self.order_endpoint.list.assert_called_once()
+        self.create_order_endpoint.create.assert_called_once()
+
+    @patch.object(CreateOrders, 'get_product_integration_actions')
+    def test_get_products_caches_found_and_missing_products(
+            self, mock_get_product_integration_actions):
+        mock_get_product_integration_actions.return_value = [
+            MagicMock(remote_id="sku-1", object_id=11)]
+        order_items = [MagicMock(product="sku-1"), MagicMock(product="sku-2")]
+
+        products = self.instance.get_products(order_items)
+        self.assertEqual(self.instance.get_products(order_items), products)
+
+        self.assertEqual(products, {"sku-1": 11})
+        mock_get_product_integration_actions.assert_called_once()
+        self.assertEqual(
+            sorted(mock_get_product_integration_actions.call_args.args[0]),
+            ["sku-1", "sku-2"])
+
+    def test_order_is_checked_when_not_prefetched(self):
+        self.order_endpoint.list.return_value = []
+
+        self.send()
+        self.send()
+
+        self.order_endpoint.list.assert_called_once()
+        self.create_order_endpoint.create.assert_called_once()
+
+
+class TestCreateOrdersBatchRequestUpdate(BaseTestCaseMixin):
+    """
+    Test case for the batch request updates of CreateOrders
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_orders.TestCreateOrdersBatchRequestUpdate
+    """
+
+    def setUp(self) -> None:
+        self.integration = MagicMock()
+        self.batch_objects = []
+        self.instance = CreateOrders(integration=self.integration,
+                                     batch_objects=self.batch_objects)
+        self.order = MagicMock(
+            pk=1, modified_date="2024-01-01", extra_field={"id": "R1"},
+            order_item=[{"pk": 10, "modified_date": "2024-01-01",
+                         "extra_field": {"id": "R1-1"}}])
+
+    @patch.object(CreateOrders, 'get_order_items')
+    @patch.object(ClientBatchRequest, 'to_commit')
+    @patch.object(ClientBatchRequest, '__init__', return_value=None)
+    def test_objects_are_committed_in_bulk(self, mock_init, mock_to_commit,
+                                           mock_get_order_items):
+        self.integration.batch_commit_buffer = BatchRequestCommitBuffer(
+            integration=self.integration, flush_size=4, max_commit_size=3)
+
+        self.instance._update_batch_request(self.order)
+        mock_to_commit.assert_not_called()
+        self.instance._update_batch_request(self.order)
+
+        mock_get_order_items.assert_not_called()
+        self.assertEqual(mock_to_commit.call_count, 2)
+        self.assertEqual(len(self.batch_objects), 4)
+        self.assertEqual(self.batch_objects[1]["remote_id"], "R1-1")
+        self.assertEqual(self.integration.batch_request.objects,
+                         self.batch_objects[3:])
+
+    @patch.object(CreateOrders, 'get_order_items')
+    @patch.object(CreateOrders, 'update_batch_request')
+    def test_order_items_are_fetched_without_create_response_items(
+            self, mock_update_batch_request, mock_get_order_items):
+        self.integration.batch_commit_buffer = None
+        self.order.order_item = None
+        mock_get_order_items.return_value = [
+            MagicMock(pk=10, modified_date="2024-01-01",
+                      extra_field={"id": "R1-1"})]
+
+        self.instance._update_batch_request(self.order)
+
+        mock_get_order_items.assert_called_once_with(order_pk=1)
+        mock_update_batch_request.assert_called_once_with(
+            objects_data=self.batch_objects)
+
+
 class TestGetOrderItems(BaseTestCaseMixin):
     """
     Test case for GetOrderItems
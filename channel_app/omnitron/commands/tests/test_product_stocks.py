@@ -1,6 +1,7 @@
 from typing import List
 from unittest.mock import patch, MagicMock
 from omnisdk.base_client import BaseClient
+from omnisdk.omnitron.endpoints import ChannelProductStockEndpoint
 from channel_app.core.data import BatchRequestResponseDto
 from channel_app.core.tests import BaseTestCaseMixin
 from channel_app.omnitron.batch_request import ClientBatchRequest
@@ -101,3 +102,19 @@ class TestProcessStockBatchRequests(BaseTestCaseMixin):
         )
         self.assertEqual(len(result), 1)
         self.assertEqual(result.get("1").sku, "1")
+
+    @patch.object(BaseClient, 'get_instance')
+    @patch.object(ChannelProductStockEndpoint, 'list')
+    def test_get_stocks_in_chunks(self, mock_list, mock_get_instance):
+        self.instance.CHUNK_SIZE = 2
+        mock_list.side_effect = lambda params: [
+            MagicMock(pk=int(pk), product=int(pk) + 100)
+            for pk in params["pk__in"].split(",")
+        ]
+        id_list = [str(pk) for pk in range(1, 6)]
+
+        result = self.instance.get_stocks(id_list)
+
+        self.assertEqual(mock_list.call_count, 3)
+        self.assertEqual(sorted(result.keys()), [101, 102, 103, 104, 105])
+        self.assertEqual(result[103].pk, 3)
@@ -56,6 +56,7 @@ from channel_app.omnitron.commands.products import (
     GetProductCategoryNodes,
     GetProductCategoryNodesWithIntegrationAction,
 )
+from channel_app.omnitron.attribute_config_cache import AttributeConfigCache
 from channel_app.omnitron.constants import (
     BatchRequestStatus,
     ContentType,
@@ -514,6 +515,73 @@ class TestGetMappedProducts(BaseTestCaseMixin):
                 "Test error"
             )
 
+    @patch.object(GetMappedProducts, 'get_attribute_config_list')
+    def test_get_attribute_configs_with_cache(
+        self,
+        mock_get_attribute_config_list
+    ):
+        config = ChannelAttributeConfig(attribute={"pk": 1, "name": "Renk"},
+                                        is_required=True)
+        mock_get_attribute_config_list.return_value = [config]
+        redis_client = MagicMock()
+        redis_client.get.return_value = None
+        integration = MagicMock()
+        integration.attribute_config_cache = AttributeConfigCache(
+            channel_id=1, redis_client=redis_client)
+        self.get_mapped_products.integration = integration
+
+        configs = self.get_mapped_products.get_attribute_configs(1)
+
+        self.assertEqual(configs, [config])
+        cached_value = redis_client.set.call_args.args[1]
+
+        redis_client.get.return_value = cached_value.encode("utf-8")
+        configs = self.get_mapped_products.get_attribute_configs(1)
+
+        mock_get_attribute_config_list.assert_called_once()
+        self.assertEqual(configs[0].attribute, {"pk": 1, "name": "Renk"})
+        self.assertTrue(configs[0].is_required)
+        self.get_mapped_products.integration = self.mock_integration
+
+    def test_get_mapping(self):
+        def retrieve(headers, id):
+            if id == 2:
+                response = MagicMock(status_code=406)
+                response.json.return_value = {"error": "Mapping failed"}
+                raise HTTPError(response=response)
+            return MagicMock(pk=id)
+
+        endpoint = MagicMock()
+        endpoint.retrieve.side_effect = retrieve
+        with patch.object(ChannelMappedProductEndpoint, '__new__',
+                          return_value=endpoint):
+            products = self.get_mapped_products.get_mapping(
+                self.sample_products)
+
+        self.assertEqual(products[0].mapped_attributes.pk, 1)
+        self.assertEqual(products[1].mapped_attributes, {})
+        self.assertEqual(products[1].failed_reason_type,
+                         FailedReasonType.mapping.value)
+        self.assertEqual(self.get_mapped_products.failed_object_list,
+                         [(products[1], ContentType.product.value,
+                           "Mapping failed")])
+
+    def test_get_mapping_with_languages(self):
+        self.get_mapped_products.param_language = ["tr-tr", "en-us"]
+        endpoint = MagicMock()
+        endpoint.retrieve.side_effect = lambda headers, id: MagicMock(
+            language=headers["Accept-Language"])
+        with patch.object(ChannelMappedProductEndpoint, '__new__',
+                          return_value=endpoint):
+            products = self.get_mapped_products.get_mapping(
+                self.sample_products[:1])
+
+        self.assertEqual(endpoint.retrieve.call_count, 2)
+        self.assertEqual(products[0].mapped_attributes.language, "tr-tr")
+        self.assertEqual(
+            products[0].mapped_attributes_by_language["en-us"].language,
+            "en-us")
+
 
 class TestGetMappedProductsWithOutCommit(TestGetMappedProducts):
     pass
@@ -794,6 +862,8 @@ class TestGetProductCategoryNodes(BaseTestCaseMixin):
         )
 
     def test_get_product_category(self):
+        self.get_product_category_nodes.param_batched = False
+        GetProductCategoryNodes._category_tree_paths.clear()
         products = self.sample_products
         category_tree_id = 1
         category_tree = MagicMock()
@@ -843,6 +913,47 @@ class TestGetProductCategoryNodes(BaseTestCaseMixin):
             []
         )
 
+    def test_get_product_category_batched(self):
+        GetProductCategoryNodes._category_tree_paths.clear()
+        self.get_product_category_nodes.param_batched = True
+        products = self.sample_products
+        category_tree = MagicMock()
+        category_tree.category_root = {"path": "/root/category"}
+        category_tree_endpoint = MagicMock()
+        category_tree_endpoint.retrieve.return_value = category_tree
+        product_category_endpoint = MagicMock()
+        product_category_endpoint.list.return_value = [
+            MagicMock(product=1,
+                      category={"path": "/root/category/category1"}),
+            MagicMock(product=1,
+                      category={"path": "/other_root/category1"}),
+            MagicMock(product=2,
+                      category={"path": "/other_root/category2"}),
+        ]
+        product_category_endpoint.iterator = []
+
+        with patch.object(
+                ChannelCategoryTreeEndpoint,
+                '__new__',
+                return_value=category_tree_endpoint,
+        ), patch.object(
+            ChannelProductCategoryEndpoint,
+            '__new__',
+            return_value=product_category_endpoint,
+        ):
+            self.get_product_category_nodes.get_product_category(products)
+            self.get_product_category_nodes.get_product_category(products)
+
+        product_category_endpoint.list.assert_called_with(
+            params={"product__in": "1,2", "limit": 50})
+        category_tree_endpoint.retrieve.assert_called_once()
+        self.assertEqual(products[0].category_nodes,
+                         [{"path": "/root/category/category1"}])
+        self.assertEqual(
+            self.get_product_category_nodes.failed_object_list[0],
+            (products[1], ContentType.product.value,
+             "ProductCategoryNotFound"))
+
     def test_get_product_category_with_empty_products(self):
         products = []
         result = self.get_product_category_nodes.get_product_category(products)
@@ -2953,4 +3064,102 @@ class TestProcessDeletedProductBatchRequests(BaseTestCaseMixin):
         self.assertEqual(result[2].remote_id, 3)
         self.assertEqual(result[3].remote_id, 4)
         self.assertEqual(result[4].remote_id, 5)
+
+    def test_get_remote_id_chunks(self):
+        self.instance.REMOTE_ID_CHUNK_SIZE = 3
+        self.instance.REMOTE_ID_CHUNK_LENGTH = 10
+        chunks = self.instance.get_remote_id_chunks(
+            ["1", "2", "3", "4", "12345678", "5"])
+        self.assertEqual(chunks, [["1", "2", "3"], ["4"], ["12345678"],
+                                  ["5"]])
+
+    @patch.object(ChannelIntegrationActionEndpoint, '__new__')
+    def test_get_integration_actions_for_remote_ids_filters_remote_ids(
+        self,
+        mock_endpoint
+    ):
+        mock_endpoint.return_value.list.return_value = [
+            MagicMock(remote_id=1),
+            MagicMock(remote_id=3),
+        ]
+        mock_endpoint.return_value.iterator = []
+
+        result = self.instance.get_integration_actions_for_remote_ids([1, 2])
+
+        self.assertEqual([ia.remote_id for ia in result], [1])
+        mock_endpoint.return_value.list.assert_called_once()
+
+    @patch('channel_app.omnitron.commands.products.time.sleep')
+    def test_delete_integration_action_retries_rate_limited_requests(
+            self, mock_sleep):
+        endpoint = MagicMock()
+        endpoint.delete.side_effect = [
+            HTTPError(response=MagicMock(status_code=429)), None]
+
+        error = self.instance.delete_integration_action(
+            endpoint, MagicMock(pk=1))
+
+        self.assertIsNone(error)
+        self.assertEqual(endpoint.delete.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    @patch('channel_app.omnitron.commands.products.time.sleep')
+    def test_delete_integration_action_does_not_retry_server_errors(
+            self, mock_sleep):
+        endpoint = MagicMock()
+        endpoint.delete.side_effect = HTTPError(
+            response=MagicMock(status_code=502, text="Bad Gateway"))
+
+        error = self.instance.delete_integration_action(
+            endpoint, MagicMock(pk=1))
+
+        self.assertIn("Bad Gateway", error)
+        endpoint.delete.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_delete_integration_action_does_not_retry_client_errors(self):
+        endpoint = MagicMock()
+        endpoint.delete.side_effect = HTTPError(
+            response=MagicMock(status_code=400, text="Bad Request"))
+
+        error = self.instance.delete_integration_action(
+            endpoint, MagicMock(pk=1))
+
+        self.assertIn("Bad Request", error)
+        endpoint.delete.assert_called_once()
+
+    @patch.object(BaseClient, 'get_instance')
+    @patch.object(ProcessDeletedProductBatchRequests,
+                  'delete_integration_action')
+    @patch.object(ProcessDeletedProductBatchRequests,
+                  'get_integration_actions_for_remote_ids')
+    @patch.object(ChannelIntegrationActionEndpoint, '__new__')
+    @patch.object(ProcessDeletedProductBatchRequests, 'create_batch_objects')
+    @patch.object(ProcessDeletedProductBatchRequests, 'update_batch_request')
+    def test_process_item_reports_failed_deletions(
+        self,
+        mock_update_batch_request,
+        mock_create_batch_objects,
+        mock_endpoint,
+        mock_get_integration_actions,
+        mock_delete_integration_action,
+        mock_get_instance
+    ):
+        integration_actions = [
+            MagicMock(pk=1, content_type={"model": ContentType.product.value},
+                      failed_reason_type=None),
+            MagicMock(pk=2, content_type={"model": ContentType.product.value},
+                      failed_reason_type=None),
+        ]
+        mock_get_integration_actions.return_value = integration_actions
+        mock_delete_integration_action.side_effect = \
+            lambda endpoint, ia: "Server Error" if ia.pk == 2 else None
+
+        self.instance.process_item(self.sample_response[:1])
+
+        self.assertIsNone(integration_actions[0].failed_reason_type)
+        mock_create_batch_objects.assert_called_once_with(
+            data=[integration_actions[1]],
+            content_type=ContentType.integration_action.value
+        )
         
\ No newline at end of file
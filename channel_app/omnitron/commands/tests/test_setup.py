@@ -0,0 +1,137 @@
+from unittest.mock import MagicMock, patch
+
+from omnisdk.omnitron.models import IntegrationAction
+
+from channel_app.core.data import (CategoryAttributeDto, CategoryDto,
+                                   CategoryNodeDto)
+from channel_app.core.tests import BaseTestCaseMixin
+from channel_app.omnitron.category_attribute_fingerprint import \
+    CategoryAttributeFingerprintStore
+from channel_app.omnitron.commands.setup import (
+    CreateOrUpdateCategoryAttributes, CreateOrUpdateCategoryTreeAndNodes)
+
+
+class TestCreateOrUpdateCategoryTreeAndNodes(BaseTestCaseMixin):
+    """
+    Test case for CreateOrUpdateCategoryTreeAndNodes
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_setup.TestCreateOrUpdateCategoryTreeAndNodes
+    """
+
+    def setUp(self) -> None:
+        self.instance = CreateOrUpdateCategoryTreeAndNodes(
+            integration=MagicMock())
+        self.content_type = MagicMock(id=5, model="categorynode")
+        self.node_endpoint = MagicMock()
+        self.integration_action_endpoint = MagicMock()
+
+    def sync_node(self, current, integration_actions):
+        self.instance.sync_node(
+            current, content_type=self.content_type,
+            integration_actions=integration_actions,
+            integration_action_endpoint=self.integration_action_endpoint,
+            node_endpoint=self.node_endpoint)
+
+    def test_sync_node_skips_unchanged_node(self):
+        current = CategoryNodeDto(name="Shoes", children=[], remote_id="1")
+        integration_actions = {"1": IntegrationAction(
+            pk=10, object_id=100, remote_id="1", state={"name": "Shoes"})}
+
+        self.sync_node(current, integration_actions)
+
+        self.assertEqual(current.omnitron_id, 100)
+        self.node_endpoint.update.assert_not_called()
+        self.integration_action_endpoint.update.assert_not_called()
+
+    def test_sync_node_updates_renamed_node(self):
+        current = CategoryNodeDto(name="Sneakers", children=[], remote_id="1")
+        integration_actions = {"1": IntegrationAction(
+            pk=10, object_id=100, remote_id="1", state={"name": "Shoes"})}
+
+        self.sync_node(current, integration_actions)
+
+        self.assertEqual(self.node_endpoint.update.call_args.kwargs["id"], 100)
+        integration_action = \
+            self.integration_action_endpoint.update.call_args.kwargs["item"]
+        self.assertEqual(integration_action.state, {"name": "Sneakers"})
+
+    @patch.object(CreateOrUpdateCategoryTreeAndNodes, 'get_integration_action')
+    def test_sync_node_creates_node_under_synced_parent(
+            self, mock_get_integration_action):
+        parent = CategoryNodeDto(name="Shoes", children=[], remote_id="1")
+        parent.omnitron_id = 100
+        current = CategoryNodeDto(name="Boots", children=[], remote_id="2",
+                                  parent=parent)
+        self.node_endpoint.create.return_value = MagicMock(pk=101)
+        integration_actions = {}
+
+        self.sync_node(current, integration_actions)
+
+        mock_get_integration_action.assert_not_called()
+        node = self.node_endpoint.create.call_args.kwargs["item"]
+        self.assertEqual(node.node, 100)
+        self.assertEqual(current.omnitron_id, 101)
+        self.assertEqual(integration_actions["2"],
+                         self.integration_action_endpoint.create.return_value)
+
+
+class TestCreateOrUpdateCategoryAttributes(BaseTestCaseMixin):
+    """
+    Test case for CreateOrUpdateCategoryAttributes with a category attribute
+    fingerprint store
+
+    run: python -m unittest channel_app.omnitron.commands.tests.test_setup.TestCreateOrUpdateCategoryAttributes
+    """
+
+    def setUp(self) -> None:
+        self.redis_client = MagicMock()
+        self.store = CategoryAttributeFingerprintStore(
+            channel_id=1, redis_client=self.redis_client)
+        self.integration = MagicMock(
+            category_attribute_fingerprint_store=self.store)
+        self.instance = CreateOrUpdateCategoryAttributes(
+            integration=self.integration)
+        self.color = CategoryAttributeDto(
+            remote_id="10", name="Color", required=True, variant=True,
+            allow_custom_value=False, values=[])
+        self.size = CategoryAttributeDto(
+            remote_id="11", name="Size", required=True, variant=True,
+            allow_custom_value=False, values=[])
+        self.category = CategoryDto(remote_id="1", name="Shoes",
+                                    attributes=[self.color, self.size])
+        self.integration_action = IntegrationAction(
+            pk=10, object_id=100, remote_id="1", version_date="2021-01-01")
+
+    def encode(self, dto):
+        return self.store.fingerprint(dto).encode("utf-8")
+
+    @patch.object(CreateOrUpdateCategoryAttributes,
+                  'update_category_node_version_date')
+    def test_unchanged_category_is_skipped(self, mock_update_version_date):
+        self.redis_client.hget.return_value = self.encode(self.category)
+
+        result = self.instance.send((self.integration_action, self.category))
+
+        self.assertEqual(result, [self.integration_action])
+        self.integration.do_action.assert_not_called()
+        mock_update_version_date.assert_not_called()
+
+    @patch.object(CreateOrUpdateCategoryAttributes,
+                  'update_category_node_version_date')
+    def test_only_changed_attributes_are_synced(self, mock_update_version_date):
+        self.redis_client.hget.return_value = None
+        self.redis_client.hmget.return_value = [self.encode(self.color), None]
+
+        self.instance.send((self.integration_action, self.category))
+
+        attribute_calls = [
+            call.kwargs["objects"]["remote_id"]
+            for call in self.integration.do_action.call_args_list
+            if call.kwargs["key"] == "create_or_update_channel_attribute"]
+        self.assertEqual(attribute_calls, ["11"])
+        pipeline = self.redis_client.pipeline.return_value
+        fingerprints = pipeline.hset.call_args.kwargs["mapping"]
+        self.assertEqual(set(fingerprints),
+                         {self.store.category_field, "10", "11"})
+        pipeline.execute.assert_called_once()
+        mock_update_version_date.assert_called_once()
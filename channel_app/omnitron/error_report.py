@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from typing import List
+
+from channel_app.core.data import ErrorReportDto
+
+logger = logging.getLogger(__name__)
+
+
+class ErrorReportBuffer(object):
+    """
+    Error reports are not critical for the flow they belong to, so instead of
+    sending each of them on the spot they are collected here and sent in bulk.
+    Reports are flushed once `flush_size` reports are waiting, `flush_interval`
+    seconds passed since the last flush or the integration exits. After
+    `start` is called a timer thread checks the interval, so that the reports
+    of a long running flow do not wait for the next report to be sent.
+    """
+    FLUSH_SIZE = 50
+    FLUSH_INTERVAL = 30
+
+    def __init__(self, integration, flush_size=None, flush_interval=None):
+        self.integration = integration
+        self.flush_size = flush_size or self.FLUSH_SIZE
+        self.flush_interval = flush_interval or self.FLUSH_INTERVAL
+        self.reports = []
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = None
+
+    def start(self):
+        if self._timer is not None:
+            return
+        self._stop.clear()
+        self._timer = threading.Thread(target=self._flush_periodically,
+                                       daemon=True)
+        self._timer.start()
+
+    def close(self):
+        """
+        Stops the timer thread and sends the waiting reports.
+        """
+        if self._timer is not None:
+            self._stop.set()
+            self._timer.join()
+            self._timer = None
+        self.flush()
+
+    def add(self, report: ErrorReportDto):
+        with self._lock:
+            self.reports.append(report)
+            if not self.should_flush():
+                return
+            reports = self._pop_reports()
+        self.send(reports)
+
+    def flush(self):
+        with self._lock:
+            reports = self._pop_reports()
+        self.send(reports)
+
+    def flush_if_due(self):
+        with self._lock:
+            if not self.reports or not self.should_flush():
+                return
+            reports = self._pop_reports()
+        self.send(reports)
+
+    def should_flush(self) -> bool:
+        if len(self.reports) >= self.flush_size:
+            return True
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def send(self, reports: List[ErrorReportDto]):
+        if not reports:
+            return
+        self.integration.do_action(key="create_error_reports",
+                                   objects=reports)
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush_if_due()
+            except Exception:
+                logger.exception("Error reports could not be sent")
+
+    def _pop_reports(self) -> List[ErrorReportDto]:
+        reports, self.reports = self.reports, []
+        self.last_flush = time.monotonic()
+        return reports
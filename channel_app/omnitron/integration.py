@@ -1,20 +1,33 @@
+from channel_app.core.cache import SharedCache
 from channel_app.core.clients import OmnitronApiClient
 
+from channel_app.core.instrumentation import (configure_instrumentation,
+                                               instrumentation)
 from channel_app.core.integration import BaseIntegration
+from channel_app.omnitron.attribute_config_cache import AttributeConfigCache
 from channel_app.omnitron.batch_request import ClientBatchRequest
+from channel_app.omnitron.category_attribute_fingerprint import \
+    CategoryAttributeFingerprintStore
+from channel_app.omnitron.error_report import ErrorReportBuffer
+from channel_app.omnitron.integration_action_mirror import \
+    IntegrationActionMirror
 from channel_app.omnitron.commands.batch_requests import GetBatchRequests, \
     BatchRequestUpdate
 from channel_app.omnitron.commands.error_reports import \
     CreateAddressErrorReports, \
-    CreateErrorReports
+    CreateErrorReports, CreateBulkErrorReports
 from channel_app.omnitron.commands.integration_actions import \
     CreateIntegrationActions, \
     GetIntegrationActionsWithObjectId, GetIntegrationActionsWithRemoteId, \
     UpdateIntegrationActions, \
-    GetIntegrationActions, GetObjectsFromIntegrationAction
-from channel_app.omnitron.commands.orders.addresses import GetOrCreateAddress
+    GetIntegrationActions, GetObjectsFromIntegrationAction, \
+    SyncIntegrationActionMirror, CreateBulkIntegrationActions, \
+    UpdateBulkIntegrationActions
+from channel_app.omnitron.commands.orders.addresses import (
+    GetOrCreateAddress, PreloadLocations)
 from channel_app.omnitron.commands.orders.cargo_companies import GetCargoCompany
-from channel_app.omnitron.commands.orders.customers import GetOrCreateCustomer
+from channel_app.omnitron.commands.orders.customers import (
+    GetOrCreateCustomer, PrefetchCustomers)
 from channel_app.omnitron.commands.orders.orders import (
     CreateOrders,
     CreateOrderShippingInfo,
@@ -22,6 +35,7 @@ from channel_app.omnitron.commands.orders.orders import (
     CreateCancellationRequest,
     GetOrders,
     ProcessOrderBatchRequests,
+    PrefetchOrderNumbers,
     CreateOrderCancel,
     GetCancellationRequest,
     GetOrderItems,
@@ -103,9 +117,12 @@ class OmnitronIntegration(BaseIntegration):
         "process_order_batch_requests": ProcessOrderBatchRequests,
         "process_delete_product_batch_requests": ProcessDeletedProductBatchRequests,
         "get_or_create_customer": GetOrCreateCustomer,
+        "prefetch_customers": PrefetchCustomers,
         "get_or_create_address": GetOrCreateAddress,
+        "preload_locations": PreloadLocations,
         "get_cargo_company": GetCargoCompany,
         "create_order": CreateOrders,
+        "prefetch_order_numbers": PrefetchOrderNumbers,
         "get_orders": GetOrders,
         "get_order_items": GetOrderItems,
         "get_order_items_with_order": GetOrderItemsWithOrder,
@@ -115,12 +132,16 @@ class OmnitronIntegration(BaseIntegration):
         "create_or_update_category_attributes_async": AsyncCreateOrUpdateCategoryAttributes,
         "create_address_error_report": CreateAddressErrorReports,
         "create_error_report": CreateErrorReports,
+        "create_error_reports": CreateBulkErrorReports,
         "get_integration_with_object_id": GetIntegrationActionsWithObjectId,
         "get_integration_with_remote_id": GetIntegrationActionsWithRemoteId,
         "get_integrations": GetIntegrationActions,
         "get_content_objects_from_integrations": GetObjectsFromIntegrationAction,
         "create_integration": CreateIntegrationActions,
         "update_integration": UpdateIntegrationActions,
+        "create_integrations": CreateBulkIntegrationActions,
+        "update_integrations": UpdateBulkIntegrationActions,
+        "sync_integration_action_mirror": SyncIntegrationActionMirror,
         "get_category_ids": GetCategoryIds,
         "create_or_update_channel_attribute_set": CreateOrUpdateChannelAttributeSet,
         "get_or_create_channel_attribute_set_config": GetOrCreateChannelAttributeSetConfig,
@@ -143,16 +164,41 @@ class OmnitronIntegration(BaseIntegration):
         # "fetch_cancellation_plan": FetchCancellationPlan
     }
 
-    def __init__(self, create_batch=True, content_type=None):
+    def __init__(self, create_batch=True, content_type=None,
+                 buffer_error_reports=None):
         """
         Some environment parameters are stored in the integration object for convenience.
 
         :param create_batch: Flag to decide whether a batch request to be created
+        :param buffer_error_reports: Flag to decide whether error reports are
+            collected and sent in bulk instead of one request per report,
+            defaults to the BUFFER_ERROR_REPORTS setting. Buffered reports
+            are not returned by the create_error_report action.
 
         """
         from channel_app.core import settings
+        configure_instrumentation(settings)
         self.create_batch = create_batch
         self.content_type = content_type
+        if buffer_error_reports is None:
+            buffer_error_reports = getattr(settings, "BUFFER_ERROR_REPORTS",
+                                           False)
+        self.buffer_error_reports = bool(buffer_error_reports)
+        self.error_report_buffer = None
+        self.batch_commit_buffer = None
+        self.integration_action_mirror = None
+        self.use_integration_action_mirror = getattr(
+            settings, "INTEGRATION_ACTION_MIRROR", False)
+        self.shared_cache = None
+        self.use_shared_cache = getattr(settings, "SHARED_CACHE", False)
+        self.attribute_config_cache = None
+        self.category_attribute_fingerprint_store = None
+        self.use_category_attribute_fingerprints = getattr(
+            settings, "CATEGORY_ATTRIBUTE_FINGERPRINTS", False)
+        self.product_category_batched = bool(getattr(
+            settings, "PRODUCT_CATEGORY_BATCHED", False))
+        self.attribute_config_cache_ttl = int(getattr(
+            settings, "ATTRIBUTE_CONFIG_CACHE_TTL", 0) or 0)
         if create_batch and not content_type:
             raise Exception("ContentType not defined")
         self.channel_id = settings.OMNITRON_CHANNEL_ID
@@ -165,17 +211,40 @@ class OmnitronIntegration(BaseIntegration):
     def __enter__(self):
         self.api = OmnitronApiClient(base_url=self.base_url,
                                      username=self.username,
-                                     password=self.password)
+                                     password=self.password,
+                                     channel_id=self.channel_id)
+        instrumentation.instrument_session(self.api.session)
+        if self.buffer_error_reports:
+            self.error_report_buffer = ErrorReportBuffer(integration=self)
+        if self.use_integration_action_mirror:
+            self.integration_action_mirror = IntegrationActionMirror(
+                channel_id=self.channel_id)
+        if self.use_shared_cache:
+            self.shared_cache = SharedCache(channel_id=self.channel_id)
+        if self.attribute_config_cache_ttl:
+            self.attribute_config_cache = AttributeConfigCache(
+                channel_id=self.channel_id,
+                ttl=self.attribute_config_cache_ttl)
+        if self.use_category_attribute_fingerprints:
+            self.category_attribute_fingerprint_store = \
+                CategoryAttributeFingerprintStore(channel_id=self.channel_id)
         self.channel_is_active = self.channel.is_active
-        if not self.channel_is_active:
-            return
-        if self.create_batch:
+        if self.channel_is_active and self.create_batch:
             self.batch_request = ClientBatchRequest(
                 channel_id=self.channel_id).create()
             self.batch_request.content_type = self.content_type
+        # Started last, since __exit__ which stops its timer thread does not
+        # run if __enter__ raises
+        if self.error_report_buffer is not None:
+            self.error_report_buffer.start()
+        if not self.channel_is_active:
+            return
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.error_report_buffer is not None:
+            self.error_report_buffer.close()
+            self.error_report_buffer = None
         del self.api
         if isinstance(exc_val, Exception) and not self.channel_is_active:
             return True
@@ -0,0 +1,294 @@
+import json
+from typing import Callable, Dict, Iterable, List
+
+from omnisdk.omnitron.endpoints import ChannelIntegrationActionEndpoint
+from omnisdk.omnitron.models import IntegrationAction
+
+from channel_app.core.clients import RedisClient
+
+
+class IntegrationActionMirror(object):
+    """
+    Local copy of the integration actions of a channel stored on Redis. Each
+    content type keeps two hashes so that integration actions can be
+    resolved both with object id and remote id without asking Omnitron:
+
+        {prefix}_{channel_id}_{content_type}_object: object_id -> integration action
+        {prefix}_{channel_id}_{content_type}_remote: remote_id -> object_id
+
+    Entries are written through by the commands creating, updating and
+    deleting integration actions, read through on lookups and refreshed
+    incrementally by `sync` using the modified date of the last synced entry.
+    Integration actions deleted elsewhere can not be listed, so `sync` copies
+    all of them again every FULL_SYNC_INTERVAL seconds to drop their entries.
+
+    A remote id is expected to point to a single object for a content type.
+    """
+    redis_prefix = "integration_action_mirror"
+    SYNC_PAGE_SIZE = 500
+    FULL_SYNC_INTERVAL = 60 * 60 * 24
+
+    def __init__(self, channel_id, redis_client=None):
+        self.channel_id = channel_id
+        self.redis_client = redis_client or RedisClient()
+
+    def get_key(self, content_type: str, suffix: str) -> str:
+        return f"{self.redis_prefix}_{self.channel_id}_{content_type}_{suffix}"
+
+    @staticmethod
+    def get_content_type(integration_action) -> str:
+        content_type = integration_action.content_type
+        if isinstance(content_type, dict):
+            return content_type["model"]
+        return content_type
+
+    @staticmethod
+    def serialize(integration_action) -> str:
+        return json.dumps(vars(integration_action), default=str)
+
+    @staticmethod
+    def deserialize(value) -> IntegrationAction:
+        return IntegrationAction(**json.loads(value))
+
+    def get_by_object_ids(self, content_type: str,
+                          object_ids: list) -> Dict[object, IntegrationAction]:
+        """
+        :return: {object_id: IntegrationAction} for the object ids found
+        """
+        object_ids = list(object_ids)
+        if not object_ids:
+            return {}
+        values = self.redis_client.hmget(
+            self.get_key(content_type, "object"),
+            [str(object_id) for object_id in object_ids])
+        return {object_id: self.deserialize(value)
+                for object_id, value in zip(object_ids, values) if value}
+
+    def get_by_remote_ids(self, content_type: str,
+                          remote_ids: list) -> Dict[object, IntegrationAction]:
+        """
+        :return: {remote_id: IntegrationAction} for the remote ids found
+        """
+        remote_ids = list(remote_ids)
+        if not remote_ids:
+            return {}
+        object_ids = self.redis_client.hmget(
+            self.get_key(content_type, "remote"),
+            [str(remote_id) for remote_id in remote_ids])
+        found = {remote_id: object_id.decode("utf-8")
+                 for remote_id, object_id in zip(remote_ids, object_ids)
+                 if object_id}
+        integration_actions = self.get_by_object_ids(content_type,
+                                                     found.values())
+        return {remote_id: integration_actions[object_id]
+                for remote_id, object_id in found.items()
+                if object_id in integration_actions}
+
+    def lookup(self, content_type: str, ids: list,
+               fetch: Callable[[list], List[IntegrationAction]],
+               by_remote_id=False, **filters) -> List[IntegrationAction]:
+        """
+        Returns the integration actions of the ids. Ids that are not on the
+        mirror, or whose mirrored entry does not match the filters, are
+        fetched with `fetch` and stored on the mirror.
+
+        :param content_type: model name of the integration actions
+        :param ids: object ids, or remote ids if by_remote_id is set
+        :param fetch: callable which requests the given ids from Omnitron
+        :param filters: attribute values the integration actions must have
+        """
+        if by_remote_id:
+            mirrored = self.get_by_remote_ids(content_type, ids)
+        else:
+            mirrored = self.get_by_object_ids(content_type, ids)
+
+        integration_actions = []
+        missing_ids = []
+        for id_ in ids:
+            integration_action = mirrored.get(id_)
+            if integration_action and all(
+                    getattr(integration_action, key, None) == value
+                    for key, value in filters.items()):
+                integration_actions.append(integration_action)
+            else:
+                missing_ids.append(id_)
+
+        if missing_ids:
+            fetched = fetch(missing_ids)
+            self.set(fetched, content_type=content_type)
+            integration_actions.extend(fetched)
+        return integration_actions
+
+    def set(self, integration_actions: Iterable, content_type: str = None):
+        """
+        Stores the integration actions. The remote id entry of the previous
+        remote id of an integration action is deleted if its remote id
+        changed.
+        """
+        entries = []
+        for integration_action in integration_actions:
+            model = content_type or self.get_content_type(integration_action)
+            entries.append((model, str(integration_action.object_id),
+                            integration_action))
+        if not entries:
+            return
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for model, object_id, _ in entries:
+            pipeline.hget(self.get_key(model, "object"), object_id)
+        previous_values = pipeline.execute()
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for (model, object_id, integration_action), previous_value in zip(
+                entries, previous_values):
+            remote_id = getattr(integration_action, "remote_id", None)
+            remote_id = None if remote_id in (None, "") else str(remote_id)
+            if previous_value:
+                previous_remote_id = getattr(
+                    self.deserialize(previous_value), "remote_id", None)
+                if previous_remote_id not in (None, "") and \
+                        str(previous_remote_id) != remote_id:
+                    pipeline.hdel(self.get_key(model, "remote"),
+                                  str(previous_remote_id))
+            pipeline.hset(self.get_key(model, "object"), object_id,
+                          self.serialize(integration_action))
+            if remote_id is not None:
+                pipeline.hset(self.get_key(model, "remote"), remote_id,
+                              object_id)
+        pipeline.execute()
+
+    def delete(self, integration_actions: Iterable, content_type: str = None):
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for integration_action in integration_actions:
+            model = content_type or self.get_content_type(integration_action)
+            pipeline.hdel(self.get_key(model, "object"),
+                          str(integration_action.object_id))
+            remote_id = getattr(integration_action, "remote_id", None)
+            if remote_id not in (None, ""):
+                pipeline.hdel(self.get_key(model, "remote"), str(remote_id))
+        pipeline.execute()
+
+    def sync(self, content_type: str, full: bool = None) -> int:
+        """
+        Fetches the integration actions modified since the last sync and
+        stores them. Integration actions modified at the modified date of the
+        last sync are fetched again, since others may have been modified at
+        the same time, and skipped if they were already synced.
+
+        :param full: copy all integration actions and drop the entries of
+            the deleted ones. Defaults to True for the first sync and once
+            FULL_SYNC_INTERVAL seconds passed since the last full sync.
+        :return: number of integration actions synced
+        """
+        full_synced_key = self.get_key(content_type, "full_synced")
+        if full is None:
+            full = not self.redis_client.exists(full_synced_key)
+        if full:
+            count = self.full_sync(content_type)
+            self.redis_client.set(full_synced_key, 1,
+                                  ex=self.FULL_SYNC_INTERVAL)
+            return count
+
+        synced_at_key = self.get_key(content_type, "synced_at")
+        synced_pks_key = self.get_key(content_type, "synced_pks")
+        synced_at, synced_pks = self.redis_client.mget(
+            [synced_at_key, synced_pks_key])
+        synced_at = synced_at.decode("utf-8") if synced_at else None
+        synced_pks = set(json.loads(synced_pks)) if synced_pks else set()
+        params = {"channel_id": self.channel_id,
+                  "content_type_name": content_type,
+                  "sort": "modified_date",
+                  "limit": self.SYNC_PAGE_SIZE}
+        if synced_at:
+            params["modified_date__gte"] = synced_at
+
+        endpoint = ChannelIntegrationActionEndpoint(channel_id=self.channel_id)
+        batch = endpoint.list(params=params)
+        count = 0
+        while batch:
+            batch = [integration_action for integration_action in batch
+                     if str(integration_action.modified_date) != synced_at or
+                     integration_action.pk not in synced_pks]
+            if batch:
+                self.set(batch, content_type=content_type)
+                last_modified_date = str(batch[-1].modified_date)
+                if last_modified_date != synced_at:
+                    synced_at = last_modified_date
+                    synced_pks = set()
+                synced_pks.update(
+                    integration_action.pk for integration_action in batch
+                    if str(integration_action.modified_date) == synced_at)
+                self.redis_client.mset({
+                    synced_at_key: synced_at,
+                    synced_pks_key: json.dumps(sorted(synced_pks))})
+                count += len(batch)
+            batch = next(endpoint.iterator, None)
+        return count
+
+    def full_sync(self, content_type: str) -> int:
+        """
+        Replaces the entries of the content type with all of its integration
+        actions on Omnitron. Entries are built on temporary keys and renamed
+        over the current ones at the end.
+
+        :return: number of integration actions synced
+        """
+        params = {"channel_id": self.channel_id,
+                  "content_type_name": content_type,
+                  "sort": "modified_date",
+                  "limit": self.SYNC_PAGE_SIZE}
+        object_key = self.get_key(content_type, "object")
+        remote_key = self.get_key(content_type, "remote")
+        new_object_key = self.get_key(content_type, "object_new")
+        new_remote_key = self.get_key(content_type, "remote_new")
+        self.redis_client.delete(new_object_key, new_remote_key)
+
+        endpoint = ChannelIntegrationActionEndpoint(channel_id=self.channel_id)
+        batch = endpoint.list(params=params)
+        count = 0
+        has_remote_ids = False
+        synced_at = None
+        synced_pks = set()
+        while batch:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for integration_action in batch:
+                object_id = str(integration_action.object_id)
+                pipeline.hset(new_object_key, object_id,
+                              self.serialize(integration_action))
+                remote_id = getattr(integration_action, "remote_id", None)
+                if remote_id not in (None, ""):
+                    pipeline.hset(new_remote_key, str(remote_id), object_id)
+                    has_remote_ids = True
+                modified_date = str(integration_action.modified_date)
+                if modified_date != synced_at:
+                    synced_at = modified_date
+                    synced_pks = set()
+                synced_pks.add(integration_action.pk)
+            pipeline.execute()
+            count += len(batch)
+            batch = next(endpoint.iterator, None)
+
+        pipeline = self.redis_client.pipeline()
+        pipeline.delete(object_key, remote_key)
+        if count:
+            pipeline.rename(new_object_key, object_key)
+        if has_remote_ids:
+            pipeline.rename(new_remote_key, remote_key)
+        if synced_at:
+            pipeline.mset({
+                self.get_key(content_type, "synced_at"): synced_at,
+                self.get_key(content_type, "synced_pks"):
+                    json.dumps(sorted(synced_pks))})
+        pipeline.execute()
+        return count
+
+
+def get_integration_action_mirror(integration):
+    """
+    Returns the mirror attached to the integration or None if the integration
+    does not use one.
+    """
+    mirror = getattr(integration, "integration_action_mirror", None)
+    if isinstance(mirror, IntegrationActionMirror):
+        return mirror
+    return None